@@ -0,0 +1,1174 @@
+"""
+
+Benchmark suite: reproducible scenarios covering construction, rendering, paths, points, parsing
+and the optional features (caches, templates, dedup, optimizer, streaming, ...), with results saved as JSON and compared between runs.
+
+Run from the repository root:
+
+- `python -m benchmarks.suite run -o results.json` runs every scenario (`-k render` runs the ones with "render" in the name)
+- `python -m benchmarks.suite compare base.json results.json` prints the change of each scenario,
+  and exits with status 1 if any of them got slower by more than `--threshold` (10% by default)
+
+Each scenario is timed `--repeat` times (with as many runs per repeat as fit in about 0.2 seconds), the minimum is reported.
+After timing, one more run records peak memory allocated by Python (with `tracemalloc`) and the length of the output, if it's a string.
+Inputs are generated from fixed seeds, so runs on the same machine are comparable.
+
+Alternatives are separate scenarios with a common prefix, e.g. `-k clone` runs `clone_deepcopy` and `clone_cow`.
+
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+import pathlib
+import platform
+import subprocess
+import sys
+import tracemalloc
+from copy import deepcopy
+from datetime import datetime, timezone
+from math import sin
+from mmap import ACCESS_READ, mmap
+from random import Random
+from statistics import median
+from tempfile import TemporaryDirectory
+from timeit import Timer
+from typing import Callable, Optional
+
+from wordstreamer import Renderer
+
+from soda import (
+    Fragment,
+    Literal,
+    Path,
+    Point,
+    Root,
+    Slot,
+    Tag,
+    TagArray,
+    Template,
+    config,
+)
+from soda.batch import convert_many
+from soda.dedup import dedupe
+from soda.disk_cache import DiskCache, tree_key
+from soda.formatting import format_many, trunc
+from soda.memory import tree_size
+from soda.optimize import PASSES, optimize
+from soda.output import iter_gzip
+from soda.parallel import render_parallel
+from soda.point import PointPath
+from soda.profiling import Profiler
+from soda.xml_parse import parse_document
+from soda.xml_stream import Start, map_events, transform
+
+# a scenario builds its input and returns the measured function along with the number of items it processes
+Scenario = Callable[[], "tuple[Callable[[], object], int]"]
+
+SCENARIOS: dict[str, Scenario] = {}
+
+# scenarios whose results are trees, checked against `tree_size`
+ESTIMATED: set[str] = set()
+
+RESULTS_VERSION = 3
+
+
+# files written by scenarios, removed when the suite exits
+TEMPORARY_DIRECTORIES: list[TemporaryDirectory] = []
+
+
+def scenario(function: Scenario) -> Scenario:
+    SCENARIOS[function.__name__] = function
+    return function
+
+
+def estimated_scenario(function: Scenario) -> Scenario:
+    """Scenario building a tree: its `tree_size` estimate is recorded next to the memory allocated for it"""
+    ESTIMATED.add(function.__name__)
+    return scenario(function)
+
+
+def temporary_directory() -> str:
+    directory = TemporaryDirectory()
+    TEMPORARY_DIRECTORIES.append(directory)
+    return directory.name
+
+
+def wide_tree(count: int = 5000) -> Tag:
+    rng = Random(0)
+
+    return Root(viewBox="0 0 1000 1000")(
+        *[
+            Tag.circle(
+                cx=rng.random() * 1000,
+                cy=rng.random() * 1000,
+                r=rng.randint(1, 5),
+                fill="#3366cc",
+                stroke_width=0.5,
+            )
+            for _ in range(count)
+        ]
+    )
+
+
+def deep_tree(depth: int = 500) -> Tag:
+    root = leaf = Tag.g(id="root")
+
+    for i in range(depth):
+        child = Tag.g(Tag.rect(x=i, y=i, width=1, height=1), transform="scale(1)")
+        leaf(child)
+        leaf = child
+
+    return root
+
+
+def long_path(count: int = 5000) -> list[str]:
+    rng = Random(1)
+    commands = [Path.M(0, 0)]
+
+    for _ in range(count):
+        commands.append(
+            Path.C(
+                rng.random() * 100,
+                rng.random() * 100,
+                rng.random() * 100,
+                rng.random() * 100,
+                rng.random() * 100,
+                rng.random() * 100,
+            )
+        )
+
+    return commands
+
+
+@scenario
+def construct_wide() -> tuple[Callable[[], object], int]:
+    return lambda: wide_tree(5000), 5000
+
+
+@scenario
+def construct_deep() -> tuple[Callable[[], object], int]:
+    return lambda: deep_tree(500), 1000
+
+
+@scenario
+def render_wide_compact() -> tuple[Callable[[], object], int]:
+    tree = wide_tree()
+    return tree.render, 5000
+
+
+@scenario
+def render_wide_pretty() -> tuple[Callable[[], object], int]:
+    tree = wide_tree()
+    return lambda: tree.render(pretty=True), 5000
+
+
+@scenario
+def render_deep_compact() -> tuple[Callable[[], object], int]:
+    tree = deep_tree()
+    return tree.render, 1000
+
+
+@scenario
+def render_deep_pretty() -> tuple[Callable[[], object], int]:
+    tree = deep_tree()
+    return lambda: tree.render(pretty=True), 1000
+
+
+@scenario
+def byte_stream_wide() -> tuple[Callable[[], object], int]:
+    tree = wide_tree()
+    renderer = Renderer()
+
+    def stream() -> int:
+        return sum(len(chunk) for chunk in renderer.byte_stream(tree))
+
+    return stream, 5000
+
+
+@scenario
+def path_build_compact() -> tuple[Callable[[], object], int]:
+    commands = long_path()
+    return lambda: Path.build(*commands, compact=True), len(commands)
+
+
+@scenario
+def path_commands() -> tuple[Callable[[], object], int]:
+    return lambda: long_path(5000), 5000
+
+
+@scenario
+def point_arithmetic() -> tuple[Callable[[], object], int]:
+    rng = Random(2)
+    points = [Point(rng.random() * 100, rng.random() * 100) for _ in range(5000)]
+    center = Point(50, 50)
+
+    def transform() -> list[Point]:
+        return [
+            ((point - center) * 2 + center).rotate(center, degrees=30) / 3
+            for point in points
+        ]
+
+    return transform, len(points)
+
+
+@scenario
+def point_path() -> tuple[Callable[[], object], int]:
+    rng = Random(3)
+    points = [Point(rng.random() * 100, rng.random() * 100) for _ in range(5000)]
+
+    def build() -> str:
+        return PointPath.build(*[PointPath.L(point) for point in points], compact=True)
+
+    return build, len(points)
+
+
+@scenario
+def from_str_large() -> tuple[Callable[[], object], int]:
+    source = wide_tree().render()
+    return lambda: Tag.from_str(source), 5000
+
+
+@scenario
+def flatten_nested() -> tuple[Callable[[], object], int]:
+    rng = Random(4)
+    children: list = []
+
+    for i in range(2000):
+        rect = Tag.rect(x=i, width=rng.randint(1, 10))
+        # a mix of plain children, nested lists and fragments
+        children.append(
+            [rect, [Tag.title(str(i))]] if i % 3 else Fragment(rect, "text")
+        )
+
+    tree = Tag.g(*children)
+
+    def flatten() -> int:
+        return len([*tree]) + len(tree.render())
+
+    return flatten, 2000
+
+
+# trees built in different ways
+
+
+def circles(count: int) -> list[tuple[float, float]]:
+    rng = Random(5)
+    return [(rng.random() * 1000, rng.random() * 1000) for _ in range(count)]
+
+
+@scenario
+def construct_constructor() -> tuple[Callable[[], object], int]:
+    def build() -> Tag:
+        return Tag(
+            "g",
+            *[
+                Tag("circle", cx=i, cy=i, r=2, fill="red", stroke_width=1)
+                for i in range(5000)
+            ],
+        )
+
+    return build, 5000
+
+
+@scenario
+def construct_shorthand() -> tuple[Callable[[], object], int]:
+    def build() -> Tag:
+        return Tag.g(
+            *[
+                Tag.circle(cx=i, cy=i, r=2, fill="red", stroke_width=1)
+                for i in range(5000)
+            ]
+        )
+
+    return build, 5000
+
+
+@scenario
+def construct_raw() -> tuple[Callable[[], object], int]:
+    def build() -> Tag:
+        return Tag.raw(
+            "g",
+            *[
+                Tag.raw("circle", cx=i, cy=i, r=2, fill="red", **{"stroke-width": 1})
+                for i in range(5000)
+            ],
+        )
+
+    return build, 5000
+
+
+# memory per node: peak bytes per item include the list slot holding the node
+
+
+@scenario
+def node_size_empty() -> tuple[Callable[[], object], int]:
+    return lambda: [Tag("g") for _ in range(50_000)], 50_000
+
+
+@scenario
+def node_size_circle() -> tuple[Callable[[], object], int]:
+    return (
+        lambda: [Tag("circle", cx=i % 100, cy=i % 50, r=5) for i in range(50_000)],
+        50_000,
+    )
+
+
+@scenario
+def node_size_rect() -> tuple[Callable[[], object], int]:
+    return (
+        lambda: [
+            Tag("rect", x=i % 100, y=i % 50, width=2, height=3) for i in range(50_000)
+        ],
+        50_000,
+    )
+
+
+@scenario
+def node_size_with_child() -> tuple[Callable[[], object], int]:
+    return lambda: [Tag("g", "child") for _ in range(50_000)], 50_000
+
+
+@scenario
+def node_size_literal() -> tuple[Callable[[], object], int]:
+    return lambda: [Literal("text") for _ in range(50_000)], 50_000
+
+
+# `tree_size` estimates: `memory_*_build` record the estimate of the chart next to the memory allocated while building it
+
+
+def scatter_chart(count: int = 5000) -> Tag:
+    rng = Random(0)
+
+    return Root(viewBox="0 0 1000 1000")(
+        Tag.g(fill="#3366cc")(
+            *[
+                Tag.circle(cx=rng.random() * 1000, cy=rng.random() * 1000, r=3)
+                for _ in range(count)
+            ]
+        )
+    )
+
+
+def line_chart(series: int = 20, points: int = 500) -> Tag:
+    rng = Random(1)
+    lines = []
+
+    for i in range(series):
+        commands = [Path.M(0, rng.random() * 100)]
+        commands.extend(Path.L(x, rng.random() * 100) for x in range(1, points))
+        lines.append(
+            Tag.path(d=Path.build(*commands), stroke=f"#{i:02x}66cc", fill="none")
+        )
+
+    return Root(viewBox="0 0 500 100")(*lines)
+
+
+def bar_chart(count: int = 1000) -> Tag:
+    rng = Random(2)
+    bars = []
+
+    for i in range(count):
+        height = rng.randint(1, 100)
+        bars.append(
+            Tag.g(class_="bar")(
+                Tag.rect(x=i * 10, y=100 - height, width=8, height=height),
+                Tag.text(f"bar {i}: {height}", x=i * 10 + 4, y=95 - height),
+            )
+        )
+
+    return Root(viewBox=f"0 0 {count * 10} 100")(Tag.title("Bars"), *bars)
+
+
+@estimated_scenario
+def memory_scatter_build() -> tuple[Callable[[], object], int]:
+    return scatter_chart, 5000
+
+
+@scenario
+def memory_scatter_tree_size() -> tuple[Callable[[], object], int]:
+    tree = scatter_chart()
+    return lambda: tree_size(tree), 5000
+
+
+@estimated_scenario
+def memory_lines_build() -> tuple[Callable[[], object], int]:
+    return line_chart, 20
+
+
+@scenario
+def memory_lines_tree_size() -> tuple[Callable[[], object], int]:
+    tree = line_chart()
+    return lambda: tree_size(tree), 20
+
+
+@estimated_scenario
+def memory_bars_build() -> tuple[Callable[[], object], int]:
+    return bar_chart, 3000
+
+
+@scenario
+def memory_bars_tree_size() -> tuple[Callable[[], object], int]:
+    tree = bar_chart()
+    return lambda: tree_size(tree), 3000
+
+
+# render paths and options
+
+
+@scenario
+def render_string_wide() -> tuple[Callable[[], object], int]:
+    tree = wide_tree()
+    return lambda: tree.render_string({"pretty": False, "tab_size": 0}), 5000
+
+
+@scenario
+def render_string_deep() -> tuple[Callable[[], object], int]:
+    # streaming recurses for each level
+    tree = deep_tree(200)
+    return lambda: tree.render_string({"pretty": False, "tab_size": 0}), 400
+
+
+def chart_with_text(points: int = 2000) -> Tag:
+    return Root(viewBox="0 0 1000 1000")(
+        Tag.title("Sales & costs <2024>"),
+        *[
+            Tag.g(
+                Tag.circle(cx=i * 0.5, cy=(i * 7) % 1000 / 3, r=2.5, fill="#3366cc"),
+                Tag.text(f"point #{i}", x=i * 0.5, y=10, font_family='"Inter", sans'),
+            )
+            for i in range(points)
+        ],
+    )
+
+
+@scenario
+def serialize_plain() -> tuple[Callable[[], object], int]:
+    tree = chart_with_text()
+    return tree.render, 4000
+
+
+@scenario
+def serialize_values() -> tuple[Callable[[], object], int]:
+    config.serialize_values = True
+
+    try:
+        tree = chart_with_text()
+    finally:
+        config.serialize_values = False
+
+    return tree.render, 4000
+
+
+@scenario
+def profiling_disabled() -> tuple[Callable[[], object], int]:
+    tree = chart_with_text()
+    return tree.render, 4000
+
+
+@scenario
+def profiling_enabled() -> tuple[Callable[[], object], int]:
+    tree = chart_with_text()
+
+    def render() -> str:
+        with Profiler():
+            return tree.render()
+
+    return render, 4000
+
+
+@scenario
+def tag_array_tags() -> tuple[Callable[[], object], int]:
+    points = circles(20_000)
+
+    def render() -> str:
+        return Root(
+            *[Tag.circle(cx=x, cy=y, r=1.5, fill="#333") for x, y in points]
+        ).render()
+
+    return render, len(points)
+
+
+@scenario
+def tag_array_columns() -> tuple[Callable[[], object], int]:
+    points = circles(20_000)
+    xs = [x for x, _ in points]
+    ys = [y for _, y in points]
+
+    def render() -> str:
+        return Root(TagArray("circle", cx=xs, cy=ys, r=1.5, fill="#333")).render()
+
+    return render, len(points)
+
+
+def coordinates(count: int) -> list[float]:
+    rng = Random(0)
+    # a mix typical for charts: grid-aligned integers and halves, and arbitrary floats
+    return [
+        rng.choice(
+            [rng.randint(0, 1000), rng.randint(0, 2000) / 2, rng.random() * 1000]
+        )
+        for _ in range(count)
+    ]
+
+
+@scenario
+def formatting_str_trunc() -> tuple[Callable[[], object], int]:
+    values = coordinates(100_000)
+    return lambda: [str(trunc(value)) for value in values], len(values)
+
+
+@scenario
+def formatting_format_many() -> tuple[Callable[[], object], int]:
+    values = coordinates(100_000)
+    return lambda: format_many(values), len(values)
+
+
+# templates
+
+
+def bar_template_chart(title: object, values: list) -> Tag:
+    return Root(viewBox="0 0 100 100", use_namespace=True)(
+        Tag.title(title),
+        Tag.g(
+            *[
+                Tag.rect(x=i * 10, y=0, width=8, height=value, fill="#4a90d9")
+                for i, value in enumerate(values)
+            ]
+        ),
+        Tag.g(*[Tag.text(str(i), x=i * 10 + 4, y=98) for i in range(len(values))]),
+    )
+
+
+BARS = [i * 3.5 for i in range(20)]
+
+
+@scenario
+def template_rebuild() -> tuple[Callable[[], object], int]:
+    return lambda: bar_template_chart("Sales", BARS).render(), 1
+
+
+@scenario
+def template_fill() -> tuple[Callable[[], object], int]:
+    slots = [Slot(f"bar{i}") for i in range(len(BARS))]
+    template = Template(bar_template_chart(Slot("title"), slots))
+    fill = {"title": "Sales", **{f"bar{i}": value for i, value in enumerate(BARS)}}
+    return lambda: template.render(fill), 1
+
+
+# caches and copies
+
+
+def dashboard(panels: int = 50, rows: int = 50) -> Tag:
+    return Root(viewBox="0 0 1000 1000")(
+        *[
+            Tag.g(
+                *[
+                    Tag.rect(x=row, y=panel, width=10, height=row % 7, fill="#222")
+                    for row in range(rows)
+                ],
+                id=f"panel-{panel}",
+            )
+            for panel in range(panels)
+        ]
+    )
+
+
+def tick(root: Tag) -> Callable[[], str]:
+    """Changes one tag and renders the tree again"""
+
+    def render() -> str:
+        root[0][0]["height"] = 1
+        return root.render()
+
+    return render
+
+
+@scenario
+def cache_full_render() -> tuple[Callable[[], object], int]:
+    return tick(dashboard()), 2500
+
+
+@scenario
+def cache_incremental_render() -> tuple[Callable[[], object], int]:
+    return tick(dashboard().enable_cache()), 2500
+
+
+def sparkline(points: int = 2000) -> Tag:
+    values = [sin(i / 50) * 40 + 50 for i in range(points)]
+    commands = [Path.M(0, values[0])] + [
+        Path.L(i / 2, value) for i, value in enumerate(values)
+    ]
+
+    return Root(viewBox=f"0 0 {points / 2} 100")(
+        Tag.path(d=Path.build(*commands), fill="none", stroke="#36c"),
+        *[
+            Tag.circle(cx=i / 2, cy=value, r=1, fill="#36c")
+            for i, value in enumerate(values)
+            if i % 10 == 0
+        ],
+    )
+
+
+@scenario
+def disk_cache_render() -> tuple[Callable[[], object], int]:
+    return sparkline().render, 200
+
+
+@scenario
+def disk_cache_key() -> tuple[Callable[[], object], int]:
+    tree = sparkline()
+    return lambda: tree_key(tree), 200
+
+
+@scenario
+def disk_cache_hit() -> tuple[Callable[[], object], int]:
+    cache = DiskCache(temporary_directory())
+    tree = sparkline()
+    cache.render(tree)
+    return lambda: cache.render(tree), 200
+
+
+def base_chart(series: int = 50, points: int = 1000) -> Tag:
+    return Root(viewBox="0 0 1000 1000")(
+        Tag.g(Tag.text("title"), id="header"),
+        *[
+            Tag.g(
+                *[Tag.circle(cx=i, cy=(i * s) % 1000, r=1) for i in range(points)],
+                id=f"series-{s}",
+            )
+            for s in range(series)
+        ],
+    )
+
+
+def customize(chart: Tag) -> Tag:
+    chart[0][0][0] = "custom title"
+    chart["width"] = 640
+    return chart
+
+
+@scenario
+def clone_deepcopy() -> tuple[Callable[[], object], int]:
+    base = base_chart()
+    return lambda: customize(deepcopy(base)), 1
+
+
+@scenario
+def clone_cow() -> tuple[Callable[[], object], int]:
+    # the first clone makes a frozen snapshot of the base tree, the next ones reuse it
+    base = base_chart()
+    return lambda: customize(base.clone()), 1
+
+
+def almost_equal_trees(count: int = 20_000) -> tuple[Tag, Tag]:
+    """Two trees differing in the last leaf"""
+    trees = [
+        Tag.g(
+            *[Tag.g(Tag.rect(x=i, y=i, width=1, height=1)) for i in range(count - 1)],
+            Tag.rect(x=last),
+        )
+        for last in (1, 2)
+    ]
+    return trees[0], trees[1]
+
+
+@scenario
+def equality_walk() -> tuple[Callable[[], object], int]:
+    first, second = almost_equal_trees()
+    return lambda: first == second, 1
+
+
+@scenario
+def equality_hashed() -> tuple[Callable[[], object], int]:
+    first, second = almost_equal_trees()
+    first.content_hash()
+    second.content_hash()
+    return lambda: first == second, 1
+
+
+# tree transformations
+
+
+def marker() -> Tag:
+    return Tag.g(
+        Tag.circle(cx=0, cy=0, r=4, fill="#fff", stroke="#222", stroke_width=1.5),
+        Tag.path(d="M-2 0 L0 2 L2 -2", fill="none", stroke="#222"),
+        Tag.text("ok", font_size=3, text_anchor="middle"),
+        class_="marker",
+    )
+
+
+def marker_chart(count: int = 2000) -> Tag:
+    return Root(viewBox="0 0 1000 1000")(
+        *[
+            Tag.g(marker(), transform=f"translate({i % 100 * 10} {i // 100 * 10})")
+            for i in range(count)
+        ]
+    )
+
+
+@scenario
+def dedup_plain_render() -> tuple[Callable[[], object], int]:
+    return marker_chart().render, 2000
+
+
+@scenario
+def dedup_deduped_render() -> tuple[Callable[[], object], int]:
+    tree = marker_chart()
+    dedupe(tree)
+    return tree.render, 2000
+
+
+@scenario
+def dedup_dedupe() -> tuple[Callable[[], object], int]:
+    # includes building the chart, as `dedupe` changes it
+    return lambda: dedupe(marker_chart()), 2000
+
+
+def exported_drawing(shapes: int = 2000) -> str:
+    """An export-like SVG: nested bare groups, default attributes, long colors and spaced path data"""
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 1000 1000">'
+        + "".join(
+            f'<g><g><path d="M {i % 1000}.0,{i // 5} L {i % 997},{i % 991} '
+            f'C 10.50,20.25 30,40 50,60 Z" fill="#FF{i % 10}{i % 10}00" '
+            f'stroke="rgb(0, 0, 0)" stroke-width="1" opacity="1"/></g><g></g></g>'
+            for i in range(shapes)
+        )
+        + "</svg>"
+    )
+
+
+def optimized(passes: list[str]) -> Callable[[], str]:
+    """Parses the drawing, runs `passes` and renders it, output length shows the bytes saved"""
+    source = exported_drawing()
+
+    def run() -> str:
+        root = Tag.from_str(source)
+        optimize(root, passes)
+        return root.render()
+
+    return run
+
+
+@scenario
+def optimize_none() -> tuple[Callable[[], object], int]:
+    return optimized([]), 2000
+
+
+@scenario
+def optimize_all() -> tuple[Callable[[], object], int]:
+    return optimized(list(PASSES)), 2000
+
+
+def pass_scenario(name: str) -> Scenario:
+    def run() -> tuple[Callable[[], object], int]:
+        return optimized([name]), 2000
+
+    run.__name__ = f"optimize_{name}"
+    return run
+
+
+for pass_name in PASSES:
+    scenario(pass_scenario(pass_name))
+
+
+# output
+
+
+@scenario
+def svgz_render_gzip() -> tuple[Callable[[], object], int]:
+    tree = wide_tree(20_000)
+    return lambda: gzip.compress(tree.render().encode(), 6, mtime=0), 20_000
+
+
+@scenario
+def svgz_iter_gzip() -> tuple[Callable[[], object], int]:
+    tree = wide_tree(20_000)
+    return lambda: b"".join(iter_gzip(tree, 6)), 20_000
+
+
+def layers(count: int = 400, shapes: int = 200) -> Tag:
+    return Root(viewBox="0 0 1000 1000")(
+        *[
+            Tag.g(
+                *[
+                    Tag.path(d=f"M{i} {j}L{i + 1} {j}L{i} {j + 1}Z", fill="#3a3")
+                    for j in range(shapes)
+                ],
+                id=f"layer-{i}",
+            )
+            for i in range(count)
+        ]
+    )
+
+
+@scenario
+def parallel_serial() -> tuple[Callable[[], object], int]:
+    return layers().render, 80_000
+
+
+@scenario
+def parallel_workers() -> tuple[Callable[[], object], int]:
+    tree = layers()
+    workers = max(os.cpu_count() or 1, 2)
+    return lambda: render_parallel(tree, workers=workers), 80_000
+
+
+# parsing
+
+
+def groups_document(groups: int = 20_000) -> bytes:
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 1000 1000">'
+        + "".join(
+            f'<g id="g{i}" fill="red"><rect x="{i % 1000}" width="2" height="2"/><text>label {i}</text></g>'
+            for i in range(groups)
+        )
+        + "</svg>"
+    ).encode()
+
+
+def document_file(data: bytes) -> str:
+    """Writes `data` into a new temporary directory, returns the path of the file"""
+    path = os.path.join(temporary_directory(), "document.svg")
+
+    with open(path, "wb") as file:
+        file.write(data)
+
+    return path
+
+
+@scenario
+def parse_str() -> tuple[Callable[[], object], int]:
+    text = groups_document().decode()
+    return lambda: Tag.from_str(text), 20_000
+
+
+@scenario
+def parse_bytes() -> tuple[Callable[[], object], int]:
+    data = groups_document()
+    return lambda: Tag.from_str(data), 20_000
+
+
+@scenario
+def parse_str_lxml_only() -> tuple[Callable[[], object], int]:
+    # a string is encoded first, the copy shows up in the peak memory
+    text = groups_document().decode()
+    return lambda: parse_document(text), 20_000
+
+
+@scenario
+def parse_bytes_lxml_only() -> tuple[Callable[[], object], int]:
+    data = groups_document()
+    return lambda: parse_document(data), 20_000
+
+
+@scenario
+def parse_mmap() -> tuple[Callable[[], object], int]:
+    path = document_file(groups_document())
+
+    with open(path, "rb") as file:
+        mapped = mmap(file.fileno(), 0, access=ACCESS_READ)
+
+    return lambda: Tag.from_str(mapped), 20_000
+
+
+@scenario
+def parse_path() -> tuple[Callable[[], object], int]:
+    # plain strings are document text, paths are given as `os.PathLike`
+    path = pathlib.Path(document_file(groups_document()))
+    return lambda: Tag.from_str(path), 20_000
+
+
+def edited(data: bytes, **options: bool) -> Callable[[], str]:
+    """Parses the document, changes two attributes and renders it"""
+
+    def edit() -> str:
+        root = Tag.from_str(data, **options)
+        root["id"] = "chart"
+        root[10][0]["x"] = 5
+        return root.render()
+
+    return edit
+
+
+@scenario
+def lazy_parse_eager_edit() -> tuple[Callable[[], object], int]:
+    return edited(groups_document()), 20_000
+
+
+@scenario
+def lazy_parse_lazy_edit() -> tuple[Callable[[], object], int]:
+    return edited(groups_document(), lazy=True), 20_000
+
+
+@scenario
+def passthrough_tags_edit() -> tuple[Callable[[], object], int]:
+    return edited(groups_document()), 20_000
+
+
+@scenario
+def passthrough_verbatim_edit() -> tuple[Callable[[], object], int]:
+    return edited(groups_document(), passthrough=True), 20_000
+
+
+def recolor(event: object) -> object:
+    if isinstance(event, Start) and event.attributes.get("fill") == "red":
+        event.attributes["fill"] = "blue"
+
+    return event
+
+
+@scenario
+def xml_stream_tree() -> tuple[Callable[[], object], int]:
+    path = document_file(groups_document())
+    output = os.path.join(os.path.dirname(path), "tree.svg")
+
+    def run() -> None:
+        with open(path, "rb") as file:
+            root = Tag.from_str(file.read())
+
+        stack = [root]
+
+        while stack:
+            tag = stack.pop()
+
+            if tag.attributes.get("fill") == "red":
+                tag["fill"] = "blue"
+
+            stack.extend(child for child in tag.children if type(child) is Tag)
+
+        with open(output, "wb") as file:
+            root.write_to(file)
+
+    return run, 20_000
+
+
+@scenario
+def xml_stream_transform() -> tuple[Callable[[], object], int]:
+    path = document_file(groups_document())
+    output = os.path.join(os.path.dirname(path), "stream.svg")
+
+    def run() -> None:
+        with open(path, "rb") as file, open(output, "wb") as sink:
+            transform(file, sink, map_events(recolor))
+
+    return run, 20_000
+
+
+def normalize_icon(root: Tag) -> None:
+    root["width"] = 24
+    root["height"] = 24
+
+    for child in root[0]:
+        child["fill"] = "currentColor"
+
+
+def icons(directory: str, count: int = 500) -> list[str]:
+    rng = Random(6)
+    paths = []
+
+    for i in range(count):
+        shapes = "".join(
+            f'<path d="M{rng.randint(0, 24)} {rng.randint(0, 24)}L{rng.randint(0, 24)} {rng.randint(0, 24)}Z" fill="#000000"/>'
+            for _ in range(rng.randint(5, 40))
+        )
+        path = os.path.join(directory, f"icon{i}.svg")
+
+        with open(path, "w") as file:
+            file.write(
+                f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24"><g>{shapes}</g></svg>'
+            )
+
+        paths.append(path)
+
+    return paths
+
+
+def converted(workers: int) -> tuple[Callable[[], object], int]:
+    directory = temporary_directory()
+    paths = icons(directory)
+    output = os.path.join(directory, "out")
+
+    def run() -> None:
+        for result in convert_many(paths, normalize_icon, output, workers=workers):
+            assert result.ok
+
+    return run, len(paths)
+
+
+@scenario
+def batch_one_worker() -> tuple[Callable[[], object], int]:
+    return converted(1)
+
+
+@scenario
+def batch_all_workers() -> tuple[Callable[[], object], int]:
+    return converted(os.cpu_count() or 1)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(function: Callable[[], object], repeat: int) -> list[float]:
+    """Seconds per call, for each of `repeat` rounds"""
+    timer = Timer(function)
+    number, _ = timer.autorange()
+    return [elapsed / number for elapsed in timer.repeat(repeat, number)]
+
+
+def measure_memory(function: Callable[[], object]) -> tuple[int, int, object]:
+    """Peak bytes allocated by Python during one call, bytes allocated during it and still held after it (by the result), and the result"""
+    tracemalloc.start()
+
+    try:
+        result = function()
+        allocated, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return peak, allocated, result
+
+
+def run(names: list[str], repeat: int) -> dict[str, object]:
+    results: dict[str, object] = {}
+
+    for name in names:
+        function, items = SCENARIOS[name]()
+        times = measure(function, repeat)
+        # measured after timing, so module-level caches are already filled
+        peak, allocated, result = measure_memory(function)
+        output = len(result) if isinstance(result, (str, bytes)) else None
+        best = min(times)
+
+        results[name] = {
+            "best": best,
+            "median": median(times),
+            "items": items,
+            "items_per_second": items / best,
+            "peak_bytes": peak,
+            "output_bytes": output,
+        }
+        line = (
+            f"{name:>28}: {best * 1000:9.3f} ms, {items / best:12,.0f} items/s, "
+            f"peak {peak / 1024:10,.0f} KiB"
+            + ("" if output is None else f", output {output:,} bytes")
+        )
+
+        if name in ESTIMATED:
+            assert isinstance(result, Tag)
+            estimated = tree_size(result).object_bytes
+            results[name].update(allocated_bytes=allocated, estimated_bytes=estimated)
+            line += f", tree_size {estimated:,} of {allocated:,} bytes allocated ({estimated / allocated:.2f})"
+
+        print(line, flush=True)
+
+    return {
+        "version": RESULTS_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(base: dict, current: dict, threshold: float) -> list[str]:
+    """Prints relative change of time (and memory) of each scenario present in both runs, returns the names of ones that got slower"""
+    regressions: list[str] = []
+
+    for name, result in current["results"].items():
+        base_result = base["results"].get(name)
+
+        if base_result is None:
+            print(f"{name:>28}: new")
+            continue
+
+        change = result["best"] / base_result["best"] - 1
+        regressed = change > threshold
+
+        if regressed:
+            regressions.append(name)
+
+        # results saved before memory was recorded don't have it
+        base_peak = base_result.get("peak_bytes")
+        memory = (
+            f", peak memory {result['peak_bytes'] / base_peak - 1:+7.1%}"
+            if base_peak and result.get("peak_bytes") is not None
+            else ""
+        )
+
+        print(
+            f"{name:>28}: {base_result['best'] * 1000:9.3f} ms -> {result['best'] * 1000:9.3f} ms "
+            f"({change:+7.1%}){memory}{'  REGRESSION' if regressed else ''}"
+        )
+
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run scenarios")
+    run_parser.add_argument("-o", "--output", help="JSON file to save results to")
+    run_parser.add_argument(
+        "-k", dest="keyword", default="", help="run only scenarios containing this"
+    )
+    run_parser.add_argument("--repeat", type=int, default=5)
+
+    compare_parser = commands.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative slowdown counted as a regression (default: 0.1)",
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        names = [name for name in SCENARIOS if args.keyword in name]
+        results = run(names, args.repeat)
+
+        if args.output:
+            with open(args.output, "w") as file:
+                json.dump(results, file, indent=2)
+
+        return 0
+
+    with open(args.base) as file:
+        base = json.load(file)
+
+    with open(args.current) as file:
+        current = json.load(file)
+
+    regressions = compare(base, current, args.threshold)
+
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
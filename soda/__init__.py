@@ -17,3 +17,6 @@ from .custom_tags import (
 from .paths import Path as Path
 from .point import Point as Point
 from .point import PointPath as PointPath
+from .template import Slot as Slot
+from .tag_array import TagArray as TagArray
+from .template import Template as Template
@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import traceback
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from importlib import import_module
+from itertools import islice
+from os import cpu_count
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Deque, Iterable, Iterator, Optional, Tuple, Union
+
+from .parallel import is_free_threaded
+from .tags import Tag
+
+# a transform changes a parsed tree in place (returning None), or returns a new one
+Transform = Callable[[Tag], Optional[Tag]]
+
+PathLike = Union[str, "os.PathLike[str]"]
+
+# source path, output path (None to return rendered text) and error found before converting (None if there's none)
+Job = Tuple[str, Optional[str], Optional[str]]
+
+# files handled by one task, so small files don't pay for a round trip to a worker each
+DEFAULT_BATCH_SIZE = 8
+
+# tasks submitted (or done, but not yielded yet) per worker, which bounds memory held by results waiting for slower files
+TASKS_PER_WORKER = 2
+
+
+class FileResult:
+    """
+
+    Result of converting one file:
+
+    - `source`: input path
+    - `output`: path the result was written to, or the rendered text if no output directory was given (None on failure)
+    - `error`: formatted traceback if the conversion failed, None otherwise
+    - `parse_time`, `transform_time`, `render_time`: seconds spent on each step (0 for steps not reached)
+
+    """
+
+    __slots__ = (
+        "source",
+        "output",
+        "error",
+        "parse_time",
+        "transform_time",
+        "render_time",
+    )
+
+    def __init__(self, source: str):
+        self.source = source
+        self.output: Optional[str] = None
+        self.error: Optional[str] = None
+        self.parse_time = 0.0
+        self.transform_time = 0.0
+        self.render_time = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def total_time(self) -> float:
+        return self.parse_time + self.transform_time + self.render_time
+
+    def __repr__(self) -> str:
+        status = "ok" if self.ok else "failed"
+        return f"FileResult<{self.source}: {status}, {self.total_time * 1000:.1f} ms>"
+
+
+def output_path(source: str, output_dir: str, root: Optional[str] = None) -> str:
+    """Output path for `source`: its path relative to `root` if given, its file name otherwise"""
+    if root is None:
+        return os.path.join(output_dir, os.path.basename(source))
+
+    name = os.path.relpath(os.path.abspath(source), root)
+
+    if name == os.pardir or name.startswith(os.pardir + os.sep):
+        raise ValueError(f"{source} is not under {root}")
+
+    return os.path.join(output_dir, name)
+
+
+def plan_outputs(
+    sources: Iterable[str], output_dir: Optional[str], root: Optional[str]
+) -> Iterator[Job]:
+    """
+
+    Jobs for `sources`: (source, output path, error).
+
+    An output that would overwrite its input, or an output of an earlier source, is an error for that file instead.
+
+    """
+    if output_dir is None:
+        for source in sources:
+            yield source, None, None
+        return
+
+    # real paths of outputs given out so far, to the sources they belong to
+    claimed: dict[str, str] = {}
+
+    for source in sources:
+        try:
+            path = output_path(source, output_dir, root)
+            real_path = os.path.realpath(path)
+
+            if real_path == os.path.realpath(source):
+                raise ValueError(f"output {path} would overwrite the input")
+
+            if real_path in claimed:
+                raise ValueError(
+                    f"output {path} is already written for {claimed[real_path]}"
+                )
+
+            claimed[real_path] = source
+        except ValueError:
+            yield source, None, traceback.format_exc()
+        else:
+            yield source, path, None
+
+
+def write_output(root: Tag, path: str, pretty: bool) -> None:
+    """Renders into a temporary file next to `path` and moves it into place, so a failed render doesn't leave a truncated output"""
+    directory = os.path.dirname(path)
+
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    temporary = f"{path}.tmp"
+
+    try:
+        with open(temporary, "wb") as file:
+            root.write_to(file, pretty=pretty)
+
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def convert_file(
+    source: str,
+    transform: Optional[Transform] = None,
+    output: Optional[str] = None,
+    pretty: bool = False,
+    lazy: bool = False,
+) -> FileResult:
+    """Converts one file, writing it to `output` path (or returning rendered text without it), catching any errors into the result"""
+    result = FileResult(source)
+
+    try:
+        started = perf_counter()
+        root = Tag.from_str(Path(source), lazy=lazy)
+        result.parse_time = perf_counter() - started
+
+        if transform is not None:
+            started = perf_counter()
+            root = transform(root) or root
+            result.transform_time = perf_counter() - started
+
+        started = perf_counter()
+
+        if output is None:
+            result.output = root.render(pretty)
+        else:
+            write_output(root, output, pretty)
+            result.output = output
+
+        result.render_time = perf_counter() - started
+    except Exception:
+        result.error = traceback.format_exc()
+
+    return result
+
+
+def convert_batch(
+    jobs: list[Job],
+    transform: Optional[Transform],
+    pretty: bool,
+    lazy: bool,
+) -> list[FileResult]:
+    results: list[FileResult] = []
+
+    for source, output, error in jobs:
+        if error is None:
+            results.append(convert_file(source, transform, output, pretty, lazy))
+        else:
+            result = FileResult(source)
+            result.error = error
+            results.append(result)
+
+    return results
+
+
+def convert_many(
+    sources: Iterable[PathLike],
+    transform: Optional[Transform] = None,
+    output_dir: Optional[PathLike] = None,
+    root: Optional[PathLike] = None,
+    workers: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_in_flight: Optional[int] = None,
+    pretty: bool = False,
+    lazy: bool = False,
+    executor: Optional[Executor] = None,
+) -> Iterator[FileResult]:
+    """
+
+    Parses each file of `sources`, passes the tree to `transform` and renders it, yielding `FileResult` for each file in the order of `sources`.
+
+    Files are written into `output_dir` under their own names, or under their paths relative to `root` if it's given;
+    without `output_dir`, rendered text is returned in `result.output`. A file whose output would overwrite its input,
+    or the output of an earlier file with the same name, fails instead. Outputs are replaced only after a successful render.
+    Failures (of parsing, transform, or writing) are reported in `result.error`, without stopping the batch.
+
+    Work is spread over `workers` processes (threads on free-threaded builds), `batch_size` files per task.
+    At most `max_in_flight` tasks (`workers * 2` by default) are submitted at a time, and `sources` are read only as needed,
+    so memory use grows with the number of files only by their output paths (kept to find collisions). With `workers=1`, files are converted in the current process.
+
+    `transform` is sent to worker processes, so it should be picklable (e.g. a module-level function).
+
+    """
+    workers = workers or cpu_count() or 1
+    max_in_flight = max_in_flight or workers * TASKS_PER_WORKER
+    directory = None if output_dir is None else os.fspath(output_dir)
+    jobs = plan_outputs(
+        (os.fspath(source) for source in sources),
+        directory,
+        None if root is None else os.path.abspath(root),
+    )
+    batches = iter(lambda: [*islice(jobs, batch_size)], [])
+
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+
+    if executor is None and workers < 2:
+        for batch in batches:
+            yield from convert_batch(batch, transform, pretty, lazy)
+        return
+
+    pool = executor
+
+    if pool is None:
+        pool = (
+            ThreadPoolExecutor(workers)
+            if is_free_threaded()
+            else ProcessPoolExecutor(workers)
+        )
+
+    pending: Deque[tuple[list[Job], Future[list[FileResult]]]] = deque()
+
+    try:
+        for batch in batches:
+            future = pool.submit(convert_batch, batch, transform, pretty, lazy)
+            pending.append((batch, future))
+
+            while len(pending) >= max_in_flight:
+                yield from batch_results(*pending.popleft())
+
+        while pending:
+            yield from batch_results(*pending.popleft())
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+        if executor is None:
+            pool.shutdown()
+
+
+def batch_results(
+    batch: list[Job], future: Future[list[FileResult]]
+) -> list[FileResult]:
+    """Results of a submitted batch, or failed results for all its files if the task itself failed (e.g. a worker crashed)"""
+    try:
+        return future.result()
+    except Exception:
+        error = traceback.format_exc()
+        results = [FileResult(source) for source, _, _ in batch]
+
+        for result in results:
+            result.error = error
+
+        return results
+
+
+def read_sources(name: str) -> list[str]:
+    """Paths listed in a file (or stdin for `-`), one per line"""
+    if name == "-":
+        return [line.strip() for line in sys.stdin if line.strip()]
+
+    with open(name, encoding="utf-8") as file:
+        return [line.strip() for line in file if line.strip()]
+
+
+def load_transform(name: str) -> Transform:
+    """Imports a transform given as `module:function`"""
+    module_name, _, function_name = name.partition(":")
+
+    if not function_name:
+        raise ValueError(f"transform should be given as module:function, got {name!r}")
+
+    return getattr(import_module(module_name), function_name)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m soda.batch",
+        description="Parses SVG files, applies a transform and renders them again",
+    )
+    parser.add_argument("sources", nargs="*", help="input files")
+    parser.add_argument(
+        "--from-file",
+        help="file with input paths, one per line ('-' for stdin)",
+    )
+    parser.add_argument(
+        "-o", "--output", required=True, help="directory to write results to"
+    )
+    parser.add_argument(
+        "--root",
+        help="keep output paths relative to this directory (only file names are kept by default)",
+    )
+    parser.add_argument("-t", "--transform", help="transform as module:function")
+    parser.add_argument("-j", "--workers", type=int, help="number of processes")
+    parser.add_argument(
+        "--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="files per task"
+    )
+    parser.add_argument("--pretty", action="store_true", help="pretty output")
+    parser.add_argument(
+        "--lazy", action="store_true", help="convert parsed elements on demand"
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="print timing of each file"
+    )
+
+    args = parser.parse_args(argv)
+    sources: list[str] = args.sources
+
+    if args.from_file:
+        sources = [*sources, *read_sources(args.from_file)]
+
+    transform = load_transform(args.transform) if args.transform else None
+
+    started = perf_counter()
+    converted = 0
+    failed = 0
+
+    for result in convert_many(
+        sources,
+        transform,
+        args.output,
+        root=args.root,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        pretty=args.pretty,
+        lazy=args.lazy,
+    ):
+        if result.ok:
+            converted += 1
+        else:
+            failed += 1
+            print(f"FAILED {result.source}\n{result.error}", file=sys.stderr)
+
+        if args.verbose:
+            print(
+                f"{result.source}: parse {result.parse_time * 1000:.1f} ms, "
+                f"transform {result.transform_time * 1000:.1f} ms, "
+                f"render {result.render_time * 1000:.1f} ms"
+            )
+
+    print(
+        f"{converted} converted, {failed} failed in {perf_counter() - started:.2f} s",
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,18 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from .disk_cache import DiskCache
+
+
 class config:
     decimal_length = 3
     replace_underscores = True
     strip_underscores = True
     tab_char: str = "    "
+    chunk_size: int = 64 * 1024
+    # store attribute values and text children in their final escaped form when they're set
+    serialize_values: bool = False
+    # `Tag.render` takes the output from (and stores it into) this cache, if it's set
+    render_cache: Optional[DiskCache] = None
@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+from typing import Hashable, Optional, Sequence
+
+from .formatting import format_number
+from .renderer import supports_render_into
+from .tags import FlatNode, Fragment, Literal, Node, Tag
+from .utils import escape, flatten_nodes
+
+# tags that can be replaced with a <use> referencing them
+USABLE_TAGS = frozenset(
+    {
+        "g",
+        "path",
+        "rect",
+        "circle",
+        "ellipse",
+        "line",
+        "polyline",
+        "polygon",
+        "text",
+        "image",
+    }
+)
+
+# tags that can contain <use> in place of their children
+CONTAINER_TAGS = frozenset(
+    {"svg", "g", "a", "defs", "symbol", "marker", "mask", "pattern"}
+)
+
+
+class Subtree:
+    """Structure shared by identical subtrees: its first occurrence, length of its compact render and its child subtrees"""
+
+    __slots__ = ("node", "length", "hoistable", "container", "children")
+
+    def __init__(self, node: Tag, length: int, hoistable: bool, container: bool):
+        self.node = node
+        self.length = length
+        self.hoistable = hoistable
+        self.container = container
+        self.children: list[int] = []
+
+
+class TreeIndex:
+    """
+
+    Structural index of a tree: each tag gets the number of its structure,
+    so identical subtrees (same tag names, attributes and children, including text) get the same number.
+
+    Tags that are not plain `Tag`s (e.g. custom components) get unique numbers.
+    Components that only define `stream` are not looked into, and are assumed to contain ids.
+
+    """
+
+    def __init__(self, root: Tag):
+        self.keys: dict[Hashable, int] = {}
+        self.subtrees: list[Subtree] = []
+        self.numbers: dict[int, int] = {}  # node id -> structure number
+        # structure number -> subtree has `id` attribute
+        self.has_id: dict[int, bool] = {}
+        self.ids: set[str] = set()
+
+        self.add(root)
+
+    def number(self, node: Tag) -> int:
+        return self.numbers[id(node)]
+
+    def add(self, root: Tag) -> None:
+        stack: list[tuple[Tag, bool]] = [(root, False)]
+
+        while stack:
+            node, children_done = stack.pop()
+
+            if id(node) in self.numbers:
+                continue
+
+            if not supports_render_into(type(node)):
+                self.numbers[id(node)] = self.add_opaque(node)
+                continue
+
+            children = flatten_nodes(node._children) if node._children else []
+
+            if not children_done:
+                stack.append((node, True))
+                stack.extend(
+                    (child, False)
+                    for child in children
+                    if isinstance(child, Tag) and not isinstance(child, Literal)
+                )
+                continue
+
+            self.numbers[id(node)] = self.add_node(node, children)
+
+    def add_opaque(self, node: Tag) -> int:
+        number = len(self.subtrees)
+        self.subtrees.append(Subtree(node, 0, hoistable=False, container=False))
+        self.has_id[number] = True
+        return number
+
+    def add_node(self, node: Tag, children: Sequence[FlatNode]) -> int:
+        key: list[Hashable] = [node.tag_name, node.self_closing]
+        child_numbers: list[int] = []
+        length = 0
+        has_id = False
+        unique = type(node) is not Tag
+
+        for attr, value in node._attributes.items():
+            if attr == "id":
+                has_id = True
+                self.ids.add(str(value))
+
+            if isinstance(value, Tag):
+                value = ("tag", value.render())
+            elif isinstance(value, (str, int, float)):
+                value = str(value)
+            else:
+                unique = True
+
+            key.append((attr, value))
+
+        key.append(None)  # attributes end here
+
+        for child in children:
+            if isinstance(child, (float, int)):
+                child = format_number(child)
+
+            if isinstance(child, str):
+                key.append(child)
+                length += len(escape(child))
+            elif isinstance(child, Literal):
+                text = str(child._children[0])
+                key.append(("literal", text, child.escape))
+                length += len(escape(text) if child.escape else text)
+            elif isinstance(child, Tag):
+                number = self.numbers[id(child)]
+                key.append(number)
+                child_numbers.append(number)
+                length += self.subtrees[number].length
+                has_id = has_id or self.has_id[number]
+            else:
+                unique = True
+
+        if unique:
+            # no other subtree could be the same
+            key.append(("unique", id(node)))
+
+        structure = tuple(key)
+        number = self.keys.get(structure)
+
+        if number is None:
+            number = self.keys[structure] = len(self.subtrees)
+            shell = Tag.raw(
+                node.tag_name,
+                self_closing=node.self_closing and not children,
+                **node._attributes,
+            )
+            subtree = Subtree(
+                node,
+                length + len(shell.render()),
+                hoistable=not unique and not has_id and node.tag_name in USABLE_TAGS,
+                container=node.tag_name in CONTAINER_TAGS and not node.frozen,
+            )
+            subtree.children = child_numbers
+            self.subtrees.append(subtree)
+            self.has_id[number] = has_id
+
+        return number
+
+    def new_id(self, prefix: str) -> str:
+        """Returns an id not used in the tree yet"""
+        new_id = f"{prefix}{len(self.ids)}"
+
+        while new_id in self.ids:
+            new_id += "-"
+
+        self.ids.add(new_id)
+        return new_id
+
+
+def find_repeats(
+    index: TreeIndex,
+    root: int,
+    min_size: int,
+    min_count: int,
+    reference_length: int,
+) -> list[int]:
+    """
+
+    Decides which subtrees to hoist, largest first.
+
+    A subtree is hoisted if it would be rendered at least `min_count` times in places where `<use>` is allowed,
+    counting occurrences inside of other hoisted subtrees only once, as they would be rendered once inside `<defs>`.
+    It also has to be longer than its references (`<use>` and `id`) combined.
+
+    """
+    subtrees = index.subtrees
+    total = [0] * len(subtrees)  # times a subtree is rendered
+    usable = [0] * len(subtrees)  # ...of them, in a container
+    total[root] = 1
+    hoisted: list[int] = []
+
+    # structure numbers are given to children before parents, so parents go first here
+    for number in range(root, -1, -1):
+        count = total[number]
+
+        if not count:
+            continue
+
+        subtree = subtrees[number]
+
+        usable_count = usable[number]
+
+        if (
+            number != root
+            and subtree.hoistable
+            and subtree.length >= min_size
+            and usable_count >= min_count
+            and (usable_count - 1) * subtree.length
+            > (usable_count + 1) * reference_length
+        ):
+            hoisted.append(number)
+            # rendered once inside <defs>, plus wherever it couldn't be replaced
+            count = 1 + count - usable_count
+
+        for child in subtree.children:
+            total[child] += count
+
+            if subtree.container:
+                usable[child] += count
+
+    return hoisted
+
+
+def dedupe(
+    root: Tag,
+    min_size: int = 64,
+    min_count: int = 2,
+    id_prefix: str = "soda-",
+) -> int:
+    """
+
+    Moves repeated subtrees of `root` into `<defs>` and replaces each of their occurrences with `<use href="#id">`.
+
+    Subtrees are compared structurally, so identical tags built separately are deduplicated too.
+    Only subtrees at least `min_size` characters long (rendered compactly) and repeated at least `min_count` times are moved.
+
+    The tree is changed in place, returns the number of moved subtrees.
+
+    """
+    if min_count < 2:
+        raise ValueError("min_count should be at least 2")
+
+    index = TreeIndex(root)
+    # length of `<use href="#id"/>`, which is about the same as of ` id="id"` added to the definition
+    reference_length = len(Tag.use(href=f"#{id_prefix}{len(index.ids)}").render())
+    hoisted = find_repeats(
+        index, index.number(root), min_size, min_count, reference_length
+    )
+
+    if not hoisted:
+        return 0
+
+    uses: dict[int, Tag] = {}
+    definitions: list[Tag] = []
+
+    for number in hoisted:
+        new_id = index.new_id(id_prefix)
+        uses[number] = Tag.use(href=f"#{new_id}")
+
+        # a copy, as the original could stay in places where it can't be replaced
+        definition = index.subtrees[number].node.copy()
+        definition["id"] = new_id
+        definitions.append(definition)
+
+    replace_repeats(index, [root, *definitions], uses)
+
+    defs = next(
+        (
+            child
+            for child in root.iter_raw()
+            if type(child) is Tag and child.tag_name == "defs"
+        ),
+        None,
+    )
+
+    if defs is None:
+        root.insert(0, Tag.defs(*definitions))
+    else:
+        defs(*definitions)
+
+    return len(hoisted)
+
+
+def replace_repeats(index: TreeIndex, roots: list[Tag], uses: dict[int, Tag]) -> None:
+    """Replaces hoisted subtrees in children of containers with their `<use>` tags"""
+    visited: set[int] = set()
+    stack = [*roots]
+
+    while stack:
+        tag = stack.pop()
+
+        if id(tag) in visited or not tag._children:
+            continue
+
+        visited.add(id(tag))
+        # frozen tags can't be changed, so they are never containers
+        container = tag.tag_name in CONTAINER_TAGS and not tag.frozen
+        lists: list[Sequence[Node]] = [
+            tag.edit_children() if container else tag._children
+        ]
+
+        while lists:
+            nodes = lists.pop()
+
+            for position, node in enumerate(nodes):
+                if isinstance(node, list):
+                    lists.append(node)
+                elif isinstance(node, Fragment):
+                    if node._children:
+                        frozen = node.frozen
+                        lists.append(node._children if frozen else node.edit_children())
+                elif isinstance(node, Tag) and not isinstance(node, Literal):
+                    number: Optional[int] = index.numbers.get(id(node))
+                    use = uses.get(number)  # type: ignore
+
+                    if container and use is not None and isinstance(nodes, list):
+                        nodes[position] = use
+                    elif supports_render_into(type(node)):
+                        stack.append(node)
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import marshal
+import os
+from hashlib import blake2b
+from pathlib import Path
+from tempfile import mkstemp
+from time import time
+from typing import Optional, Union
+
+from wordstreamer import Renderable
+
+from .config_mod import config
+from .output import render_context
+from .passthrough import SourceEntries
+from .renderer import TreeRenderer, supports_render_into
+from .tags import FlatNode, Fragment, Literal, Tag
+from .utils import Escaped, flatten_nodes
+
+# `render_into` implementations whose output depends only on the tag structure
+STRUCTURAL_RENDERERS = (Tag.render_into, Fragment.render_into, Literal.render_into)
+
+# markers in the key parts, bytes can't be confused with text and numbers
+TAG_START = b"<"
+TAG_END = b">"
+FRAGMENT = b"f"
+LITERAL = b"l"
+ESCAPED = b"e"
+TAG_VALUE = b"t"
+
+# parts of a tree key, bools are told apart from ints by marshal
+KeyPart = Union[str, bytes, int, float]
+
+# marshal format without references, so equal parts always give the same bytes
+MARSHAL_VERSION = 2
+
+# temporary files older than this (in seconds) are left from crashed writers
+STALE_TEMP_AGE = 3600
+
+TEMP_PREFIX = ".tmp-"
+SUFFIX = ".svg"
+
+
+def key_parts(root: Renderable) -> Optional[list[KeyPart]]:
+    """
+
+    Describes the tree as a flat list of strings, numbers and markers, so that two trees with the same parts render the same.
+
+    Returns None if the tree has nodes whose output can't be told from their structure (custom components, template slots,
+    tags parsed with `passthrough=True`, ...).
+
+    """
+    parts: list[KeyPart] = []
+    append = parts.append
+    # bytes on the stack are markers
+    stack: list[Union[FlatNode, bytes]] = [root]
+
+    while stack:
+        node = stack.pop()
+        cls = node.__class__
+
+        if isinstance(node, (str, int, float, bytes)):
+            if cls is Escaped:
+                append(ESCAPED)
+                append(str(node))
+            elif cls is str or cls is int or cls is float or cls is bytes:
+                append(node)
+            else:
+                # other types of text and numbers are not told apart by marshal
+                return None
+            continue
+
+        if not isinstance(node, Tag):
+            return None
+
+        if cls is not Tag and not (
+            type(node).render_into in STRUCTURAL_RENDERERS
+            and supports_render_into(type(node))
+        ):
+            return None
+
+        cache = getattr(node, "_cache", None)
+
+        if cache is not None and isinstance(cache.entries, SourceEntries):
+            # passthrough tags render their original text, which their structure doesn't tell
+            return None
+
+        if isinstance(node, Literal):
+            append(LITERAL)
+            append(node.escape)
+            append(str(node._children[0]))
+            continue
+
+        if isinstance(node, Fragment):
+            append(FRAGMENT)
+        else:
+            append(TAG_START)
+            append(node.tag_name)
+            append(node.self_closing)
+
+            if node.brackets is not Tag.brackets or node.key_value_sep != "=":
+                append("".join(node.brackets) + node.key_value_sep)
+
+        # the count keeps attributes apart from children, e.g. `Tag.g(x="y")` and `Tag.g("x", "y")`
+        append(len(node._attributes))
+        tag_values: list[Tag] = []
+
+        for key, value in node._attributes.items():
+            append(key)
+            value_cls = value.__class__
+
+            if isinstance(value, (str, int, float)) and (
+                value_cls is str or value_cls is int or value_cls is float
+            ):
+                append(value)
+            elif isinstance(value, Escaped):
+                append(ESCAPED)
+                append(str(value))
+            elif isinstance(value, Tag):
+                # described right after the attributes, before the children
+                append(TAG_VALUE)
+                tag_values.append(value)
+            else:
+                return None
+
+        stack.append(TAG_END)
+
+        if node._children:
+            stack.extend(reversed(flatten_nodes(node._children)))
+
+        if tag_values:
+            stack.extend(reversed(tag_values))
+
+    return parts
+
+
+def tree_key(
+    root: Renderable, pretty: bool = False, tab_size: int = 2
+) -> Optional[str]:
+    """
+
+    Content address of the rendered tree: a hash of its structure and render options, stable between processes.
+
+    Returns None for trees that can't be addressed by structure (check `key_parts`).
+
+    """
+    parts = key_parts(root)
+
+    if parts is None:
+        return None
+
+    # numbers are rendered with `decimal_length` places, so it's a part of the key
+    options = (bool(pretty), tab_size * bool(pretty), config.decimal_length)
+    data = marshal.dumps((parts, options), MARSHAL_VERSION)
+
+    return blake2b(data, digest_size=20).hexdigest()
+
+
+class DiskCache:
+    """
+
+    Rendered trees stored on disk, addressed by `tree_key`, so renders survive restarts and are shared between processes.
+
+    Files are written atomically (to a temporary file, then renamed), so readers never see partial output,
+    and several processes can use the same directory at once. When the files grow over `max_size` bytes,
+    least recently used ones are removed (use is tracked through modification times).
+
+    """
+
+    def __init__(self, directory: Union[str, os.PathLike], max_size: int = 256 << 20):
+        self.directory = Path(directory)
+        self.max_size = max_size
+        # estimate of the directory size, recounted on eviction (other processes write there too)
+        self.size: Optional[int] = None
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key: str) -> Path:
+        return self.directory / key[:2] / (key + SUFFIX)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.path(key)
+
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            # never stored, or evicted by another process
+            return None
+
+        try:
+            os.utime(path)  # marks as recently used
+        except FileNotFoundError:
+            pass
+
+        return data
+
+    def set(self, key: str, data: bytes) -> None:
+        path = self.path(key)
+        path.parent.mkdir(exist_ok=True)
+
+        descriptor, temp_name = mkstemp(prefix=TEMP_PREFIX, dir=path.parent)
+
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(data)
+
+            os.replace(temp_name, path)
+        except BaseException:
+            os.unlink(temp_name)
+            raise
+
+        if self.size is None:
+            self.size = self.used_size()
+        else:
+            self.size += len(data)
+
+        if self.size > self.max_size:
+            self.evict()
+
+    def files(self) -> list[tuple[str, os.stat_result]]:
+        """Paths and stats of all files in the cache, including temporary ones"""
+        files: list[tuple[str, os.stat_result]] = []
+
+        with os.scandir(self.directory) as subdirectories:
+            for subdirectory in subdirectories:
+                if not subdirectory.is_dir():
+                    continue
+
+                with os.scandir(subdirectory.path) as entries:
+                    for entry in entries:
+                        try:
+                            files.append((entry.path, entry.stat()))
+                        except FileNotFoundError:
+                            # removed by another process
+                            pass
+
+        return files
+
+    def used_size(self) -> int:
+        return sum(stat.st_size for _, stat in self.files())
+
+    def evict(self, target: Optional[int] = None) -> None:
+        """Removes least recently used files until the cache is not larger than `target` (90% of `max_size` by default)"""
+        if target is None:
+            target = self.max_size * 9 // 10
+
+        now = time()
+        files: list[tuple[float, int, str]] = []
+
+        for path, stat in self.files():
+            if os.path.basename(path).startswith(TEMP_PREFIX):
+                if now - stat.st_mtime > STALE_TEMP_AGE:
+                    remove(path)
+                continue
+
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        files.sort()
+        size = sum(file_size for _, file_size, _ in files)
+
+        for _, file_size, path in files:
+            if size <= target:
+                break
+
+            remove(path)
+            size -= file_size
+
+        self.size = size
+
+    def clear(self) -> None:
+        self.evict(target=0)
+
+    def render(self, root: Renderable, pretty: bool = False, tab_size: int = 2) -> str:
+        """Same as `root.render(pretty, tab_size)`, taking the output from the cache if it's there"""
+        renderer = TreeRenderer(render_context(pretty, tab_size))
+        key = tree_key(root, pretty, tab_size)
+
+        if key is None:
+            return renderer.render(root)
+
+        data = self.get(key)
+
+        if data is not None:
+            return data.decode("utf-8", "surrogatepass")
+
+        rendered = renderer.render(root)
+        self.set(key, rendered.encode("utf-8", "surrogatepass"))
+        return rendered
+
+
+def remove(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        # removed by another process
+        pass
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Iterable
+
+from .config_mod import config
+
+# integers in [-CACHED_RANGE, CACHED_RANGE] (and halves between them) are formatted once per `config.decimal_length`
+CACHED_RANGE = 1024
+
+# strings of cached integers don't depend on `config.decimal_length`, so ints skip the config lookup
+INT_STRINGS: dict[float, str] = {
+    i: str(i) for i in range(-CACHED_RANGE, CACHED_RANGE + 1)
+}
+
+_caches: dict[int, dict[float, str]] = {}
+
+
+def number_cache(decimal_length: int) -> dict[float, str]:
+    """Returns strings of common values (small integers and halves) for `decimal_length`"""
+    cache = _caches.get(decimal_length)
+
+    if cache is None:
+        cache = dict(INT_STRINGS)
+
+        # with no decimal places, halves are rounded (to a float, e.g. "2.0")
+        if decimal_length >= 1:
+            for i in range(-CACHED_RANGE, CACHED_RANGE):
+                cache[i + 0.5] = str(i + 0.5)
+
+        _caches[decimal_length] = cache
+
+    return cache
+
+
+@lru_cache(maxsize=None)
+def float_format(decimal_length: int) -> tuple[str, float]:
+    """
+
+    Returns a %-format for rounded floats and the limit of values it can be used for.
+
+    Below the limit, `"%.3f" % value` with trailing zeros stripped is the same as `str(round(value, 3))`
+    (both round to the same decimal, and it has at most 15 significant digits, so it's also the shortest repr), but faster.
+    Rounding to more than 4 places can give values that `str` writes in scientific notation, so the limit is 0 then.
+
+    """
+    if 1 <= decimal_length <= 4:
+        return f"%.{decimal_length}f", 10.0 ** (15 - decimal_length)
+    return "", 0.0
+
+
+def trunc(value: Any) -> Any:
+    """Rounds floats to `config.decimal_length` places (floats with integer values become `int`), leaves anything else as is"""
+    if isinstance(value, float):
+        if value.is_integer():
+            return int(value)
+        return round(value, config.decimal_length)
+    return value
+
+
+def format_number(value: Any) -> str:
+    """
+
+    Converts a value to string as `str(trunc(value))` does, taking common numbers from a cache.
+
+    Non-numeric values are converted with `str`.
+
+    """
+    cls = value.__class__
+
+    # bool is excluded by the exact class checks: True == 1, but str(True) is not "1"
+    if cls is int:
+        return INT_STRINGS.get(value) or str(value)
+
+    if cls is float:
+        decimal_length = config.decimal_length
+        cache = _caches.get(decimal_length) or number_cache(decimal_length)
+        cached = cache.get(value)
+
+        if cached is not None:
+            return cached
+
+    if isinstance(value, float):
+        if value.is_integer():
+            return str(int(value))
+
+        decimal_length = config.decimal_length
+        pattern, limit = float_format(decimal_length)
+
+        if -limit < value < limit:
+            text = (pattern % value).rstrip("0")
+            return text + "0" if text[-1] == "." else text
+
+        return str(round(value, decimal_length))
+
+    return str(value)
+
+
+def format_many(values: Iterable[Any]) -> list[str]:
+    """
+
+    Converts many values to strings, as `format_number` does for each of them.
+
+    NumPy arrays (and other objects with `tolist`) are converted to lists of Python numbers first, so they are formatted the same way.
+
+    """
+    decimal_length = config.decimal_length
+
+    if hasattr(values, "tolist"):
+        values = values.tolist()  # type: ignore
+
+    get_cached = (_caches.get(decimal_length) or number_cache(decimal_length)).get
+    get_int = INT_STRINGS.get
+    pattern, limit = float_format(decimal_length)
+    result: list[str] = []
+    append = result.append
+
+    for value in values:
+        cls = value.__class__
+
+        if cls is str:
+            append(value)
+            continue
+
+        if cls is int:
+            append(get_int(value) or str(value))
+            continue
+
+        if cls is float:
+            cached = get_cached(value)
+
+            if cached is not None:
+                append(cached)
+                continue
+
+        if isinstance(value, float):
+            if value.is_integer():
+                append(str(int(value)))
+            elif -limit < value < limit:
+                text = (pattern % value).rstrip("0")
+                append(text + "0" if text[-1] == "." else text)
+            else:
+                append(str(round(value, decimal_length)))
+        else:
+            append(str(value))
+
+    return result
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+from sys import getsizeof
+from typing import Dict, Iterable, Optional
+
+from wordstreamer import Renderable
+
+from .profiling import node_kind
+from .tags import (
+    EMPTY_ATTRIBUTES,
+    EMPTY_CHILDREN,
+    Chunk,
+    Fragment,
+    Literal,
+    ReadOnlyAttributes,
+    Tag,
+)
+
+# CPython keeps these ints preallocated, a tree holding them doesn't allocate anything
+SMALL_INTS = range(-5, 257)
+
+# classes keeping everything in slots, their (always empty) `__dict__` is not read, as reading it allocates one
+PLAIN_CLASSES = (Tag, Fragment, Literal)
+
+
+class SizeStats:
+    """
+
+    Memory counters for a group of nodes:
+
+    - `nodes`: number of distinct node objects
+    - `attributes`: number of attribute entries
+    - `children`: number of child entries (including the ones of nested lists)
+    - `string_bytes`: UTF-8 length of strings held as children and attribute values
+    - `object_bytes`: estimated size of Python objects owned by the nodes (the nodes, their containers, caches and values)
+
+    """
+
+    __slots__ = ("nodes", "attributes", "children", "string_bytes", "object_bytes")
+
+    def __init__(self) -> None:
+        self.nodes = 0
+        self.attributes = 0
+        self.children = 0
+        self.string_bytes = 0
+        self.object_bytes = 0
+
+    def add(self, other: SizeStats) -> None:
+        self.nodes += other.nodes
+        self.attributes += other.attributes
+        self.children += other.children
+        self.string_bytes += other.string_bytes
+        self.object_bytes += other.object_bytes
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}(nodes={self.nodes}, attributes={self.attributes}, children={self.children}, "
+            f"string_bytes={self.string_bytes}, object_bytes={self.object_bytes})"
+        )
+
+
+class TreeSize(SizeStats):
+    """Totals of a tree, with `by_kind` holding the same counters by tag name (class name for custom components, fragments and literals)"""
+
+    __slots__ = ("by_kind",)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.by_kind: Dict[str, SizeStats] = {}
+
+    def report(self, limit: Optional[int] = None) -> str:
+        """Counters as a text table, sorted by object bytes"""
+        rows = sorted(self.by_kind.items(), key=lambda item: -item[1].object_bytes)
+        lines = [
+            f"{'kind':<20} {'nodes':>8} {'attributes':>11} {'children':>9} {'string bytes':>13} {'object bytes':>13}"
+        ]
+
+        for kind, entry in [*rows[:limit], ("total", self)]:
+            lines.append(
+                f"{kind:<20} {entry.nodes:>8} {entry.attributes:>11} {entry.children:>9} "
+                f"{entry.string_bytes:>13} {entry.object_bytes:>13}"
+            )
+
+        return "\n".join(lines)
+
+
+def tree_size(root: Renderable) -> TreeSize:
+    """
+
+    Counts nodes, entries and memory of the tree of `root`, without recursion.
+
+    Every object is counted once, where it's met first: a tag used in several places, a frozen original shared by clones,
+    or a string repeated in many attributes add to the totals only once.
+    Shared placeholders (empty attributes and children), preallocated small ints and attribute names
+    (interned strings shared by all tags) are not counted.
+
+    Object bytes are estimated with `sys.getsizeof`, so they don't include allocator overhead,
+    and other renderables (like `TagArray`) count only their own object.
+
+    """
+    result = TreeSize()
+    by_kind = result.by_kind
+    seen: set[int] = {id(EMPTY_ATTRIBUTES), id(EMPTY_CHILDREN)}
+    stack: list[object] = [root]
+
+    def own(value: object) -> int:
+        """Size of a value not counted yet, 0 for counted ones"""
+        if id(value) in seen:
+            return 0
+
+        seen.add(id(value))
+        return getsizeof(value)
+
+    def values_size(values: Iterable[object], stats: SizeStats) -> None:
+        """Counts children or attribute values, pushing nodes to visit"""
+        pending = [*values]
+
+        while pending:
+            value = pending.pop()
+            cls = value.__class__
+
+            if isinstance(value, str):
+                size = own(value)
+
+                if size:
+                    stats.string_bytes += len(value.encode("utf-8", "surrogatepass"))
+                    stats.object_bytes += size
+            elif cls is int and value in SMALL_INTS:
+                pass
+            elif cls is int or cls is float:
+                stats.object_bytes += own(value)
+            elif cls is list or cls is tuple:
+                # nested lists of children
+                stats.object_bytes += own(value)
+                stats.children += len(value)  # type: ignore
+                pending.extend(value)  # type: ignore
+            elif value is None or value is True or value is False:
+                pass
+            elif isinstance(value, Renderable):
+                stack.append(value)
+            else:
+                stats.object_bytes += own(value)
+
+    def chunk_size(chunk: Chunk) -> int:
+        """Size of a cached output with its pieces (outputs of nested tags it references are counted once, as everything else)"""
+        size = 0
+        pending = [chunk]
+
+        while pending:
+            item = pending.pop()
+            item_size = own(item)
+
+            if item_size and isinstance(item, tuple):
+                pending.extend(item)
+
+            size += item_size
+
+        return size
+
+    while stack:
+        node = stack.pop()
+
+        if id(node) in seen:
+            continue
+
+        stats = SizeStats()
+        stats.nodes = 1
+        stats.object_bytes = own(node)
+
+        if isinstance(node, Tag) and hasattr(node, "_children"):
+            stats.children = len(node._children)
+            stats.object_bytes += own(node._children)
+            values_size(node._children, stats)
+
+            attributes = node._attributes
+
+            if isinstance(attributes, ReadOnlyAttributes):
+                # frozen and shared attributes wrap a dict
+                stats.object_bytes += own(attributes)
+                attributes = attributes.items_
+
+            stats.attributes = len(attributes)
+            stats.object_bytes += own(attributes)
+
+            values_size(attributes.values(), stats)
+
+            cache = node._cache
+
+            if cache is not None:
+                stats.object_bytes += own(cache) + own(cache.entries)
+                stats.object_bytes += own(cache.parents)
+                stats.object_bytes += sum(map(own, cache.parents))
+                stats.object_bytes += sum(map(chunk_size, cache.entries.values()))
+                stats.object_bytes += sum(map(own, cache.entries))
+
+            cached_hash = getattr(node, "_hash", None)
+
+            if cached_hash is not None:
+                stats.object_bytes += own(cached_hash) + own(cached_hash.parents)
+                stats.object_bytes += sum(map(own, cached_hash.parents))
+
+                if cached_hash.snapshot is not None:
+                    # the frozen copy clones are made from is kept alive by the tag (and shared with its clones)
+                    stack.append(cached_hash.snapshot)
+
+        if node.__class__ not in PLAIN_CLASSES:
+            # custom components keep their own state in `__dict__`
+            instance_dict = getattr(node, "__dict__", None)
+
+            if instance_dict is not None:
+                stats.object_bytes += own(instance_dict)
+                values_size(instance_dict.values(), stats)
+
+        kind = node_kind(node)  # type: ignore
+        entry = by_kind.get(kind)
+
+        if entry is None:
+            entry = by_kind[kind] = SizeStats()
+
+        entry.add(stats)
+        result.add(stats)
+
+    return result
@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import re
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+from .formatting import format_number
+from .paths import compact_path, split_path
+from .renderer import supports_render_into
+from .tags import Literal, Node, Tag
+from .utils import flatten_nodes
+
+OptimizerPass = Callable[[Tag], None]
+
+# tags that only group their children, and render nothing without them
+EMPTY_CONTAINERS = frozenset({"g", "defs", "symbol", "a"})
+
+# default values of presentation attributes, as written in the spec (and their common spellings)
+DEFAULT_VALUES: dict[str, frozenset[str]] = {
+    "fill": frozenset({"black", "#000", "#000000"}),
+    "fill-opacity": frozenset({"1"}),
+    "fill-rule": frozenset({"nonzero"}),
+    "clip-rule": frozenset({"nonzero"}),
+    "stroke": frozenset({"none"}),
+    "stroke-width": frozenset({"1"}),
+    "stroke-opacity": frozenset({"1"}),
+    "stroke-linecap": frozenset({"butt"}),
+    "stroke-linejoin": frozenset({"miter"}),
+    "stroke-miterlimit": frozenset({"4"}),
+    "stroke-dasharray": frozenset({"none"}),
+    "stroke-dashoffset": frozenset({"0"}),
+    "visibility": frozenset({"visible"}),
+    "font-style": frozenset({"normal"}),
+    "font-weight": frozenset({"normal", "400"}),
+    "text-anchor": frozenset({"start"}),
+    "opacity": frozenset({"1"}),
+    "display": frozenset({"inline"}),
+}
+
+# presentation attributes not inherited by children, so their defaults can be dropped anywhere
+NOT_INHERITED = frozenset({"opacity", "display"})
+
+# tags whose contents are rendered where they're referenced, inheriting from there
+REFERENCED_CONTAINERS = frozenset(
+    {"defs", "symbol", "marker", "pattern", "clipPath", "mask"}
+)
+
+COLOR_ATTRIBUTES = frozenset(
+    {"fill", "stroke", "color", "stop-color", "flood-color", "lighting-color"}
+)
+
+HEX_COLOR = re.compile(r"#([0-9a-fA-F]{6})")
+RGB_COLOR = re.compile(r"rgb\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)")
+
+
+def editable(node: object) -> bool:
+    """Tags the optimizer can look into and change: plain tags and their subclasses rendered the same way, unless frozen"""
+    return (
+        isinstance(node, Tag)
+        and not isinstance(node, Literal)
+        and supports_render_into(type(node))
+        and not node.frozen
+    )
+
+
+def walk(root: Tag) -> Iterator[Tag]:
+    """Yields editable tags of the tree, parents before children"""
+    stack = [root] if editable(root) else []
+
+    while stack:
+        tag = stack.pop()
+
+        if tag.shared:
+            # children of a clone are frozen until it gets its own copies
+            tag.unshare()
+
+        yield tag
+
+        if tag._children:
+            stack.extend(
+                child
+                for child in reversed(flatten_nodes(tag._children))
+                if isinstance(child, Tag) and editable(child)
+            )
+
+
+def attribute_text(value: Node) -> Optional[str]:
+    """Value of a plain (string or number) attribute, None for anything else"""
+    if isinstance(value, str):
+        return value.strip()
+
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return format_number(value)
+
+    return None
+
+
+def collapse_groups(root: Tag) -> None:
+    """Replaces `<g>` tags without attributes with their children"""
+    for tag in walk(root):
+        if not any(is_bare_group(child) for child in flatten_nodes(tag._children)):
+            continue
+
+        children: list[Node] = []
+        pending = [*reversed(flatten_nodes(tag._children))]
+
+        while pending:
+            child = pending.pop()
+
+            if is_bare_group(child):
+                if child.shared:  # type: ignore
+                    # its children are moved into a changeable tag, so they should be changeable too
+                    child.unshare()  # type: ignore
+
+                pending.extend(reversed(flatten_nodes(child._children)))  # type: ignore
+            else:
+                children.append(child)
+
+        tag.children = children
+
+
+def is_bare_group(node: object) -> bool:
+    return type(node) is Tag and node.tag_name == "g" and not node._attributes
+
+
+def remove_defaults(root: Tag) -> None:
+    """
+
+    Removes presentation attributes set to their default values.
+
+    Inherited attributes are removed only if no ancestor sets them to something else,
+    and are kept under tags with `style`, `class` or `id` (as they could be styled or referenced), in referenced containers (as `<defs>`),
+    and everywhere in documents with a `<style>` tag.
+
+    """
+    # None stands for "inherited values are unknown"
+    stack: list[tuple[Tag, Optional[dict[str, str]]]] = [
+        (root, None if has_stylesheet(root) else {})
+    ]
+
+    while stack:
+        tag, inherited = stack.pop()
+
+        if not editable(tag):
+            continue
+
+        if tag.shared:
+            tag.unshare()
+
+        attributes = tag._attributes
+
+        if inherited is not None and (
+            tag.tag_name in REFERENCED_CONTAINERS
+            or "style" in attributes
+            or "class" in attributes
+            or "id" in attributes
+        ):
+            inherited = None
+
+        removed: list[str] = []
+        changed: dict[str, str] = {}
+
+        for key, value in attributes.items():
+            defaults = DEFAULT_VALUES.get(key)
+            text = attribute_text(value)
+
+            if defaults is None or text is None:
+                continue
+
+            if key not in NOT_INHERITED:
+                changed[key] = text
+
+            if text in defaults and (
+                key in NOT_INHERITED
+                or (inherited is not None and inherited.get(key, text) in defaults)
+            ):
+                removed.append(key)
+
+        if removed:
+            current = tag.edit_attributes()
+
+            for key in removed:
+                del current[key]
+
+        if inherited is not None and changed:
+            inherited = {**inherited, **changed}
+
+        stack.extend(
+            (child, inherited)
+            for child in flatten_nodes(tag._children)
+            if isinstance(child, Tag)
+        )
+
+
+def has_stylesheet(root: Tag) -> bool:
+    """Checks if there's a `<style>` tag anywhere in the tree, including frozen parts"""
+    stack = [root]
+
+    while stack:
+        tag = stack.pop()
+
+        if tag.tag_name == "style":
+            return True
+
+        stack.extend(
+            child
+            for child in flatten_nodes(tag._children)
+            if isinstance(child, Tag) and supports_render_into(type(child))
+        )
+
+    return False
+
+
+def short_color(color: str) -> str:
+    """Shortest hex form of `#rrggbb` and `rgb(r, g, b)` colors, other values are returned as is"""
+    rgb = RGB_COLOR.fullmatch(color)
+
+    if rgb is not None:
+        channels = [int(channel) for channel in rgb.groups()]
+
+        if max(channels) > 255:
+            return color
+
+        color = "#" + "".join(f"{channel:02x}" for channel in channels)
+
+    if not HEX_COLOR.fullmatch(color):
+        return color
+
+    color = color.lower()
+
+    if color[1] == color[2] and color[3] == color[4] and color[5] == color[6]:
+        return "#" + color[1] + color[3] + color[5]
+
+    return color
+
+
+def shorten_colors(root: Tag) -> None:
+    """Writes colors in their shortest hex form: `#ffffff` -> `#fff`, `rgb(255, 0, 0)` -> `#f00`"""
+    for tag in walk(root):
+        for key, value in tag._attributes.items():
+            if key not in COLOR_ATTRIBUTES or not isinstance(value, str):
+                continue
+
+            color = short_color(value.strip())
+
+            if color != value:
+                tag[key] = color
+
+
+def remove_empty(root: Tag) -> None:
+    """Removes containers (`<g>`, `<defs>`, `<symbol>`, `<a>`) without children, including those left empty by removals"""
+    for tag in reversed([*walk(root)]):
+        children = flatten_nodes(tag._children)
+
+        if any(is_empty_container(child) for child in children):
+            tag.children = [
+                child for child in children if not is_empty_container(child)
+            ]
+
+
+def is_empty_container(node: object) -> bool:
+    return (
+        type(node) is Tag
+        and node.tag_name in EMPTY_CONTAINERS
+        and not node.frozen
+        and not node._children
+    )
+
+
+def compact_paths(root: Tag) -> None:
+    """Rewrites `d` attributes of paths with `compact_path`, leaving invalid paths as they are"""
+    for tag in walk(root):
+        value = tag._attributes.get("d")
+
+        if not isinstance(value, str):
+            continue
+
+        parts = split_path(value)
+
+        if parts is None:
+            continue
+
+        compact = compact_path(parts)
+
+        if len(compact) < len(value):
+            tag["d"] = compact
+
+
+PASSES: dict[str, OptimizerPass] = {
+    "collapse_groups": collapse_groups,
+    "remove_defaults": remove_defaults,
+    "shorten_colors": shorten_colors,
+    "remove_empty": remove_empty,
+    "compact_paths": compact_paths,
+}
+
+
+def rendered_size(root: Tag) -> int:
+    return len(root.render().encode())
+
+
+def optimize(
+    root: Tag,
+    passes: Iterable[Union[str, OptimizerPass]] = PASSES,
+) -> dict[str, int]:
+    """
+
+    Optimizes the tree of `root` in place, running `passes` in order:
+
+    - `collapse_groups`: replaces `<g>` tags without attributes with their children
+    - `remove_defaults`: removes presentation attributes set to their defaults (e.g. `stroke-width="1"`) where it's safe
+    - `shorten_colors`: `#ffffff` -> `#fff`, `rgb(255, 0, 0)` -> `#f00`
+    - `remove_empty`: removes empty `<g>`, `<defs>`, `<symbol>` and `<a>` tags
+    - `compact_paths`: compacts `d` attributes (as `Path.build(..., compact=True)` does)
+
+    Passes are given by name, or as functions changing the tree. Frozen tags, literals and custom components are left as they are.
+
+    Returns the number of bytes (of compact UTF-8 render) saved by each pass: `{"collapse_groups": 120, ...}`
+
+    """
+    resolved: list[tuple[str, OptimizerPass]] = []
+
+    for optimizer_pass in passes:
+        if not isinstance(optimizer_pass, str):
+            resolved.append((optimizer_pass.__name__, optimizer_pass))
+        elif optimizer_pass in PASSES:
+            resolved.append((optimizer_pass, PASSES[optimizer_pass]))
+        else:
+            raise ValueError(
+                f"unknown optimizer pass: {optimizer_pass!r} (available: {', '.join(PASSES)})"
+            )
+
+    saved: dict[str, int] = {}
+    size = rendered_size(root)
+
+    for name, optimizer_pass in resolved:
+        optimizer_pass(root)
+
+        new_size = rendered_size(root)
+        saved[name] = saved.get(name, 0) + size - new_size
+        size = new_size
+
+    return saved
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import zlib
+from asyncio import sleep
+from codecs import getincrementalencoder
+from io import TextIOBase
+from typing import AsyncIterator, Callable, Iterator, Optional, Union
+
+from wordstreamer import Renderable
+
+from .config_mod import config
+from .renderer import TreeRenderer
+
+Sink = Union[bytearray, object]
+
+# zlib window bits for gzip format (header and checksum) with the largest window
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def render_context(pretty: bool, tab_size: int) -> dict[str, object]:
+    """Same context as `Tag.render` uses"""
+    return {
+        "pretty": pretty,
+        "tab_size": tab_size * pretty,
+    }
+
+
+def iter_chunks(
+    node: Renderable,
+    chunk_size: Optional[int] = None,
+    pretty: bool = False,
+    tab_size: int = 2,
+) -> Iterator[str]:
+    """
+
+    Renders `node` as a sequence of string chunks of at least `chunk_size` characters (except the last one).
+
+    Chunk size defaults to `config.chunk_size`.
+
+    """
+    renderer = TreeRenderer(render_context(pretty, tab_size))
+    return renderer.iter_chunks(node, chunk_size or config.chunk_size)
+
+
+def iter_encoded(
+    node: Renderable,
+    encoding: str = "utf-8",
+    chunk_size: Optional[int] = None,
+    pretty: bool = False,
+    tab_size: int = 2,
+) -> Iterator[bytes]:
+    """Same as `iter_chunks`, but chunks are encoded with `encoding`"""
+    # incremental encoder keeps multi-chunk output valid for encodings with BOM (e.g. utf-16)
+    encoder = getincrementalencoder(encoding)()
+
+    for chunk in iter_chunks(node, chunk_size, pretty, tab_size):
+        yield encoder.encode(chunk)
+
+    tail = encoder.encode("", final=True)
+
+    if tail:
+        yield tail
+
+
+def write_to(
+    node: Renderable,
+    sink: Sink,
+    encoding: str = "utf-8",
+    chunk_size: Optional[int] = None,
+    pretty: bool = False,
+    tab_size: int = 2,
+) -> int:
+    """
+
+    Renders `node` into `sink` chunk by chunk, without building the whole output in memory.
+
+    `sink` could be:
+
+    - a `bytearray` (chunks are appended to it)
+    - a socket (anything with `sendall`)
+    - a text file (`io.TextIOBase`, gets strings and does the encoding itself)
+    - a binary file or any other object with `write`
+
+    Returns the number of bytes written (characters for text files).
+
+    """
+    if isinstance(sink, TextIOBase):
+        written = 0
+
+        for chunk in iter_chunks(node, chunk_size, pretty, tab_size):
+            sink.write(chunk)
+            written += len(chunk)
+
+        return written
+
+    return write_chunks(
+        sink, iter_encoded(node, encoding, chunk_size, pretty, tab_size)
+    )
+
+
+def binary_writer(sink: Sink) -> Callable[[bytes], object]:
+    if isinstance(sink, bytearray):
+        return sink.extend
+    elif hasattr(sink, "sendall"):
+        return sink.sendall  # type: ignore
+    elif hasattr(sink, "write") and not isinstance(sink, TextIOBase):
+        return sink.write  # type: ignore
+
+    raise TypeError(f"can't write bytes to {type(sink).__name__}")
+
+
+def write_chunks(sink: Sink, chunks: Iterator[bytes]) -> int:
+    """Writes binary `chunks` into `sink` (as `write_to` does), returns the number of bytes written"""
+    write = binary_writer(sink)
+    written = 0
+
+    for chunk in chunks:
+        write(chunk)
+        written += len(chunk)
+
+    return written
+
+
+def iter_gzip(
+    node: Renderable,
+    level: int = 6,
+    encoding: str = "utf-8",
+    chunk_size: Optional[int] = None,
+    pretty: bool = False,
+    tab_size: int = 2,
+) -> Iterator[bytes]:
+    """
+
+    Same as `iter_encoded`, but the output is compressed on the fly into gzip format (e.g. for `.svgz` files or `Content-Encoding: gzip`).
+
+    `level` is the compression level, from 0 (none) to 9 (best, slowest). Only one chunk is held in memory at a time.
+
+    """
+    # the header written by zlib has no timestamp, so the same tree always gives the same bytes
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+
+    for chunk in iter_encoded(node, encoding, chunk_size, pretty, tab_size):
+        compressed = compressor.compress(chunk)
+
+        if compressed:
+            yield compressed
+
+    yield compressor.flush()
+
+
+def write_gzip(
+    node: Renderable,
+    sink: Sink,
+    level: int = 6,
+    encoding: str = "utf-8",
+    chunk_size: Optional[int] = None,
+    pretty: bool = False,
+    tab_size: int = 2,
+) -> int:
+    """
+
+    Renders `node` into a binary `sink` (anything `write_to` accepts, except text files), compressed with gzip.
+
+    Returns the number of compressed bytes written.
+
+    """
+    return write_chunks(
+        sink, iter_gzip(node, level, encoding, chunk_size, pretty, tab_size)
+    )
+
+
+async def astream(
+    node: Renderable,
+    encoding: str = "utf-8",
+    chunk_size: Optional[int] = None,
+    pretty: bool = False,
+    tab_size: int = 2,
+) -> AsyncIterator[bytes]:
+    """
+
+    Asynchronous version of `iter_encoded`, e.g. for streaming HTTP responses.
+
+    Control is given back to the event loop after each chunk, so rendering a large tree doesn't block other tasks
+    for longer than it takes to render `chunk_size` characters.
+
+    """
+    for chunk in iter_encoded(node, encoding, chunk_size, pretty, tab_size):
+        yield chunk
+        await sleep(0)
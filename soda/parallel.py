@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import sys
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+from multiprocessing import get_context, get_start_method
+from os import cpu_count
+from typing import Optional, Sequence
+
+from wordstreamer import Renderable
+
+from .output import render_context
+from .renderer import Payload, Pending, TreeRenderer, supports_render_into
+from .tags import Tag
+
+# number of batches per worker, to even out the load when subtrees differ in size
+BATCHES_PER_WORKER = 4
+
+# subtrees to render in a forked worker, set by the pool initializer (arguments of forked workers are inherited, not pickled)
+_forked_subtrees: Sequence[Renderable] = ()
+
+
+class PrerenderedRenderer(TreeRenderer):
+    """Renders a tree, taking some of its nodes from a dict of already rendered strings (by node id)"""
+
+    # substituted nodes are not visited, so the caches containing them couldn't be invalidated by their changes
+    store_cache = False
+
+    def __init__(self, context: Payload, rendered: dict[int, str]):
+        super().__init__(context)
+        self.rendered = rendered
+
+    def expand(self, node: Renderable, out: list[str], stack: list[Pending]) -> None:
+        rendered = self.rendered.get(id(node))
+
+        if rendered is None:
+            super().expand(node, out, stack)
+        else:
+            out.append(rendered)
+
+
+def split_tree(root: Renderable, depth: int) -> list[Renderable]:
+    """
+
+    Returns distinct nodes found `depth` levels below `root`.
+
+    Only tags rendered by `TreeRenderer` itself are split: custom components are treated as leaves.
+
+    """
+    level: list[Renderable] = [root]
+
+    for _ in range(depth):
+        next_level: list[Renderable] = []
+
+        for node in level:
+            if not isinstance(node, Tag) or not supports_render_into(type(node)):
+                continue
+
+            next_level.extend(child for child in node if isinstance(child, Renderable))
+
+        level = next_level
+
+    unique = {id(node): node for node in level}
+    return [*unique.values()]
+
+
+def render_batch(context: Payload, nodes: Sequence[Renderable]) -> list[str]:
+    renderer = TreeRenderer(context)
+    return [renderer.render(node) for node in nodes]
+
+
+def set_forked_subtrees(subtrees: Sequence[Renderable]) -> None:
+    global _forked_subtrees
+    _forked_subtrees = subtrees
+
+
+def render_forked_batch(context: Payload, indices: range) -> list[str]:
+    return render_batch(context, [_forked_subtrees[i] for i in indices])
+
+
+def can_fork() -> bool:
+    """Checks if workers could be forked: `fork` is the start method, and there are no other threads (a forked copy could inherit locks they hold)"""
+    return get_start_method() == "fork" and threading.active_count() == 1
+
+
+def is_free_threaded() -> bool:
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def render_parallel(
+    root: Renderable,
+    workers: Optional[int] = None,
+    depth: int = 1,
+    pretty: bool = False,
+    tab_size: int = 2,
+    executor: Optional[Executor] = None,
+) -> str:
+    """
+
+    Renders `root`, splitting the work between `workers` processes.
+
+    Subtrees found `depth` levels below `root` are rendered in parallel and then put in place,
+    so the output is the same as of `root.render(pretty, tab_size)`.
+
+    By default, a `ProcessPoolExecutor` is created for each call (a `ThreadPoolExecutor` on free-threaded builds).
+    If `fork` is the start method of `multiprocessing` and the process runs no other threads, workers inherit the tree from the parent process;
+    otherwise subtrees are pickled.
+
+    A pool can be reused between calls by passing it as `executor`, but then subtrees are always pickled,
+    which costs about as much as rendering them, so it pays off only with thread pools on free-threaded builds.
+
+    """
+    context = render_context(pretty, tab_size)
+    subtrees = split_tree(root, depth)
+    workers = workers or cpu_count() or 1
+
+    if len(subtrees) < 2 or workers < 2:
+        return TreeRenderer(context).render(root)
+
+    batch_count = min(len(subtrees), workers * BATCHES_PER_WORKER)
+    indices = [range(i, len(subtrees), batch_count) for i in range(batch_count)]
+    batches = [subtrees[i::batch_count] for i in range(batch_count)]
+
+    if executor is not None:
+        results = [*executor.map(render_batch, repeat(context), batches)]
+    elif is_free_threaded():
+        with ThreadPoolExecutor(workers) as pool:
+            results = [*pool.map(render_batch, repeat(context), batches)]
+    elif can_fork():
+        # pickling a tree costs about as much as rendering it,
+        # so forked workers get subtrees from the parent memory
+        with ProcessPoolExecutor(
+            workers,
+            mp_context=get_context("fork"),
+            initializer=set_forked_subtrees,
+            initargs=(subtrees,),
+        ) as pool:
+            results = [*pool.map(render_forked_batch, repeat(context), indices)]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = [*pool.map(render_batch, repeat(context), batches)]
+
+    rendered: dict[int, str] = {}
+
+    for batch, strings in zip(batches, results):
+        for node, string in zip(batch, strings):
+            rendered[id(node)] = string
+
+    return PrerenderedRenderer(context, rendered).render(root)
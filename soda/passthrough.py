@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import os
+from mmap import mmap
+from typing import Optional, Union
+from weakref import ref
+from xml.parsers import expat
+
+from .config_mod import config
+from .tags import CacheKey, Literal, RenderCache, Tag
+from .utils import serialize_attribute
+
+# compact render options, the only ones original text can stand for
+COMPACT_KEY: CacheKey = (False, 0, 0)
+
+Buffer = Union[bytes, bytearray, memoryview, mmap]
+
+
+class SourceEntries(dict):
+    """
+
+    Render cache entries of a parsed tag that also stand for its original text: `source[start:end]`, returned as the compact render
+    until the cache is cleared (which any change of the tag, or of any tag inside it, does).
+
+    `source` is the document as `bytes` owned by the tree, shared by all of its tags.
+
+    """
+
+    __slots__ = ("source", "start", "end", "encoding")
+
+    def __init__(self, source: bytes, start: int, end: int, encoding: str):
+        super().__init__()
+        self.source: Optional[bytes] = source
+        self.start = start
+        self.end = end
+        self.encoding = encoding
+
+    def get(self, key: CacheKey, default: Optional[str] = None) -> Optional[str]:  # type: ignore
+        value = dict.get(self, key)
+
+        if value is None and key == COMPACT_KEY and self.source is not None:
+            # sliced on each render, so the tree doesn't hold a copy of the document for every level
+            return str(self.source[self.start : self.end], self.encoding)
+
+        return default if value is None else value
+
+    def clear(self) -> None:
+        self.source = None
+        dict.clear(self)
+
+
+def read_source(source: object) -> tuple[Buffer, Optional[str]]:
+    """Document bytes, with encoding to use instead of the declared one (for text, which is encoded here)"""
+    if isinstance(source, str):
+        return source.encode("utf-8"), "utf-8"
+
+    if isinstance(source, (bytes, bytearray, memoryview, mmap)):
+        return source, None
+
+    if isinstance(source, os.PathLike):
+        with open(source, "rb") as file:
+            return file.read(), None
+
+    if hasattr(source, "read"):
+        return source.read(), None  # type: ignore
+
+    raise TypeError(f"can't parse XML from {type(source).__name__}")
+
+
+def check_encoding(data: bytes, encoding: Optional[str]) -> None:
+    """Raises ValueError for encodings where markup isn't single bytes (UTF-16, UTF-32), as tag offsets are found by searching for them"""
+    # byte order marks, or a null byte next to `<` of the first tag
+    if data[:2] in (b"\xff\xfe", b"\xfe\xff") or b"\0" in data[:4]:
+        encoding = "utf-16"
+
+    if encoding is None:
+        return
+
+    try:
+        compatible = "<>".encode(encoding, "replace") == b"<>"
+    except LookupError:
+        # unknown encodings are reported by the parser
+        return
+
+    if not compatible:
+        raise ValueError(
+            f"passthrough parsing needs an ASCII-compatible encoding, got {encoding}"
+        )
+
+
+def parse_passthrough(source: object) -> Tag:
+    """
+
+    Parses a document (anything `Tag.from_str` accepts) into tags that remember their original text:
+    until a tag or anything inside it is changed, its compact render is its text from the document, copied as is.
+
+    Tag and attribute names are kept as written (with their prefixes, `xmlns` declarations are attributes),
+    text is stripped of surrounding whitespace, and comments and processing instructions are kept as non-escaping literals.
+
+    Changes are tracked the same way as for `tag.enable_cache()`, through tag methods and changes of `tag.children` / `tag.attributes`.
+
+    """
+    buffer, encoding = read_source(source)
+    # copied unless it's bytes already: tags render from it later, after a mmap could be closed or a bytearray changed
+    # (and offsets of tag ends are searched for with `find`, which memoryview doesn't have)
+    data = buffer if isinstance(buffer, bytes) else bytes(buffer)
+    check_encoding(data, encoding)
+
+    parser = expat.ParserCreate(encoding)
+    parser.buffer_text = True
+
+    # the tag being parsed, along with its own children list and start offset
+    stack: list[tuple[Tag, list, int]] = []
+    root: list[Tag] = []
+    # text is reported in pieces, it's joined before being added
+    text_parts: list[str] = []
+    # offset of the last start tag, reset by any other event, to tell `<a/>` from `<a></a>`
+    last_start = -1
+    declared = ["utf-8"]
+
+    def add_child(node: object) -> None:
+        nonlocal last_start
+        last_start = -1
+
+        if stack:
+            stack[-1][1].append(node)
+
+    def flush_text() -> None:
+        if text_parts:
+            content = "".join(text_parts)
+            text_parts.clear()
+
+            if content.strip():
+                add_child(Literal(content))
+
+    def start(name: str, attributes: dict[str, str]) -> None:
+        nonlocal last_start
+        flush_text()
+
+        # names are set directly, `Tag.raw(name, **attributes)` would take attributes like `self_closing` as its own arguments
+        tag = Tag.raw(name)
+
+        if attributes:
+            tag._attributes = (
+                {key: serialize_attribute(value) for key, value in attributes.items()}
+                if config.serialize_values
+                else attributes
+            )
+
+        tag._cache = RenderCache()
+
+        if stack:
+            parent = stack[-1][0]
+            tag._cache.parents.append(ref(parent))
+            stack[-1][1].append(tag)
+        else:
+            root.append(tag)
+
+        offset = parser.CurrentByteIndex
+        stack.append((tag, [], offset))
+        last_start = offset
+
+    def end(name: str) -> None:
+        nonlocal last_start
+        flush_text()
+
+        tag, children, offset = stack.pop()
+        index = parser.CurrentByteIndex
+
+        if last_start == offset and data[index - 2 : index] == b"/>":
+            # empty-element tag (`<a/>`), the index is right after it
+            end_offset = index
+        else:
+            # the index is at the end tag (`</a>`)
+            end_offset = data.find(b">", index) + 1
+
+        last_start = -1
+
+        if children:
+            tag._children = children
+
+        tag._cache.entries = SourceEntries(  # type: ignore
+            data, offset, end_offset, encoding or declared[0]
+        )
+
+    def comment(content: str) -> None:
+        flush_text()
+        add_child(Literal(f"<!--{content}-->", escape=False))
+
+    def instruction(target: str, content: str) -> None:
+        flush_text()
+        add_child(Literal(f"<?{target} {content}?>", escape=False))
+
+    def declaration(
+        version: str, declared_encoding: Optional[str], standalone: int
+    ) -> None:
+        if declared_encoding and encoding is None:
+            # text is parsed as UTF-8 regardless of what it declares
+            check_encoding(data, declared_encoding)
+            declared[0] = declared_encoding
+
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = text_parts.append
+    parser.CommentHandler = comment
+    parser.ProcessingInstructionHandler = instruction
+    parser.XmlDeclHandler = declaration
+
+    parser.Parse(data, True)
+
+    return root[0]
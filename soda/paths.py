@@ -1,12 +1,12 @@
 from __future__ import annotations
 
-from .utils import trunc
+import re
+from typing import Optional
 
+from .formatting import format_number
 
-def value_to_str(value: object) -> str:
-    if isinstance(value, float):
-        return str(trunc(value))
-    return str(value)
+# kept for compatibility, same as `format_number`
+value_to_str = format_number
 
 
 class Path:
@@ -20,7 +20,7 @@ class Path:
     @staticmethod
     def moveto(x: float = 0, y: float = 0, *, relative: bool = False) -> str:
         prefix = "Mm"[relative]
-        return " ".join(map(value_to_str, [prefix, x, y]))
+        return " ".join(map(format_number, [prefix, x, y]))
 
     @staticmethod
     def M(x: float, y: float) -> str:
@@ -34,7 +34,7 @@ class Path:
     @staticmethod
     def line(x: float = 0, y: float = 0, *, relative: bool = False) -> str:
         prefix = "Ll"[relative]
-        return " ".join(map(value_to_str, [prefix, x, y]))
+        return " ".join(map(format_number, [prefix, x, y]))
 
     @staticmethod
     def L(x: float, y: float) -> str:
@@ -48,7 +48,7 @@ class Path:
     @staticmethod
     def vertical(y: float = 0, *, relative: bool = False) -> str:
         prefix = "Vv"[relative]
-        return " ".join(map(value_to_str, [prefix, y]))
+        return " ".join(map(format_number, [prefix, y]))
 
     @staticmethod
     def V(y: float) -> str:
@@ -62,7 +62,7 @@ class Path:
     @staticmethod
     def horizontal(x: float = 0, *, relative: bool = False) -> str:
         prefix = "Hh"[relative]
-        return " ".join(map(value_to_str, [prefix, x]))
+        return " ".join(map(format_number, [prefix, x]))
 
     @staticmethod
     def H(x: float) -> str:
@@ -99,7 +99,7 @@ class Path:
         relative: bool = False,
     ) -> str:
         prefix = "Cc"[relative]
-        return " ".join(map(value_to_str, [prefix, x1, y1, x2, y2, x, y]))
+        return " ".join(map(format_number, [prefix, x1, y1, x2, y2, x, y]))
 
     @staticmethod
     def C(
@@ -134,7 +134,7 @@ class Path:
         relative: bool = False,
     ) -> str:
         prefix = "Ss"[relative]
-        return " ".join(map(value_to_str, [prefix, x2, y2, x, y]))
+        return " ".join(map(format_number, [prefix, x2, y2, x, y]))
 
     @staticmethod
     def S(x2: float = 0, y2: float = 0, x: float = 0, y: float = 0) -> str:
@@ -155,7 +155,7 @@ class Path:
         relative: bool = False,
     ) -> str:
         prefix = "Qq"[relative]
-        return " ".join(map(value_to_str, [prefix, x1, y1, x, y]))
+        return " ".join(map(format_number, [prefix, x1, y1, x, y]))
 
     @staticmethod
     def Q(x1: float = 0, y1: float = 0, x: float = 0, y: float = 0) -> str:
@@ -169,7 +169,7 @@ class Path:
     @staticmethod
     def q_shorthand(x: float = 0, y: float = 0, *, relative: bool = False) -> str:
         prefix = "Tt"[relative]
-        return " ".join(map(value_to_str, [prefix, x, y]))
+        return " ".join(map(format_number, [prefix, x, y]))
 
     @staticmethod
     def T(x: float = 0, y: float = 0) -> str:
@@ -195,7 +195,7 @@ class Path:
         prefix = "Aa"[relative]
         return " ".join(
             map(
-                value_to_str,
+                format_number,
                 [
                     prefix,
                     radius_x,
@@ -289,3 +289,61 @@ def compact_path(path: list[str]) -> str:
         result.append(part)
 
     return "".join(result)
+
+
+PATH_COMMANDS = "MmZzLlHhVvCcSsQqTtAa"
+PATH_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+PATH_SEPARATORS = re.compile(r"[\s,]*")
+# a dot ending the number (or its part before the exponent): "5." or "5.e3"
+TRAILING_DOT = re.compile(r"\.(?=[eE]|$)")
+
+
+def split_path(path: str) -> Optional[list[str]]:
+    """
+
+    Splits path data (e.g. `"M10,30a20 20 0 01.5.5z"`) into commands and numbers, as `compact_path` expects them.
+
+    Arc flags can be written without separators, so they are read as single characters.
+    Returns None if the path is not valid.
+
+    """
+    parts: list[str] = []
+    position = PATH_SEPARATORS.match(path).end()  # type: ignore
+    command = ""
+    argument = 0
+
+    while position < len(path):
+        char = path[position]
+
+        if char in PATH_COMMANDS:
+            parts.append(char)
+            command = char
+            argument = 0
+            position += 1
+        elif command in "Aa" and argument % 7 in (3, 4):
+            if char not in "01":
+                return None
+
+            parts.append(char)
+            argument += 1
+            position += 1
+        else:
+            match = PATH_NUMBER.match(path, position)
+
+            if match is None or not command or command in "Zz":
+                return None
+
+            # compact_path doesn't separate numbers after a trailing dot ("5. .5"), so it's dropped
+            number = TRAILING_DOT.sub("", match.group().lstrip("+"))
+
+            if ("e" in number or "E" in number) and float(number) == 0:
+                # compact_path strips leading zeros, which would break "0e1"
+                number = "0"
+
+            parts.append(number)
+            argument += 1
+            position = match.end()
+
+        position = PATH_SEPARATORS.match(path, position).end()  # type: ignore
+
+    return parts
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+from time import perf_counter
+from typing import Callable, Dict, Optional
+
+from wordstreamer import Renderable
+
+from .renderer import Pending, TreeRenderer, active_profilers
+from .tags import Tag
+
+
+class RenderStats:
+    """
+
+    Counters for one kind of nodes:
+
+    - `nodes`: number of rendered nodes
+    - `tokens`, `bytes`: number of strings the nodes emitted themselves (including text children, but not child nodes), and their UTF-8 size
+    - `self_time`: seconds spent in the nodes themselves
+    - `total_time`: seconds from the start of a node to the end of its last child (nested nodes of the same kind are counted in both)
+
+    """
+
+    __slots__ = ("nodes", "tokens", "bytes", "self_time", "total_time")
+
+    def __init__(self) -> None:
+        self.nodes = 0
+        self.tokens = 0
+        self.bytes = 0
+        self.self_time = 0.0
+        self.total_time = 0.0
+
+    def add(self, other: RenderStats) -> None:
+        self.nodes += other.nodes
+        self.tokens += other.tokens
+        self.bytes += other.bytes
+        self.self_time += other.self_time
+        self.total_time += other.total_time
+
+    def __repr__(self) -> str:
+        return (
+            f"RenderStats(nodes={self.nodes}, tokens={self.tokens}, bytes={self.bytes}, "
+            f"self_time={self.self_time:.6f}, total_time={self.total_time:.6f})"
+        )
+
+
+StatsTable = Dict[str, RenderStats]
+RenderHook = Callable[[StatsTable], None]
+
+
+def encoded_size(strings: list[str]) -> int:
+    """Total size of `strings` in UTF-8, without encoding them if they're ASCII"""
+    size = 0
+
+    for string in strings:
+        size += len(string) if string.isascii() else len(string.encode())
+
+    return size
+
+
+def node_kind(node: Renderable) -> str:
+    """Tag name for plain tags, class name for anything else (custom components, fragments, literals)"""
+    if type(node) is Tag:
+        return node.tag_name
+
+    return type(node).__name__
+
+
+class Profiler:
+    """
+
+    Collects `RenderStats` by tag name and component class for everything rendered by `TreeRenderer`
+    (`tag.render()`, `write_to`, `iter_chunks`, ...) while it's active:
+
+    ```python
+    with Profiler() as profiler:
+        root.render()
+
+    print(profiler.report())
+    ```
+
+    `callback` is called with the stats of each finished render, e.g. to send them to a metrics system.
+    Renders nested in another one (tags in attribute values, `TagArray` prototypes, ...) are counted as a part of it, not finished separately.
+    To profile all renders from then on, call `profiler.start()` once (and `profiler.stop()` to stop).
+
+    Renderers created while no profiler is active are not affected at all. Profilers are active in the thread (or asyncio task) that started them,
+    renders in other threads are not profiled.
+
+    """
+
+    def __init__(self, callback: Optional[RenderHook] = None):
+        self.callback = callback
+        self.stats: StatsTable = {}
+
+    def start(self) -> Profiler:
+        active_profilers.set((*active_profilers.get(), self))
+        return self
+
+    def stop(self) -> None:
+        active_profilers.set(
+            tuple(
+                profiler for profiler in active_profilers.get() if profiler is not self
+            )
+        )
+
+    def __enter__(self) -> Profiler:
+        return self.start()
+
+    def __exit__(self, *args: object) -> None:
+        self.stop()
+
+    def attach(
+        self, renderer: TreeRenderer, stats: Optional[StatsTable] = None
+    ) -> StatsTable:
+        """Makes `renderer` record stats of the nodes it expands (into `stats` of a render it's nested in, if given), returns the table"""
+        if stats is None:
+            stats = {}
+
+        expand = renderer.expand
+
+        def profiled_expand(
+            node: Renderable, out: list[str], stack: list[Pending]
+        ) -> None:
+            kind = node_kind(node)
+            entry = stats.get(kind)
+
+            if entry is None:
+                entry = stats[kind] = RenderStats()
+
+            def done(out: list[str]) -> None:
+                entry.total_time += perf_counter() - started  # type: ignore
+
+            # pushed first, so it runs after all children of the node
+            stack.append(done)
+            out_index = len(out)
+            stack_index = len(stack)
+            started = perf_counter()
+
+            expand(node, out, stack)
+
+            entry.self_time += perf_counter() - started
+            # strings pushed on the stack (closing tags, text children) are emitted later as they are
+            pushed = [item for item in stack[stack_index:] if isinstance(item, str)]
+            entry.nodes += 1
+            entry.tokens += len(out) - out_index + len(pushed)
+            entry.bytes += encoded_size(out[out_index:]) + encoded_size(pushed)
+
+        renderer.expand = profiled_expand  # type: ignore
+        return stats
+
+    def finish(self, stats: StatsTable) -> None:
+        """Adds `stats` of a finished render to the totals, and passes them to `callback`"""
+        if not stats:
+            return
+
+        finished = {kind: entry for kind, entry in stats.items()}
+        stats.clear()
+
+        for kind, entry in finished.items():
+            self.stats.setdefault(kind, RenderStats()).add(entry)
+
+        if self.callback is not None:
+            self.callback(finished)
+
+    def report(self, limit: Optional[int] = None) -> str:
+        """Stats as a text table, sorted by total time"""
+        rows = sorted(self.stats.items(), key=lambda item: -item[1].total_time)[:limit]
+        lines = [
+            f"{'kind':<20} {'nodes':>8} {'tokens':>9} {'bytes':>11} {'self ms':>10} {'total ms':>10}"
+        ]
+
+        for kind, entry in rows:
+            lines.append(
+                f"{kind:<20} {entry.nodes:>8} {entry.tokens:>9} {entry.bytes:>11} "
+                f"{entry.self_time * 1000:>10.3f} {entry.total_time * 1000:>10.3f}"
+            )
+
+        return "\n".join(lines)
@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+from contextvars import ContextVar, Token
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from wordstreamer import Context, Renderable, Renderer
+
+from .formatting import format_number
+from .tags import CacheKey, Chunk, FlatNode, Node, RenderCache, Tag
+from .utils import Escaped, escape, flatten_nodes
+
+if TYPE_CHECKING:
+    from .profiling import Profiler, StatsTable
+
+Payload = Dict[str, object]
+Finalizer = Callable[[List[str]], None]
+Pending = Union[str, Renderable, Finalizer]
+Profiles = List[Tuple["Profiler", "StatsTable"]]
+
+# methods `render_into` replaces: a subclass overriding any of them (but not `render_into`) is streamed instead
+STREAM_METHODS = ("stream", "build_child", "build_attribute")
+
+# number of tokens joined at once by `TreeRenderer.iter_chunks`
+FLUSH_TOKENS = 512
+
+# cached outputs up to this length are copied into the cached output of the tag containing them, longer ones are referenced.
+# copying small outputs keeps the number of pieces down, referencing large ones keeps deep trees from holding a copy of their output on each level
+INLINE_CHUNK = 1024
+
+_render_into_support: dict[type, bool] = {}
+
+# profilers attached to every renderer created while they're active in the current thread (or task), check `soda.profiling`
+active_profilers: ContextVar[tuple[Profiler, ...]] = ContextVar(
+    "active_profilers", default=()
+)
+
+# stats tables of the profiled render running in the current thread, renders nested in it record their stats there
+running_profiles: ContextVar[Optional[Profiles]] = ContextVar(
+    "running_profiles", default=None
+)
+
+
+def supports_render_into(cls: type) -> bool:
+    """Checks if `cls.render_into` can be used instead of `cls.stream`"""
+    supported = _render_into_support.get(cls)
+
+    if supported is None:
+        mro = cls.__mro__
+
+        def definition_depth(name: str) -> int:
+            for depth, base in enumerate(mro):
+                if name in base.__dict__:
+                    return depth
+            return len(mro)
+
+        hook_depth = definition_depth("render_into")
+
+        supported = _render_into_support[cls] = hook_depth < len(mro) and all(
+            hook_depth <= definition_depth(name) for name in STREAM_METHODS
+        )
+
+    return supported
+
+
+class TreeRenderer:
+    """
+
+    Renders a tree into one list of strings, using an explicit stack instead of nested generators.
+    The output is the same as `Renderer(context).render_string(node)`, for both pretty and compact modes.
+
+    Nodes take part in this by defining `render_into(renderer, out, stack)`: a node appends its own tokens to `out`
+    and pushes the rest of its work on `stack`, which is processed last-in first-out:
+
+    - strings are appended to the output as is
+    - renderables are rendered in turn
+    - anything else is called with the output list
+
+    Other renderables (and subclasses overriding `stream` without overriding `render_into`) are streamed as usual.
+
+    Tags with `enable_cache()` reuse their cached output for `cache_key`, and store it after rendering if `store_cache` is set.
+
+    """
+
+    store_cache = True
+
+    def __init__(self, context: Optional[Payload] = None):
+        self.context: Payload = context or {}
+
+        tab_size = self.context.get("tab_size")
+        tab_level = self.context.get("tab_level")
+
+        if not isinstance(tab_size, int):
+            tab_size = 0
+
+        if not isinstance(tab_level, int):
+            tab_level = 0
+
+        self.tab_size = tab_size
+        self.tab_level = tab_level
+        self.pretty = bool(tab_size) and self.context.get("pretty") is True
+        self.cache_key: CacheKey = (self.pretty, tab_size, tab_level)
+
+        self.separator = "\n" * self.pretty
+        self.tag_indent = " " * (tab_size * tab_level)
+        self.text_indent = " " * (tab_size * (tab_level + 1))
+        self.attr_separator = (
+            ("\n" if self.pretty else " ") + self.tag_indent + " " * tab_size
+        )
+
+        # number of tags whose output is being stored, and (start, end, chunk) of cached outputs rendered inside them
+        self.open_stores = 0
+        self.stored: list[tuple[int, int, Chunk]] = []
+
+        self.profiles: Profiles = []
+        # renderers created during a profiled render are nested in it, their stats are finished with it
+        self.nested = False
+        running = running_profiles.get()
+
+        if running is not None:
+            self.nested = True
+            self.profiles = [
+                (profiler, profiler.attach(self, stats)) for profiler, stats in running
+            ]
+        else:
+            profilers = active_profilers.get()
+
+            if profilers:
+                self.profiles = [
+                    (profiler, profiler.attach(self)) for profiler in profilers
+                ]
+
+    def render(self, node: Renderable) -> str:
+        return "".join(self.tokens(node))
+
+    def tokens(self, node: Renderable) -> list[str]:
+        out: list[str] = []
+
+        if not self.profiles:
+            self.run([node], out)
+            return out
+
+        token = self.start_profiles()
+
+        try:
+            self.run([node], out)
+        finally:
+            self.stop_profiles(token)
+
+        if token is not None:
+            self.finish_profiles()
+
+        return out
+
+    def start_profiles(self) -> Optional[Token[Optional[Profiles]]]:
+        """Marks the start of a profiled run, returns a token if it's the outermost one (not nested in another render)"""
+        if self.nested or running_profiles.get() is not None:
+            return None
+
+        return running_profiles.set(self.profiles)
+
+    def stop_profiles(self, token: Optional[Token[Optional[Profiles]]]) -> None:
+        if token is not None:
+            running_profiles.reset(token)
+
+    def finish_profiles(self) -> None:
+        for profiler, stats in self.profiles:
+            profiler.finish(stats)
+
+    def run(
+        self,
+        stack: list[Pending],
+        out: list[str],
+        max_tokens: Optional[int] = None,
+    ) -> None:
+        """
+
+        Processes `stack` until it's empty, appending tokens to `out`.
+
+        With `max_tokens`, stops early once `out` has at least that many tokens, leaving the rest on the stack.
+
+        """
+        pop = stack.pop
+        append = out.append
+        limited = max_tokens is not None
+
+        while stack:
+            item = pop()
+
+            if isinstance(item, str):
+                append(item)
+            elif isinstance(item, Renderable):
+                self.expand(item, out, stack)
+            else:
+                item(out)
+
+            if limited and len(out) >= max_tokens:  # type: ignore
+                return
+
+    def iter_chunks(self, node: Renderable, chunk_size: int) -> Iterator[str]:
+        """
+
+        Renders `node` lazily, yielding chunks of at least `chunk_size` characters (the last one could be shorter).
+
+        Only the unrendered part of the tree is kept on the stack, so memory use doesn't grow with the output.
+        Cached tags are used, but not stored, since their output is flushed before they're done.
+
+        """
+        self.store_cache = False
+
+        stack: list[Pending] = [node]
+        out: list[str] = []
+        pieces: list[str] = []
+        size = 0
+
+        outermost = False
+
+        while stack:
+            # marked as running only between chunks, as the consumer runs its own code (and renders) while the generator waits
+            token = self.start_profiles() if self.profiles else None
+            outermost = outermost or token is not None
+
+            try:
+                self.run(stack, out, max_tokens=FLUSH_TOKENS)
+            finally:
+                self.stop_profiles(token)
+
+            piece = "".join(out)
+            out.clear()
+
+            pieces.append(piece)
+            size += len(piece)
+
+            if size >= chunk_size:
+                yield "".join(pieces)
+                pieces.clear()
+                size = 0
+
+        if size:
+            yield "".join(pieces)
+
+        if outermost:
+            self.finish_profiles()
+
+    def expand(self, node: Renderable, out: list[str], stack: list[Pending]) -> None:
+        if supports_render_into(type(node)):
+            node.render_into(self, out, stack)  # type: ignore
+            return
+
+        for token in node.stream(self.node_context()):
+            if isinstance(token, str):
+                out.append(token)
+
+    def reuse(self, chunk: Chunk, out: list[str]) -> None:
+        """Appends a cached output, noting where it is if it's inside a tag whose output is being stored"""
+        start = len(out)
+
+        if isinstance(chunk, str):
+            out.append(chunk)
+        else:
+            append_chunk(out, chunk)
+
+        if self.open_stores:
+            self.stored.append((start, len(out), chunk))
+
+    def node_context(self, **kwargs: object) -> Context:
+        """A fresh context for streaming a child node, the same as the one `Tag.build_child` would pass"""
+        return Context(Renderer({**self.context, "tab_size": self.tab_size, **kwargs}))
+
+    def push_children(
+        self,
+        stack: list[Pending],
+        children: Sequence[Node],
+        leading_separator: bool = True,
+    ) -> None:
+        """
+
+        Pushes flattened `children` on the stack, in the same way `Tag.build_child` renders them.
+
+        Children are separated with the renderer separator. With `leading_separator`, separator goes before each child (as in `Tag`),
+        otherwise only between children (as in `Fragment`).
+
+        """
+        flat = flatten_nodes(children)
+        separator = self.separator
+        push = stack.append
+
+        for index in range(len(flat) - 1, -1, -1):
+            push(self.child_token(flat[index]))
+
+            if separator and (leading_separator or index):
+                push(separator)
+
+    def child_token(self, child: FlatNode) -> Pending:
+        if isinstance(child, (float, int)):
+            child = format_number(child)
+
+        if isinstance(child, str):
+            if child.__class__ is Escaped:
+                return self.text_indent + child
+            return self.text_indent + escape(child)
+
+        return child
+
+    def attribute_value(self, key: str, value: Node) -> str:
+        """Attribute value as `Tag.build_attribute` renders it"""
+        if value.__class__ is Escaped:
+            return value  # type: ignore
+
+        if isinstance(value, Tag):
+            value = value.render()
+        elif isinstance(value, Renderable):
+            context = self.node_context(attribute=key)
+            value = "".join(
+                token for token in value.stream(context) if isinstance(token, str)
+            )
+        else:
+            value = str(value)
+
+        return value.replace('"', "&quot;")
+
+
+def append_chunk(out: list[str], chunk: Chunk) -> None:
+    """Appends strings of a cached output in order, without recursion"""
+    pending: list[Chunk] = [chunk]
+
+    while pending:
+        item = pending.pop()
+
+        if isinstance(item, str):
+            out.append(item)
+        else:
+            pending.extend(reversed(item))
+
+
+def cache_store(
+    renderer: TreeRenderer, cache: RenderCache, key: CacheKey, start: int
+) -> Finalizer:
+    """
+
+    Finalizer storing everything rendered since `start` as the cached output.
+
+    Tokens of the tag itself are joined, and cached outputs of tags inside it are referenced (copied only if short),
+    so each level of a deep tree stores only its own part.
+
+    """
+    renderer.open_stores += 1
+
+    def store(out: list[str]) -> None:
+        renderer.open_stores -= 1
+        stored = renderer.stored
+
+        # outputs stored inside this tag are the last ones (the ones inside them were taken by their own stores)
+        first = len(stored)
+
+        while first and stored[first - 1][0] >= start:
+            first -= 1
+
+        pieces: list[Chunk] = []
+        position = start
+
+        for child_start, child_end, chunk in stored[first:]:
+            if isinstance(chunk, str) and len(chunk) <= INLINE_CHUNK:
+                continue
+
+            if child_start > position:
+                pieces.append("".join(out[position:child_start]))
+
+            pieces.append(chunk)
+            position = child_end
+
+        del stored[first:]
+
+        if position < len(out) or not pieces:
+            pieces.append("".join(out[position:]))
+
+        entry: Chunk = pieces[0] if len(pieces) == 1 else tuple(pieces)
+        cache.entries[key] = entry
+
+        if renderer.open_stores:
+            stored.append((start, len(out), entry))
+
+    return store
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+from itertools import islice
+from typing import Any, Iterable, Iterator, Sequence
+
+from wordstreamer import Context, Renderable, TokenStream
+
+from .formatting import format_many
+from .renderer import Pending, TreeRenderer
+from .tags import Node, Tag
+from .utils import normalize_ident
+
+# number of elements joined into one token
+BATCH_SIZE = 1024
+
+# placeholder for column values in the prototype tag
+COLUMN_MARKER = "\0"
+
+
+def is_column(value: object) -> bool:
+    """Sequences and arrays are columns, anything else (including strings and tags) is the same for all elements"""
+    if isinstance(value, (str, bytes, Renderable)):
+        return False
+
+    return hasattr(value, "__len__") and hasattr(value, "__iter__")
+
+
+def column_values(column: Any) -> Sequence[Any]:
+    """Converts a column to a sequence of Python values"""
+    if not hasattr(column, "tolist"):
+        return column
+
+    # numpy arrays and `array.array` are converted to lists of Python numbers, which are rounded by `format_many` as any other floats
+    return column.tolist()
+
+
+def format_column(values: Iterable[Any]) -> list[str]:
+    """Converts column values to attribute strings, the same way `Tag` does it"""
+    return [
+        value.replace('"', "&quot;") if '"' in value else value
+        for value in format_many(values)
+    ]
+
+
+class TagArray(Renderable):
+    """
+
+    Many tags of the same kind, with attributes stored as columns:
+
+    `TagArray("circle", cx=xs, cy=ys, r=2, fill="red")`
+
+    Columns could be any sequences of numbers or strings of the same length, including NumPy arrays and `array.array`.
+    Other values (strings, numbers, tags, ...) are the same for all elements.
+
+    Renders the same markup as a list of separate tags (`tag_array.tags()`), but much faster:
+    attribute names and constant values are processed once, and column values are formatted in bulk.
+
+    Columns are read at render time, so changes of the arrays are reflected (but not tracked by render cache).
+
+    """
+
+    def __init__(self, tag_name: str, self_closing: bool = True, **attributes: Node):
+        self.tag_name = normalize_ident(tag_name)
+        self.self_closing = self_closing
+        self.attributes: dict[str, Any] = {
+            normalize_ident(key): value
+            for key, value in attributes.items()
+            if value is not None
+        }
+
+        lengths = {len(value) for value in self.attributes.values() if is_column(value)}
+
+        if not lengths:
+            raise ValueError("TagArray needs at least one column")
+
+        if len(lengths) > 1:
+            raise ValueError(f"columns have different lengths: {sorted(lengths)}")
+
+        self.length = lengths.pop()
+
+    def __len__(self) -> int:
+        return self.length
+
+    def columns(self) -> dict[str, Sequence[Any]]:
+        return {
+            key: value for key, value in self.attributes.items() if is_column(value)
+        }
+
+    def tags(self) -> list[Tag]:
+        """Separate tags with the same markup"""
+        columns = self.columns()
+        constants = {
+            key: value for key, value in self.attributes.items() if key not in columns
+        }
+        rows = [
+            dict(zip(columns, row))
+            for row in zip(*[column_values(column) for column in columns.values()])
+        ]
+
+        return [
+            Tag.raw(
+                self.tag_name,
+                self_closing=self.self_closing,
+                **{
+                    key: row[key] if key in row else constants[key]
+                    for key in self.attributes
+                },
+            )
+            for row in rows
+        ]
+
+    def element_format(self, renderer: TreeRenderer) -> str:
+        """Renders a prototype tag, with `{}` in place of column values, for `str.format`"""
+        columns = self.columns()
+        prototype = Tag.raw(
+            self.tag_name,
+            self_closing=self.self_closing,
+            **{
+                key: COLUMN_MARKER if key in columns else value
+                for key, value in self.attributes.items()
+            },
+        )
+        rendered = renderer.render(prototype)
+
+        return "{}".join(
+            part.replace("{", "{{").replace("}", "}}")
+            for part in rendered.split(COLUMN_MARKER)
+        )
+
+    def batches(self, renderer: TreeRenderer) -> Iterator[str]:
+        """Renders elements in batches of `BATCH_SIZE`, with batches separated the same way as elements"""
+        element_format = self.element_format(renderer).format
+        columns = [iter(column_values(column)) for column in self.columns().values()]
+        separator = renderer.separator
+
+        for start in range(0, self.length, BATCH_SIZE):
+            values = [format_column(islice(column, BATCH_SIZE)) for column in columns]
+            batch = separator.join(map(element_format, *values))
+            yield separator + batch if start else batch
+
+    def render_into(
+        self,
+        renderer: TreeRenderer,
+        out: list[str],
+        stack: list[Pending],
+    ) -> None:
+        batches = self.batches(renderer)
+
+        def next_batch(out: list[str]) -> None:
+            # batches are rendered one by one, so chunked output doesn't hold all of them at once
+            batch = next(batches, None)
+
+            if batch is not None:
+                stack.append(next_batch)
+                out.append(batch)
+
+        stack.append(next_batch)
+
+    def stream(self, context: Context) -> TokenStream:
+        renderer = TreeRenderer(
+            {
+                "pretty": context.pretty,
+                "tab_size": context.tab_size,
+                "tab_level": context.tab_level,
+            }
+        )
+        yield from self.batches(renderer)
+
+    def __repr__(self) -> str:
+        return f"TagArray<{self.tag_name} x {self.length}>"
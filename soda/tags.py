@@ -1,6 +1,20 @@
 from __future__ import annotations
 
-from typing import Iterator, Optional, Sequence, Union, overload
+from typing import (
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    Mapping,
+    MutableMapping,
+    MutableSequence,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    overload,
+)
+
+from weakref import ReferenceType, ref
 
 from wordstreamer import Context, Renderable, TokenStream
 from wordstreamer.stream_utils import separated
@@ -8,6 +22,408 @@ from wordstreamer.stream_utils import separated
 FlatNode = Union["Renderable", str, float]
 Node = Union[FlatNode, "list[Node]"]
 
+# empty containers are shared between tags until something is added to them
+Children = Union["list[Node]", Tuple[Node, ...]]
+Attributes = Union["dict[str, Node]", Mapping[str, Node]]
+
+
+class EmptyAttributes(Mapping[str, Node]):
+    """Read-only empty mapping, a placeholder for attributes of tags that have none"""
+
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Node:
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(())
+
+    def __len__(self) -> int:
+        return 0
+
+    def __reduce__(self) -> str:
+        # keeps the placeholder a singleton through pickle and copy
+        return "EMPTY_ATTRIBUTES"
+
+
+class ReadOnlyAttributes(Mapping[str, Node]):
+    """Read-only view of a mapping"""
+
+    __slots__ = ("items_",)
+
+    def __init__(self, attributes: Mapping[str, Node]):
+        self.items_ = attributes
+
+    def __getitem__(self, key: str) -> Node:
+        return self.items_[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.items_)
+
+    def __len__(self) -> int:
+        return len(self.items_)
+
+    def __reduce__(self) -> tuple[type, tuple[Mapping[str, Node]]]:
+        return type(self), (self.items_,)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self.items_)!r})"
+
+
+class FrozenAttributes(ReadOnlyAttributes):
+    """Attributes of a frozen tag"""
+
+    __slots__ = ()
+
+    def __init__(self, attributes: Mapping[str, Node]):
+        super().__init__(dict(attributes))
+
+
+class SharedAttributes(ReadOnlyAttributes):
+    """Attributes of a clone, shared with the frozen original until the clone is changed"""
+
+    __slots__ = ()
+
+
+class ChildrenView(MutableSequence[Node]):
+    """
+
+    Children of a tag, changed in place as a list: changes go through `tag.edit_children()`, so they invalidate caches of the tag
+    (and raise `TypeError` for frozen tags), while reading doesn't count as a change. Equal to lists and tuples with the same items.
+
+    """
+
+    __slots__ = ("tag",)
+
+    def __init__(self, tag: Tag):
+        self.tag = tag
+
+    @overload
+    def __getitem__(self, index: int) -> Node: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Node]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Node, list[Node]]:
+        tag = self.tag
+
+        if isinstance(tag._attributes, SharedAttributes):
+            # children of a clone can be changed after this
+            tag.unshare()
+
+        if isinstance(index, slice):
+            return list(tag._children[index])
+
+        return tag._children[index]
+
+    @overload
+    def __setitem__(self, index: int, value: Node) -> None: ...
+
+    @overload
+    def __setitem__(self, index: slice, value: Iterable[Node]) -> None: ...
+
+    def __setitem__(
+        self, index: Union[int, slice], value: Union[Node, Iterable[Node]]
+    ) -> None:
+        self.tag.edit_children()[index] = value  # type: ignore
+
+    def __delitem__(self, index: Union[int, slice]) -> None:
+        del self.tag.edit_children()[index]
+
+    def __len__(self) -> int:
+        return len(self.tag._children)
+
+    def __iter__(self) -> Iterator[Node]:
+        return iter(self.tag._children)
+
+    def insert(self, index: int, value: Node) -> None:
+        self.tag.edit_children().insert(index, value)
+
+    def append(self, value: Node) -> None:
+        self.tag.edit_children().append(value)
+
+    def extend(self, values: Iterable[Node]) -> None:
+        self.tag.edit_children().extend(values)
+
+    def pop(self, index: int = -1) -> Node:
+        return self.tag.edit_children().pop(index)
+
+    def clear(self) -> None:
+        self.tag.edit_children().clear()
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ChildrenView):
+            other = other.tag._children
+
+        if not isinstance(other, (list, tuple)):
+            return NotImplemented
+
+        return list(self.tag._children) == list(other)
+
+    def __repr__(self) -> str:
+        return f"ChildrenView({list(self.tag._children)!r})"
+
+
+class AttributesView(MutableMapping[str, Node]):
+    """Attributes of a tag, changed in place as a dict (same as `ChildrenView`, through `tag.edit_attributes()`)"""
+
+    __slots__ = ("tag",)
+
+    def __init__(self, tag: Tag):
+        self.tag = tag
+
+    def __getitem__(self, key: str) -> Node:
+        return self.tag._attributes[key]
+
+    def __setitem__(self, key: str, value: Node) -> None:
+        self.tag.edit_attributes()[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        del self.tag.edit_attributes()[key]
+
+    def __len__(self) -> int:
+        return len(self.tag._attributes)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.tag._attributes)
+
+    def __repr__(self) -> str:
+        return f"AttributesView({dict(self.tag._attributes)!r})"
+
+
+EMPTY_CHILDREN: tuple[Node, ...] = ()
+EMPTY_ATTRIBUTES = EmptyAttributes()
+
+# render options a cached render depends on: (pretty, tab_size, tab_level)
+CacheKey = Tuple[bool, int, int]
+
+# cached output of a tag: a string, or a tuple of strings and cached outputs of tags inside it (referenced, not copied)
+Chunk = Union[str, Tuple["Chunk", ...]]
+
+
+class ParentLinks:
+    """Weak links to tags containing a tag, for data of the tag they depend on"""
+
+    __slots__ = ("parents",)
+
+    def __init__(self) -> None:
+        self.parents: list[ReferenceType[Tag]] = []
+
+    def add_parent(self, parent: Tag) -> None:
+        for parent_ref in self.parents:
+            if parent_ref() is parent:
+                return
+
+        self.parents.append(ref(parent))
+
+
+class RenderCache(ParentLinks):
+    """Rendered output of a tag by render options, along with tags containing it (to invalidate their caches too)"""
+
+    __slots__ = ("entries",)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.entries: dict[CacheKey, Chunk] = {}
+
+    def __reduce__(self) -> tuple[type, tuple[()]]:
+        # cached strings and parent links are not copied, a copy starts with an empty cache
+        return RenderCache, ()
+
+
+class HashCache(ParentLinks):
+    """
+    Content hash of a tag (None if it's unhashable), along with tags whose hashes include it (to invalidate them too).
+
+    Also keeps the frozen snapshot clones of the tag are made from, as it's dropped on the same changes.
+    """
+
+    __slots__ = ("value", "snapshot")
+
+    def __init__(self, value: Optional[int]):
+        super().__init__()
+        self.value = value
+        self.snapshot: Optional[Tag] = None
+
+    def __reduce__(self) -> tuple[type, tuple[()]]:
+        # string hashes differ between processes, so a copy of a tag starts without its cached hash
+        return type(None), ()
+
+
+def cached_hash(tag: Tag) -> Optional[HashCache]:
+    """Returns the content hash cached in a tag, if any"""
+    cached = getattr(tag, "_hash", None)
+
+    if cached is not None:
+        return cached
+
+    if not hasattr(tag, "_children"):
+        # custom tags not calling `Tag.__init__` (e.g. `XMLComment`) are only equal to themselves
+        return HashCache(id(tag))
+
+    return None
+
+
+def drop_hash(tag: Tag) -> None:
+    """Drops the cached content hash of a tag and of all the tags containing it"""
+    cached = tag._hash
+
+    if cached is None:
+        return
+
+    tag._hash = None
+    pending = [cached]
+
+    while pending:
+        cached = pending.pop()
+
+        for parent_ref in cached.parents:
+            parent = parent_ref()
+            parent_hash = None if parent is None else parent._hash
+
+            if parent_hash is not None:
+                parent._hash = None  # type: ignore
+                pending.append(parent_hash)
+
+
+def nested_fragments(children: Sequence[Node]) -> list[Fragment]:
+    """Fragments in children (including nested lists and fragments), whose children are a part of the tag containing them"""
+    fragments: list[Fragment] = []
+    pending: list[Sequence[Node]] = [children]
+
+    while pending:
+        for node in pending.pop():
+            if isinstance(node, list):
+                pending.append(node)
+            elif isinstance(node, Fragment):
+                fragments.append(node)
+                pending.append(node._children)
+
+    return fragments
+
+
+def is_flat(children: Sequence[Node]) -> bool:
+    """Checks if children have no nested lists and fragments, so their number is the number of rendered children"""
+    for node in children:
+        if isinstance(node, (list, Fragment)):
+            return False
+
+    return True
+
+
+_slot_names: dict[type, list[str]] = {}
+
+_custom_setters: dict[type, bool] = {}
+
+
+def has_custom_setters(cls: type) -> bool:
+    """Checks if `cls` overrides `__setitem__` or `set_attribute`, so attributes passed to `Tag.__init__` and `tag(...)` have to go through them"""
+    custom = _custom_setters.get(cls)
+
+    if custom is None:
+        custom = _custom_setters[cls] = (
+            cls.__setitem__ is not Tag.__setitem__
+            or cls.set_attribute is not Tag.set_attribute
+        )
+
+    return custom
+
+
+def shallow_copy(node: Tag) -> Tag:
+    """
+    Copies all slots (and `__dict__`, if any) of a tag into a new instance of the same class.
+
+    `copy.copy` can't be used here: it looks up `Tag.__copy__`, which the shorthand turns into a `<copy>` tag.
+    """
+    cls = type(node)
+    names = _slot_names.get(cls)
+
+    if names is None:
+        names = _slot_names[cls] = [
+            name for base in cls.__mro__ for name in base.__dict__.get("__slots__", ())
+        ]
+
+    result = cls.__new__(cls)
+
+    for name in names:
+        if hasattr(node, name):
+            setattr(result, name, getattr(node, name))
+
+    if hasattr(node, "__dict__"):
+        vars(result).update(vars(node))
+
+    return result
+
+
+def frozen_copy(tag: Tag) -> Tag:
+    """Frozen deep copy of a tag (see `Tag.freeze`), sharing the tags in it which are frozen already"""
+    copies: dict[int, Tag] = {}
+    copied: list[Tag] = []
+    pending = [tag]
+
+    while pending:
+        node = pending.pop()
+
+        if id(node) in copies:
+            continue
+
+        if node.frozen or not hasattr(node, "_children"):
+            copies[id(node)] = node
+            continue
+
+        copies[id(node)] = shallow_copy(node)
+        copied.append(node)
+
+        pending.extend(
+            child for child in flatten_nodes(node._children) if isinstance(child, Tag)
+        )
+        pending.extend(
+            value for value in node._attributes.values() if isinstance(value, Tag)
+        )
+
+    for node in copied:
+        result = copies[id(node)]
+        children = tuple(
+            copies[id(child)] if isinstance(child, Tag) else child
+            for child in flatten_nodes(node._children)
+        )
+        result._children = children if children else EMPTY_CHILDREN
+        result._attributes = FrozenAttributes(
+            {
+                key: copies[id(value)] if isinstance(value, Tag) else value
+                for key, value in node._attributes.items()
+            }
+        )
+        result._cache = None
+        result._hash = None
+
+    return copies[id(tag)]
+
+
+def adopt(node: Tag, parent: Tag) -> None:
+    """Enables caching for a node rendered inside of a caching `parent`"""
+    cache = node.enable_cache()._cache
+    assert cache is not None
+
+    # frozen tags never change, so they don't need to know their parents (which could be many clones)
+    if not node.frozen:
+        cache.add_parent(parent)
+
+
+def node_hash(node: Node) -> Optional[int]:
+    """Hash of a node for `Tag.content_hash`, None if it's unhashable"""
+    if isinstance(node, (str, int, float)):
+        return hash(node)
+
+    if isinstance(node, Tag):
+        cached = cached_hash(node)
+        return None if cached is None else cached.value
+
+    try:
+        return hash(node)
+    except TypeError:
+        return None
+
 
 class MetaTag(type):
     def __getattr__(self, tag_name: str) -> Tag:
@@ -32,10 +448,21 @@ class Tag(Renderable, metaclass=MetaTag):
 
     """
 
+    __slots__ = (
+        "tag_name",
+        "_children",
+        "_attributes",
+        "self_closing",
+        "_cache",
+        "_hash",
+    )
+
     tag_name: str
-    children: list[Node]
-    attributes: dict[str, Node]
+    _children: Children
+    _attributes: Attributes
     self_closing: bool
+    _cache: Optional[RenderCache]
+    _hash: Optional[HashCache]
     brackets: list[str] = ["<", "</", ">", "/>"]
     key_value_sep: str = "="
 
@@ -46,19 +473,416 @@ class Tag(Renderable, metaclass=MetaTag):
         self_closing: bool = True,
         **attributes: Node,
     ):
+        serialize = config.serialize_values
+
         self.tag_name = normalize_ident(tag_name)
-        self.children = list(children)
-        self.attributes = {}
-        for k in attributes:
-            self[k] = attributes[k]
+        self._children = EMPTY_CHILDREN
+        self._attributes = EMPTY_ATTRIBUTES
+        self._cache = None
+        self._hash = None
         self.self_closing = self_closing
 
+        if children:
+            self._children = serialize_children(children) if serialize else [*children]
+
+        if attributes:
+            if type(self) is not Tag and has_custom_setters(type(self)):
+                for key, value in attributes.items():
+                    self[key] = value
+                return
+
+            convert = serialize_attribute if serialize else trunc
+            # a new tag isn't in any tree yet, so attributes are set without `prepare_change`
+            self._attributes = {
+                normalize_ident(key): convert(value)
+                for key, value in attributes.items()
+                if value is not None
+            }
+
+    @staticmethod
+    def raw(
+        tag_name: str,
+        *children: Node,
+        self_closing: bool = True,
+        **attributes: Node,
+    ) -> Tag:
+        """
+
+        Trusted constructor: same as `Tag(...)`, but tag and attribute names are used as is, without normalization.
+
+        Use it only with names that are already valid, e.g. `Tag.raw("rect", **{"stroke-width": 1})`
+
+        """
+        serialize = config.serialize_values
+
+        tag = Tag.__new__(Tag)
+        tag.tag_name = tag_name
+        tag._children = EMPTY_CHILDREN
+        tag._attributes = EMPTY_ATTRIBUTES
+        tag.self_closing = self_closing
+        tag._cache = None
+        tag._hash = None
+
+        if children:
+            tag._children = serialize_children(children) if serialize else [*children]
+
+        if attributes:
+            convert = serialize_attribute if serialize else trunc
+            tag._attributes = {
+                key: convert(value)
+                for key, value in attributes.items()
+                if value is not None
+            }
+
+        return tag
+
+    def enable_cache(self) -> Tag:
+        """
+
+        Makes the tag keep its rendered output (for each set of render options) until it's changed.
+
+        Tags rendered inside a caching tag start caching too, and any change of a tag invalidates its cache along with caches of tags containing it,
+        so a re-render after a few changes only re-renders the changed paths of the tree.
+
+        Changes are tracked through tag methods and changes of `tag.children` / `tag.attributes`.
+        After changing anything else the tree depends on (e.g. a nested list of children, `tag_name`, or a custom component), call `tag.invalidate()`.
+
+        """
+        # custom tags don't always call `Tag.__init__`, e.g. `XMLComment`
+        if getattr(self, "_cache", None) is None:
+            self._cache = RenderCache()
+
+        return self
+
+    def invalidate(self) -> None:
+        """Drops cached renders and content hashes of the tag and of all the tags containing it"""
+        if self._hash is not None:
+            drop_hash(self)
+
+        cache = self._cache
+
+        if cache is None:
+            return
+
+        pending = [cache]
+        seen = {id(cache)}
+
+        while pending:
+            cache = pending.pop()
+            cache.entries.clear()
+
+            for parent_ref in cache.parents:
+                parent = parent_ref()
+                parent_cache = None if parent is None else parent._cache
+
+                if parent_cache is not None and id(parent_cache) not in seen:
+                    seen.add(id(parent_cache))
+                    pending.append(parent_cache)
+
+    def adopt_children(self) -> None:
+        """Enables caching for tags in children (and attributes) of a caching tag, linking them to it"""
+        pending: list[tuple[Tag, Sequence[Node]]] = [(self, self._children)]
+
+        for value in self._attributes.values():
+            if isinstance(value, Tag):
+                adopt(value, self)
+
+        while pending:
+            parent, nodes = pending.pop()
+
+            for node in nodes:
+                if isinstance(node, list):
+                    pending.append((parent, node))
+                elif isinstance(node, Tag):
+                    adopt(node, parent)
+
+                    if isinstance(node, Fragment):
+                        # fragments are rendered as a part of their parent, so their children are adopted here
+                        pending.append((node, node._children))
+
+    @property
+    def frozen(self) -> bool:
+        return isinstance(getattr(self, "_attributes", None), FrozenAttributes)
+
+    def prepare_change(self) -> None:
+        """Called before any change of the tag: raises `TypeError` if the tag is frozen, invalidates caches otherwise"""
+        attributes = self._attributes
+
+        if isinstance(attributes, ReadOnlyAttributes):
+            if isinstance(attributes, FrozenAttributes):
+                raise TypeError(f"frozen <{self.tag_name}> can't be changed")
+
+            self.unshare()
+
+        if self._hash is not None:
+            drop_hash(self)
+
+        if self._cache is not None:
+            self.invalidate()
+
+    def freeze(self) -> Tag:
+        """
+
+        Makes the tag and all tags in it (including attribute values) immutable and hashable, returns the tag.
+
+        Children are flattened into a tuple, attributes become read-only, and any change raises `TypeError`.
+        As with tuples, hashing a frozen tag raises `TypeError` if some value in it is unhashable.
+
+        """
+        pending: list[Tag] = [self]
+
+        while pending:
+            tag = pending.pop()
+
+            if tag.frozen or not hasattr(tag, "_children"):
+                continue
+
+            children = tuple(flatten_nodes(tag._children))
+            tag._children = children if children else EMPTY_CHILDREN
+            tag._attributes = FrozenAttributes(tag._attributes)
+            tag._hash = None
+
+            pending.extend(node for node in children if isinstance(node, Tag))
+            pending.extend(
+                value for value in tag._attributes.values() if isinstance(value, Tag)
+            )
+
+        return self
+
+    def clone(self) -> Tag:
+        """
+
+        Copy-on-write copy of the tag, sharing everything with a frozen snapshot of it until changed. The tag itself is not changed.
+
+        The snapshot is a frozen copy of the tag (or the tag itself, if it's frozen), made once and reused by the next clones until the tag
+        or some tag inside it is changed.
+
+        The clone can be changed as any other tag. Its children are copied on first access (through `tag[index]` or any change),
+        and child tags are replaced with their clones, so only tags along the accessed paths are copied.
+
+        Iterating over a clone gives the shared (frozen) children, use indexing to get the ones you can change.
+        Non-tag renderables (e.g. custom components) are shared, as with `tag.copy()`.
+
+        """
+        if not hasattr(self, "_children"):
+            return shallow_copy(self)
+
+        if self.frozen or self.shared:
+            # an unchanged clone still has the contents of its snapshot
+            snapshot = self
+        else:
+            self.content_hash()
+            cached = self._hash
+            assert cached is not None
+
+            if cached.snapshot is None:
+                cached.snapshot = frozen_copy(self)
+
+            snapshot = cached.snapshot
+
+        attributes = snapshot._attributes
+        assert isinstance(attributes, ReadOnlyAttributes)
+
+        clone = shallow_copy(snapshot)
+        clone._attributes = SharedAttributes(attributes.items_)
+        clone._cache = None
+        clone._hash = None
+        return clone
+
+    @property
+    def shared(self) -> bool:
+        """True for clones that still share their contents with their snapshot"""
+        return isinstance(getattr(self, "_attributes", None), SharedAttributes)
+
+    def unshare(self) -> None:
+        """Gives a clone its own children and attributes, cloning tags in them"""
+        attributes = self._attributes
+        assert isinstance(attributes, SharedAttributes)
+
+        self._attributes = {
+            key: value.clone() if isinstance(value, Tag) else value
+            for key, value in attributes.items_.items()
+        }
+        self._children = [
+            child.clone() if isinstance(child, Tag) else child
+            for child in self._children
+        ]
+
+        if self._hash is not None:
+            # the hash stays the same, but it has to depend on the new child tags
+            drop_hash(self)
+
+        if self._cache is not None:
+            # cached renders stay correct, but new child tags have to be adopted on the next render
+            self.invalidate()
+
+    def content_hash(self) -> Optional[int]:
+        """
+
+        Hash of the tag contents: its name, attributes and flattened children (same things `==` compares).
+        Returns None if some value in the tree is unhashable.
+
+        The hash is cached in each tag of the tree until the tag, or some tag inside it, is changed (frozen tags keep it forever).
+        After changing a tag in some other way (e.g. a nested list of children), call `tag.invalidate()`.
+
+        """
+        cached = cached_hash(self)
+
+        if cached is not None:
+            return cached.value
+
+        # children are hashed before parents, without recursion.
+        # flat children of a tag (and tags it depends on) are kept on the stack until it's hashed
+        stack: list[tuple[Tag, Optional[list[FlatNode]], list[Tag]]] = [
+            (self, None, [])
+        ]
+
+        while stack:
+            tag, children, dependencies = stack.pop()
+
+            if children is not None:
+                tag._hash = HashCache(tag.shallow_hash(children))
+
+                if not tag.frozen:
+                    # frozen tags never change, so their hashes don't depend on anything
+                    for node in dependencies:
+                        node_cache = getattr(node, "_hash", None)
+
+                        if node_cache is not None:
+                            node_cache.add_parent(tag)
+                continue
+
+            if cached_hash(tag) is not None:
+                continue
+
+            raw_children = tag._children
+            children = flatten_nodes(raw_children) if raw_children else []
+            dependencies = [
+                node
+                for node in [*tag._attributes.values(), *children]
+                if isinstance(node, Tag)
+            ]
+
+            if raw_children and not is_flat(raw_children):
+                # children of fragments are hashed as children of the tag, but changes of fragments should reach it too
+                dependencies.extend(nested_fragments(raw_children))
+
+            stack.append((tag, children, dependencies))
+
+            for node in dependencies:
+                if cached_hash(node) is None:
+                    stack.append((node, None, []))
+
+        return self._hash.value  # type: ignore
+
+    def shallow_hash(self, children: list[FlatNode]) -> Optional[int]:
+        """Computes the content hash from flat `children`, taking hashes of nested tags from their caches"""
+        attributes: list[tuple[str, int]] = []
+        hashes: list[int] = []
+
+        for key, value in self._attributes.items():
+            value_hash = node_hash(value)
+
+            if value_hash is None:
+                return None
+
+            attributes.append((key, value_hash))
+
+        for child in children:
+            child_hash = node_hash(child)
+
+            if child_hash is None:
+                return None
+
+            hashes.append(child_hash)
+
+        return hash((self.tag_name, frozenset(attributes), tuple(hashes)))
+
+    def __hash__(self) -> int:
+        if not self.frozen:
+            raise TypeError(
+                f"unhashable type: '{type(self).__name__}' (use tag.freeze() to make it hashable)"
+            )
+
+        content_hash = self.content_hash()
+
+        if content_hash is None:
+            raise TypeError(f"frozen <{self.tag_name}> contains unhashable values")
+
+        return content_hash
+
+    @property
+    def children(self) -> ChildrenView:
+        """Children of the tag, to read or change in place as a list (changes are tracked, reading is not a change)"""
+        return ChildrenView(self)
+
+    @children.setter
+    def children(self, children: Sequence[Node]) -> None:
+        self.prepare_setter()
+        self._children = children if isinstance(children, list) else [*children]
+
+    @property
+    def attributes(self) -> AttributesView:
+        """Attributes of the tag, to read or change in place as a dict (same as `tag.children`)"""
+        return AttributesView(self)
+
+    @attributes.setter
+    def attributes(self, attributes: Mapping[str, Node]) -> None:
+        self.prepare_setter()
+        self._attributes = (
+            attributes if isinstance(attributes, dict) else dict(attributes)
+        )
+
+    def edit_children(self) -> list[Node]:
+        """
+
+        Children list of the tag, to change in place. The change is prepared (see `prepare_change`) when the list is returned,
+        so get it right before changing it, instead of keeping it around.
+
+        """
+        self.prepare_change()
+
+        children = self._children
+
+        if not isinstance(children, list):
+            children = self._children = list(children)
+
+        return children
+
+    def edit_attributes(self) -> dict[str, Node]:
+        """Attributes dict of the tag, to change in place (same as `tag.edit_children()`)"""
+        self.prepare_change()
+
+        attributes = self._attributes
+
+        if not isinstance(attributes, dict):
+            attributes = self._attributes = dict(attributes)
+
+        return attributes
+
+    def prepare_setter(self) -> None:
+        """`prepare_change` for `tag.children = ...` and `tag.attributes = ...`, which could also come from `__init__` of a subclass not calling `Tag.__init__`"""
+        if hasattr(self, "_attributes"):
+            self.prepare_change()
+            return
+
+        # slots a subclass doesn't set itself get the same defaults as in `Tag.__init__`
+        if not hasattr(self, "_children"):
+            self._children = EMPTY_CHILDREN
+
+        self._attributes = EMPTY_ATTRIBUTES
+        self._cache = None
+        self._hash = None
+
+        if not hasattr(self, "self_closing"):
+            self.self_closing = True
+
     def copy(self) -> Tag:
         return Tag(
             self.tag_name,
-            *self.children,
+            *self._children,
             self_closing=self.self_closing,
-            **self.attributes,
+            **self._attributes,
         )
 
     @overload
@@ -74,15 +898,17 @@ class Tag(Renderable, metaclass=MetaTag):
         """sets tag attribute to value. If None is passed, deletes attribute"""
         attr = normalize_ident(attr)
         if value is None:
-            if attr in self.attributes:
-                self.attributes.pop(attr)
+            if attr in self._attributes:
+                self.edit_attributes().pop(attr)
+        elif config.serialize_values:
+            self.edit_attributes()[attr] = serialize_attribute(value)
         else:
-            self.attributes[attr] = trunc(value)
+            self.edit_attributes()[attr] = trunc(value)
         return value
 
     def get_attribute(self, attr: str) -> Optional[Node]:
         """returns tag attribute or None"""
-        return self.attributes.get(normalize_ident(attr))
+        return self._attributes.get(normalize_ident(attr))
 
     @overload
     def __setitem__(self, item: str | int | slice, value: Node) -> Node: ...
@@ -105,12 +931,16 @@ class Tag(Renderable, metaclass=MetaTag):
                 value = []
             elif not isinstance(value, list):
                 value = [value]
-            self.children[item] = value
+            if config.serialize_values:
+                value = serialize_children(value)
+            self.edit_children()[item] = value
             return value
         elif isinstance(item, int):
             if value is None:
-                return self.children.pop(item)
-            self.children[item] = value
+                return self.edit_children().pop(item)
+            if config.serialize_values:
+                value = serialize_child(value)
+            self.edit_children()[item] = value
             return value
 
         return self.set_attribute(item, value)
@@ -129,13 +959,21 @@ class Tag(Renderable, metaclass=MetaTag):
     ) -> Optional[Union[Node, list[Node], Node]]:
         # check __setitem__ for explanation of ignore
         if isinstance(item, (int, slice)):  # type: ignore[misc]
-            return self.children[item]
+            if isinstance(self._attributes, SharedAttributes):
+                # children of a clone can be changed after this
+                self.unshare()
+
+            if isinstance(item, slice):
+                return list(self._children[item])
+            return self._children[item]
 
         return self.get_attribute(item)
 
     def insert(self, index: int, node: Node) -> None:
         """Inserts an entry into the tag"""
-        self.children.insert(index, node)
+        if config.serialize_values:
+            node = serialize_child(node)
+        self.edit_children().insert(index, node)
 
     def append(self, child: Node) -> None:
         """A more list-like way to add a node to the tag"""
@@ -147,24 +985,42 @@ class Tag(Renderable, metaclass=MetaTag):
 
     def pop(self, index: int = -1) -> Node:
         """Pop one (by default last one) entry from the tag"""
-        return self.children.pop(index)
+        return self.edit_children().pop(index)
 
     def __iter__(self) -> Iterator[FlatNode]:
-        return iter(node_iterator(self.children))
+        return iter(node_iterator(self._children))
 
     def iter_raw(self) -> Iterator[Node]:
-        return iter(self.children)
+        return iter(self._children)
 
     def __call__(self, *children: Node, **attributes: Node) -> Tag:
-        self.children.extend(children)
+        serialize = config.serialize_values
+
+        if children:
+            self.edit_children().extend(
+                serialize_children(children) if serialize else children
+            )
 
         if attributes:
-            for attr in attributes:
-                self[attr] = attributes[attr]
+            if type(self) is not Tag and has_custom_setters(type(self)):
+                for attr, value in attributes.items():
+                    self[attr] = value
+                return self
+
+            current = self.edit_attributes()
+            convert = serialize_attribute if serialize else trunc
+
+            for attr, value in attributes.items():
+                attr = normalize_ident(attr)
+
+                if value is None:
+                    current.pop(attr, None)
+                else:
+                    current[attr] = convert(value)
         return self
 
     def __repr__(self) -> str:
-        return f"Tag<{self.tag_name} attributes: {len(self.attributes)}>children: {len(self.children)}</{self.tag_name}>"
+        return f"Tag<{self.tag_name} attributes: {len(self._attributes)}>children: {len(self._children)}</{self.tag_name}>"
 
     def __str__(self) -> str:
         return self.render()
@@ -178,12 +1034,12 @@ class Tag(Renderable, metaclass=MetaTag):
         tab_size = self.get_tab_size(context)
 
         if isinstance(child, (float, int)):
-            yield from self.build_child(str(trunc(child)), context)
+            yield from self.build_child(format_number(child), context)
             return
 
         if isinstance(child, str):
             yield " " * (tab_size * tab_level)
-            yield escape(child)
+            yield child if isinstance(child, Escaped) else escape(child)
             return
 
         yield from child.stream(
@@ -192,9 +1048,37 @@ class Tag(Renderable, metaclass=MetaTag):
             )
         )
 
+    def build_attribute(
+        self,
+        key: str,
+        value: Node,
+        context: Context,
+    ) -> TokenStream:
+        quote = '"'
+
+        if isinstance(value, Escaped):
+            yield value
+            return
+
+        if isinstance(value, Tag):
+            yield value.render().replace(quote, "&quot;")
+            return
+
+        if isinstance(value, Renderable):
+            # non-tag renderables (e.g. template slots) are streamed in place,
+            # with `attribute` set in context so they know where they are
+            for token in value.stream(context.derive(attribute=key)):
+                if isinstance(token, str):
+                    yield token.replace(quote, "&quot;")
+                else:
+                    yield token
+            return
+
+        yield str(value).replace(quote, "&quot;")
+
     def compare_attrs(self, other: Tag) -> bool:
-        attrs1 = self.attributes
-        attrs2 = other.attributes
+        attrs1 = self._attributes
+        attrs2 = other._attributes
 
         if attrs1.keys() ^ attrs2.keys():
             return False
@@ -228,14 +1112,45 @@ class Tag(Renderable, metaclass=MetaTag):
         return True
 
     def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+
         if not isinstance(other, Tag):
             return False
 
-        return (
-            (self.tag_name == other.tag_name)
-            and self.compare_attrs(other)
-            and self.compare_children(other)
-        )
+        if not hasattr(self, "_children") or not hasattr(other, "_children"):
+            # custom tags not calling `Tag.__init__` (e.g. `XMLComment`) are only equal to themselves
+            return False
+
+        if self.tag_name != other.tag_name or len(self._attributes) != len(
+            other._attributes
+        ):
+            return False
+
+        # hashes are compared only if both are cached already: computing them costs more than comparing
+        self_hash = self._hash
+        other_hash = other._hash
+
+        if (
+            self_hash is not None
+            and other_hash is not None
+            and self_hash.value is not None
+            and other_hash.value is not None
+            and self_hash.value != other_hash.value
+        ):
+            return False
+
+        self_children = self._children
+        other_children = other._children
+
+        if (
+            len(self_children) != len(other_children)
+            and is_flat(self_children)
+            and is_flat(other_children)
+        ):
+            return False
+
+        return self.compare_attrs(other) and self.compare_children(other)
 
     def get_tab_size(self, context: Context) -> int:
         tab_size = context.tab_size
@@ -287,73 +1202,206 @@ class Tag(Renderable, metaclass=MetaTag):
         yield self.brackets[0]  # <
         yield tag_name
 
-        for key in self.attributes:
+        attributes = self._attributes
+        children = self._children
+
+        for key in attributes:
             yield from attr_separator
             yield str(key)
             yield self.key_value_sep  # =
             yield quote
 
-            value = self.attributes[key]
-            if isinstance(value, Tag):
-                value = value.render()
-            else:
-                value = str(value)
-
-            yield value.replace(quote, "&quot;")
+            yield from self.build_attribute(key, attributes[key], context)
             yield quote
 
-        if self.attributes:
+        if attributes:
             yield from newline_indented
 
-        if self.children or not self.self_closing:
+        if children or not self.self_closing:
             yield self.brackets[2]  # >
 
         for child in self:
             yield separator
             yield from self.build_child(child, context)
 
-        if self.children:
+        if children:
             yield from newline_indented
 
-        if self.children or not self.self_closing:
+        if children or not self.self_closing:
             yield self.brackets[1]  # </
             yield tag_name
             yield self.brackets[2]  # >
         else:
             yield self.brackets[3]  # />
 
+    def render_into(
+        self,
+        renderer: TreeRenderer,
+        out: list[str],
+        stack: list[Pending],
+    ) -> None:
+        """Non-generator version of `Tag.stream`, used by `TreeRenderer`"""
+        tag_name = self.tag_name
+        brackets = self.brackets
+        tag_indent = renderer.tag_indent
+        attributes = self._attributes
+        children = self._children
+        cache = self._cache
+
+        if cache is not None:
+            key = renderer.cache_key
+            cached = cache.entries.get(key)
+
+            if cached is not None:
+                renderer.reuse(cached, out)
+                return
+
+            self.adopt_children()
+
+            if renderer.store_cache:
+                # pushed first, so it runs after the whole tag is rendered
+                stack.append(cache_store(renderer, cache, key, len(out)))
+
+        if renderer.tab_size:
+            out.append(tag_indent)
+
+        out.append(brackets[0] + tag_name)  # <tag_name
+
+        if attributes:
+            attr_separator = renderer.attr_separator
+            key_value_sep = self.key_value_sep + '"'
+
+            for key in attributes:
+                value = renderer.attribute_value(key, attributes[key])
+                out.append(f'{attr_separator}{key}{key_value_sep}{value}"')
+
+            out.append(renderer.separator + tag_indent)
+
+        if children:
+            out.append(brackets[2])  # >
+            stack.append(
+                renderer.separator + tag_indent + brackets[1] + tag_name + brackets[2]
+            )
+            renderer.push_children(stack, children)
+        elif self.self_closing:
+            out.append(brackets[3])  # />
+        else:
+            out.append(
+                brackets[2] + brackets[1] + tag_name + brackets[2]
+            )  # ></tag_name>
+
     def render(self, pretty: bool = False, tab_size: int = 2) -> str:
-        return self.render_string(
+        if config.render_cache is not None:
+            return config.render_cache.render(self, pretty, tab_size)
+
+        return TreeRenderer(
             {
                 "pretty": pretty,
                 "tab_size": tab_size * pretty,
             }
-        )
+        ).render(self)
+
+    def write_to(
+        self,
+        sink: Sink,
+        encoding: str = "utf-8",
+        chunk_size: Optional[int] = None,
+        pretty: bool = False,
+        tab_size: int = 2,
+    ) -> int:
+        """
+
+        Renders the tag into a file, socket or `bytearray` in encoded chunks of about `chunk_size` (`config.chunk_size` by default), without building the whole string.
+
+        Returns the number of bytes written. Check `soda.output.write_to` for supported sinks.
+
+        """
+        return write_to(self, sink, encoding, chunk_size, pretty, tab_size)
+
+    def write_gzip(
+        self,
+        sink: Sink,
+        level: int = 6,
+        encoding: str = "utf-8",
+        chunk_size: Optional[int] = None,
+        pretty: bool = False,
+        tab_size: int = 2,
+    ) -> int:
+        """
+
+        Same as `tag.write_to`, but the output is compressed with gzip on the fly (e.g. for `.svgz` files), with compression `level` from 0 to 9.
+
+        Returns the number of compressed bytes written. Check `soda.output.iter_gzip` for an iterator of compressed chunks.
+
+        """
+        return write_gzip(self, sink, level, encoding, chunk_size, pretty, tab_size)
+
+    def astream(
+        self,
+        encoding: str = "utf-8",
+        chunk_size: Optional[int] = None,
+        pretty: bool = False,
+        tab_size: int = 2,
+    ) -> AsyncIterator[bytes]:
+        """
+
+        Renders the tag as an async iterator of encoded chunks, giving control back to the event loop after each chunk:
+
+        `async for chunk in tag.astream(chunk_size=16384): ...`
+
+        """
+        return astream(self, encoding, chunk_size, pretty, tab_size)
+
+    def tree_size(self) -> TreeSize:
+        """
+
+        Counts nodes, attribute and child entries, string bytes and estimated object bytes of the tree, in total and by tag name.
+        Check `soda.memory.tree_size` for details.
+
+        """
+        return tree_size(self)
 
     def prerender(self, pretty: bool = False) -> Literal:
         """Renders a tag into a non-escaping literal. Could speed up rendering of heavy tags."""
         return Literal(self.render(pretty), escape=False)
 
     @staticmethod
-    def from_str(text: str) -> Tag:
-        return xml_to_tag(text)
+    def from_str(text: XMLSource, lazy: bool = False, passthrough: bool = False) -> Tag:
+        """
+
+        Parses an XML document into a tag tree. Besides a string with the document, `text` could be
+        `bytes`, `bytearray`, `memoryview` or `mmap` (parsed in place, without copies), a path (`pathlib.Path`) or a binary file object.
+
+        With `lazy=True`, elements are converted into tags only when they're used (check `soda.xml_parse.LazyTag`).
+
+        With `passthrough=True`, tags keep their original text, and render it as is until they're changed (check `soda.passthrough.parse_passthrough`).
+
+        """
+        return xml_to_tag(text, lazy, passthrough)
 
 
 class Literal(Tag):
+    __slots__ = ("escape",)
+
+    escape: bool
+
     def __init__(self, text: str, escape: bool = True):
         self.tag_name = ""
-        self.children = [text.strip()]
-        self.attributes = {}
+        self._children = (text.strip(),)
+        self._attributes = EMPTY_ATTRIBUTES
+        self._cache = None
+        self._hash = None
         self.escape = escape
 
     def copy(self) -> Literal:
-        assert isinstance(self.children[0], str)
-        return Literal(self.children[0], self.escape)
+        text = self._children[0]
+        assert isinstance(text, str)
+        return Literal(text, self.escape)
 
     def stream(self, context: Context) -> TokenStream:
         separator = "\n" * bool(self.is_pretty(context))
 
-        for child in self.children:
+        for child in self._children:
             yield separator
 
             contents = str(child)
@@ -363,8 +1411,24 @@ class Literal(Tag):
             else:
                 yield contents
 
+    def render_into(
+        self,
+        renderer: TreeRenderer,
+        out: list[str],
+        stack: list[Pending],
+    ) -> None:
+        separator = renderer.separator
+
+        for child in self._children:
+            contents = str(child)
+
+            if self.escape:
+                contents = escape(contents)
+
+            out.append(separator + contents)
+
     def __repr__(self) -> str:
-        return f"Literal<{repr(self.children[0])}>"
+        return f"Literal<{repr(self._children[0])}>"
 
     def __str__(self) -> str:
         return self.render()
@@ -373,6 +1437,8 @@ class Literal(Tag):
 class Fragment(Tag):
     """React-like fragment, renders just its children"""
 
+    __slots__ = ()
+
     def __init__(self, *children: Node):
         super().__init__("soda:fragment", *children)
 
@@ -386,9 +1452,32 @@ class Fragment(Tag):
             separator="\n" * self.is_pretty(context),
         )
 
-    def copy(self) -> Fragment:
-        return Fragment(*self.children)
-
+    def render_into(
+        self,
+        renderer: TreeRenderer,
+        out: list[str],
+        stack: list[Pending],
+    ) -> None:
+        renderer.push_children(stack, self._children, leading_separator=False)
 
-from .utils import escape, node_iterator, normalize_ident, trunc
-from .xml_parse import xml_to_tag
+    def copy(self) -> Fragment:
+        return Fragment(*self._children)
+
+
+from .config_mod import config
+from .formatting import format_number
+from .memory import TreeSize, tree_size
+from .output import Sink, astream, write_gzip, write_to
+from .renderer import Pending, TreeRenderer, cache_store
+from .utils import (
+    Escaped,
+    escape,
+    flatten_nodes,
+    node_iterator,
+    normalize_ident,
+    serialize_attribute,
+    serialize_child,
+    serialize_children,
+    trunc,
+)
+from .xml_parse import XMLSource, xml_to_tag
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+from typing import Mapping, Optional, Union
+
+from wordstreamer import Context, Renderable, Renderer, TokenStream
+from wordstreamer.core import Marker
+
+from .renderer import Pending, TreeRenderer
+from .tags import Fragment, Node, Tag
+from .utils import trunc
+
+SLOT_MARKER = "soda:slot"
+
+
+class Slot(Renderable):
+    """
+
+    Named placeholder for a value that changes between renders of a `Template`.
+
+    Can be used both as an attribute value and as a child node:
+
+    `Tag.rect(width=Slot("width"))(Slot("label"))`
+
+    Outside of a template, a slot renders its `default` (or nothing if there's no default).
+
+    """
+
+    def __init__(self, name: str, default: Optional[Node] = None):
+        self.name = name
+        self.default = default
+
+    def stream(self, context: Context) -> TokenStream:
+        if context.soda_template:
+            renderer = TreeRenderer(
+                {
+                    "pretty": context.pretty,
+                    "tab_size": context.tab_size,
+                    "tab_level": context.tab_level,
+                }
+            )
+            data = {"slot": self, "attribute": context.attribute, "renderer": renderer}
+            yield Marker(SLOT_MARKER, data)
+            return
+
+        if self.default is None:
+            return
+
+        if context.attribute is not None:
+            yield attribute_value(self.default)
+        else:
+            yield from child_tokens(self.default, context)
+
+    def __repr__(self) -> str:
+        return f"Slot<{self.name}>"
+
+
+def attribute_value(value: Node) -> str:
+    """Converts a slot value to the attribute string, the same way `Tag` does it for its attributes"""
+    value = trunc(value)
+
+    if isinstance(value, Tag):
+        return value.render()
+
+    return str(value)
+
+
+def child_tokens(value: Node, context: Context) -> TokenStream:
+    """Renders a slot value as if its flat nodes were children of the slot's parent"""
+    return Fragment(value).stream(context)
+
+
+SlotValues = Mapping[str, Node]
+Segment = Union[str, Marker]
+
+
+class Template:
+    """
+
+    A tree compiled into a flat sequence of prerendered strings and slots.
+
+    Compile once with `Template(tree, pretty=False, tab_size=2)`, then fill it many times:
+
+    `template.render(width=10, label="hello")`
+
+    Static parts of the tree are rendered only at compile time, so any changes made to the tree after compilation are not reflected.
+    A child slot always takes the place of one child, so in pretty mode a slot filled with an empty list still leaves its line break.
+
+    """
+
+    def __init__(self, node: Renderable, pretty: bool = False, tab_size: int = 2):
+        self.segments: list[Segment] = []
+
+        renderer = Renderer(
+            {
+                "pretty": pretty,
+                "tab_size": tab_size * pretty,
+                "soda_template": True,
+            }
+        )
+
+        buffer: list[str] = []
+
+        for token in renderer.stream(node):
+            if isinstance(token, str):
+                buffer.append(token)
+                continue
+
+            if not isinstance(token, Marker) or token.key != SLOT_MARKER:
+                continue
+
+            if buffer:
+                self.segments.append("".join(buffer))
+                buffer = []
+
+            self.segments.append(token)
+
+        if buffer:
+            self.segments.append("".join(buffer))
+
+    @property
+    def slots(self) -> list[str]:
+        """Names of the template slots, in order of their first appearance"""
+        names: dict[str, None] = {}
+
+        for segment in self.segments:
+            if isinstance(segment, Marker):
+                names[get_slot(segment).name] = None
+
+        return [*names]
+
+    def render(self, values: Optional[SlotValues] = None, **kwargs: Node) -> str:
+        """
+
+        Renders the template with slot values from `values` and keyword arguments.
+
+        Raises `KeyError` if a slot without default has no value.
+
+        """
+        if values:
+            kwargs = {**values, **kwargs}
+
+        result: list[str] = []
+
+        for segment in self.segments:
+            if isinstance(segment, str):
+                result.append(segment)
+                continue
+
+            slot = get_slot(segment)
+            value = kwargs.get(slot.name, slot.default)
+
+            if value is None:
+                raise KeyError(slot.name)
+
+            if segment.data["attribute"] is not None:
+                result.append(attribute_value(value).replace('"', "&quot;"))
+                continue
+
+            renderer: TreeRenderer = segment.data["renderer"]  # type: ignore
+            stack: list[Pending] = []
+            renderer.push_children(stack, [value], leading_separator=False)
+            renderer.run(stack, result)
+
+        return "".join(result)
+
+
+def get_slot(marker: Marker) -> Slot:
+    slot = marker.data["slot"]
+    assert isinstance(slot, Slot)
+    return slot
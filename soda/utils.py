@@ -1,7 +1,15 @@
-from typing import Callable, Iterable
+from __future__ import annotations
+
+from functools import lru_cache
+from sys import intern
+from typing import Callable, Iterable, Iterator, Sequence
+
+from wordstreamer import Renderable
 
 from .config_mod import config
-from .tags import FlatNode, Fragment, Node
+from .formatting import format_number
+from .formatting import trunc as trunc
+from .tags import FlatNode, Fragment, Node, Tag
 
 char_range: Callable[[str, str], "map[str]"] = lambda s, e: map(
     chr, range(ord(s), ord(e) + 1)
@@ -21,6 +29,59 @@ def escape(text: str) -> str:
     return text.replace("&", "&amp;").replace(">", "&gt;").replace("<", "&lt;")
 
 
+class Escaped(str):
+    """
+
+    Text that is already serialized and escaped, rendered as is.
+
+    With `config.serialize_values`, tags store attribute values and text children this way when they're set,
+    so renders don't convert and escape them again.
+
+    """
+
+    __slots__ = ()
+
+
+def serialize_attribute(value: Node) -> Node:
+    """Attribute value in its rendered form (nested tags are rendered once, other renderables are kept as is)"""
+    if isinstance(value, Escaped):
+        return value
+
+    if isinstance(value, Tag):
+        value = value.render()
+    elif isinstance(value, Renderable):
+        return value
+    elif not isinstance(value, str):
+        value = format_number(value)
+
+    return Escaped(value.replace('"', "&quot;"))
+
+
+def serialize_children(children: Sequence[Node]) -> list[Node]:
+    """Children with text (and numbers) in the rendered form, nested lists are serialized too"""
+    return [
+        (
+            serialize_children(child)
+            if isinstance(child, list)
+            else serialize_child(child)
+        )
+        for child in children
+    ]
+
+
+def serialize_child(child: Node) -> Node:
+    if isinstance(child, (Escaped, Renderable)):
+        return child
+
+    if isinstance(child, (float, int)):
+        return Escaped(format_number(child))
+
+    if isinstance(child, str):
+        return Escaped(escape(child))
+
+    return child
+
+
 def filter_ident_func(char: str) -> bool:
     return char in ident_chars
 
@@ -29,8 +90,26 @@ def filter_ident(text: Iterable[str]) -> str:
     return "".join(filter(filter_ident_func, text))
 
 
+# maximum number of distinct identifiers kept by `normalize_ident`
+IDENT_CACHE_SIZE = 4096
+
+
 def normalize_ident(attr: str) -> str:
-    return filter_ident(normalize_ident_gen(attr))
+    return cached_normalize_ident(
+        attr,
+        config.replace_underscores,
+        config.strip_underscores,
+    )
+
+
+@lru_cache(maxsize=IDENT_CACHE_SIZE)
+def cached_normalize_ident(
+    attr: str,
+    replace_underscores: bool,
+    strip_underscores: bool,
+) -> str:
+    # config flags are a part of cache key, normalize_ident_gen reads them from config itself
+    return intern(filter_ident(normalize_ident_gen(attr)))
 
 
 def normalize_ident_gen(attr: str) -> Iterable[str]:
@@ -55,14 +134,6 @@ def normalize_ident_gen(attr: str) -> Iterable[str]:
         yield "_" * skipped_underscores
 
 
-def trunc(value: Node) -> Node:
-    if isinstance(value, float):
-        if value.is_integer():
-            return int(value)
-        return round(value, config.decimal_length)
-    return value
-
-
 def eq(v1: float, v2: float) -> bool:
     eps: float = 10 ** -(2 * config.decimal_length)
 
@@ -70,10 +141,26 @@ def eq(v1: float, v2: float) -> bool:
 
 
 def node_iterator(iterable: Iterable[Node]) -> Iterable[FlatNode]:
-    for elem in iterable:
-        if isinstance(elem, list):
-            yield from node_iterator(elem)
-        elif isinstance(elem, Fragment):
-            yield from elem
+    iterators: list[Iterator[Node]] = [iter(iterable)]
+
+    while iterators:
+        for elem in iterators[-1]:
+            if isinstance(elem, list):
+                iterators.append(iter(elem))
+                break
+            elif isinstance(elem, Fragment):
+                iterators.append(iter(elem.iter_raw()))
+                break
+            else:
+                yield elem
         else:
-            yield elem
+            iterators.pop()
+
+
+def flatten_nodes(nodes: Sequence[Node]) -> list[FlatNode]:
+    """Same as `list(node_iterator(nodes))`, but faster for flat sequences"""
+    for elem in nodes:
+        if isinstance(elem, (list, Fragment)):
+            return list(node_iterator(nodes))
+
+    return list(nodes)  # type: ignore
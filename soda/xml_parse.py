@@ -1,11 +1,25 @@
 from __future__ import annotations
 
-from typing import Iterable
+import os
+from functools import lru_cache
+from mmap import mmap
+from typing import IO, Callable, Iterable, Mapping, Sequence, Union
 
 import lxml.etree as etree
 
+from .config_mod import config
 from .custom_tags import XMLComment
-from .tags import Literal, Tag
+from .passthrough import parse_passthrough
+from .renderer import Pending, TreeRenderer
+from .tags import Literal, Node, Tag
+from .utils import normalize_ident, serialize_attribute, serialize_children, trunc
+
+XML_NAMESPACE = "http://www.w3.org/XML/1998/namespace"
+
+# documents as text, bytes-like objects (parsed in place, without copying), paths or binary files
+XMLSource = Union[
+    str, bytes, bytearray, memoryview, mmap, "os.PathLike[str]", IO[bytes]
+]
 
 
 def build_prefixed_name(prefix: str | None, content: str | None) -> str:
@@ -14,8 +28,50 @@ def build_prefixed_name(prefix: str | None, content: str | None) -> str:
     return ":".join(filtered)
 
 
-def xml_to_tag(xml: str) -> Tag:
-    root = etree.fromstring(xml.encode())
+def parse_document(source: XMLSource) -> etree._Element:
+    """
+
+    Parses `source` into an lxml tree, returning its root element:
+
+    - `str` is the document text
+    - `bytes`, `bytearray`, `memoryview` and `mmap` are parsed in place, without copying them
+    - paths (`os.PathLike`, e.g. `pathlib.Path`) are read by lxml itself
+    - binary file objects are read in chunks
+
+    """
+    if isinstance(source, str):
+        return etree.fromstring(source.encode())
+
+    if isinstance(source, (bytes, bytearray, memoryview, mmap)):
+        return etree.fromstring(source)
+
+    if isinstance(source, os.PathLike):
+        return etree.parse(os.fspath(source)).getroot()
+
+    if hasattr(source, "read"):
+        return etree.parse(source).getroot()
+
+    raise TypeError(f"can't parse XML from {type(source).__name__}")
+
+
+@lru_cache(maxsize=256)
+def reverse_nsmap(
+    namespaces: tuple[tuple[str | None, str], ...],
+) -> dict[str, str | None]:
+    """Prefixes by namespace URI, for `tuple(element.nsmap.items())` (cached, as elements of a document usually share a few maps)"""
+    reverse: dict[str, str | None] = {XML_NAMESPACE: "xml"}
+    reverse.update((uri, prefix) for prefix, uri in namespaces)
+    return reverse
+
+
+def xml_to_tag(xml: XMLSource, lazy: bool = False, passthrough: bool = False) -> Tag:
+    if passthrough:
+        if lazy:
+            raise ValueError("lazy and passthrough parsing can't be combined")
+
+        return parse_passthrough(xml)
+
+    root = parse_document(xml)
 
     root_ns = root.nsmap
 
@@ -23,6 +79,9 @@ def xml_to_tag(xml: str) -> Tag:
         build_prefixed_name("xmlns", k): v for k, v in root_ns.items()
     }
 
+    if lazy:
+        return lazy_node(root)(**namespace_attributes)  # type: ignore
+
     return element_to_tag(root)(**namespace_attributes)
 
 
@@ -34,18 +93,47 @@ def str_to_tag(text: str | None) -> Literal | None:
     return None
 
 
-def process_children(element: etree._Element) -> Iterable[Tag]:
+def process_children(
+    element: etree._Element,
+    convert: Callable[[etree._Element], Tag] | None = None,
+) -> Iterable[Tag]:
     text = str_to_tag(element.text)
     if text:
         yield text
 
     for child in element:
-        yield element_to_tag(child)
+        yield (convert or element_to_tag)(child)
         tail = str_to_tag(child.tail)
         if tail:
             yield tail
 
 
+def element_name(element: etree._Element) -> str:
+    return str(element.tag).split("}")[-1]
+
+
+def element_attributes(element: etree._Element) -> dict[str, str]:
+    """Attributes of an element, with namespace URIs replaced by prefixes"""
+    attributes: dict[str, str] = {}
+    prefixes: dict[str, str | None] | None = None
+
+    for key, value in element.attrib.items():
+        if "{" in key:
+            nsurl, attr_name = key[1:].split("}")
+
+            # namespaces are looked up only for prefixed attributes, as building `nsmap` is not free
+            if prefixes is None:
+                prefixes = reverse_nsmap(tuple(element.nsmap.items()))
+
+            ns_name = prefixes.get(nsurl)
+
+            key = build_prefixed_name(ns_name, attr_name)
+
+        attributes[key] = value
+
+    return attributes
+
+
 def element_to_tag(element: etree._Element) -> Tag:
     if isinstance(element.tag, etree._Comment):
         return XMLComment(element.tag.text)
@@ -53,21 +141,171 @@ def element_to_tag(element: etree._Element) -> Tag:
     if not isinstance(element.tag, str):
         return Literal("")
 
-    tag_name = element.tag.split("}")[-1]
-    raw_attributes = element.attrib
+    return Tag(element_name(element))(
+        *process_children(element), **element_attributes(element)
+    )
 
-    reverse_nsmap = {v: k for k, v in element.nsmap.items()}
 
-    attributes: dict[str, str] = {}
+def lazy_node(element: etree._Element) -> Tag:
+    """Same as `element_to_tag`, but elements are wrapped into `LazyTag` instead of being converted"""
+    if not isinstance(element.tag, str):
+        return element_to_tag(element)
 
-    for key, value in raw_attributes.items():
-        if "{" in key:
-            nsurl, attr_name = key[1:].split("}")
+    return LazyTag(element)
 
-            ns_name = reverse_nsmap.get(nsurl)
 
-            key = build_prefixed_name(ns_name, attr_name)
+class LazyTag(Tag):
+    """
 
-        attributes[key] = value
+    Parsed tag (`Tag.from_str(..., lazy=True)`) that converts its lxml element on demand:
+    children are converted (into more lazy tags) the first time they're accessed, and attributes the first time they're accessed,
+    so a tree behaves the same as a fully converted one, but only the parts actually used become tags.
+
+    Tags with untouched children are rendered from the element directly.
+
+    """
+
+    __slots__ = ("element",)
+
+    element: etree._Element
+
+    def __init__(self, element: etree._Element):
+        self.element = element
+        self.tag_name = normalize_ident(element_name(element))
+        self.self_closing = True
+        self._cache = None
+        self._hash = None
+
+    def __getattr__(self, name: str) -> object:
+        # only called for unset slots: `_children` and `_attributes` are set here on first use
+        if name == "_children":
+            children: list[Node] = [*process_children(self.element, lazy_node)]
+            self._children = (
+                serialize_children(children) if config.serialize_values else children
+            )
+            return self._children
+
+        if name == "_attributes":
+            self._attributes = self.element_attributes()
+            return self._attributes
+
+        raise AttributeError(name)
+
+    def element_attributes(self) -> dict[str, Node]:
+        """Attributes of the element, converted the same way `Tag` converts them"""
+        convert = serialize_attribute if config.serialize_values else trunc
+
+        return {
+            normalize_ident(key): convert(value)
+            for key, value in element_attributes(self.element).items()
+        }
+
+    def converted(self, name: str) -> bool:
+        """Checks if `_children` or `_attributes` are converted, without converting them"""
+        try:
+            getattr(Tag, name).__get__(self)
+        except AttributeError:
+            return False
+
+        return True
+
+    def render_into(
+        self,
+        renderer: TreeRenderer,
+        out: list[str],
+        stack: list[Pending],
+    ) -> None:
+        if self.converted("_children"):
+            Tag.render_into(self, renderer, out, stack)
+            return
+
+        if not renderer.tab_size and not self.converted("_attributes"):
+            write_element(self.element, out)
+            return
+
+        # a temporary tag with the same contents, so nothing is kept after the render
+        view = Tag.__new__(Tag)
+        view.tag_name = self.tag_name
+        view.self_closing = self.self_closing
+        view._attributes = (
+            self._attributes
+            if self.converted("_attributes")
+            else self.element_attributes()
+        )
+        view._children = [*process_children(self.element, lazy_node)]
+        view._cache = None
+        view._hash = None
+
+        Tag.render_into(view, renderer, out, stack)
+
+    def __reduce__(self) -> tuple[Callable[..., Tag], tuple[object, ...]]:
+        # lxml elements can't be pickled, so a plain tag is restored instead
+        return plain_tag, (
+            self.tag_name,
+            self._children,
+            self._attributes,
+            self.self_closing,
+        )
 
-    return Tag(tag_name)(*process_children(element), **attributes)
+
+def plain_tag(
+    tag_name: str,
+    children: Sequence[Node],
+    attributes: Mapping[str, Node],
+    self_closing: bool,
+) -> Tag:
+    tag = Tag.__new__(Tag)
+    tag.tag_name = tag_name
+    tag._children = children  # type: ignore
+    tag._attributes = attributes  # type: ignore
+    tag.self_closing = self_closing
+    tag._cache = None
+    tag._hash = None
+    return tag
+
+
+def write_element(root: etree._Element, out: list[str]) -> None:
+    """Compact render of an element, the same as for its `element_to_tag` conversion"""
+    stack: list[etree._Element | str] = [root]
+    push = stack.append
+
+    while stack:
+        element = stack.pop()
+
+        if isinstance(element, str):
+            out.append(element)
+            continue
+
+        if not isinstance(element.tag, str):
+            # comments and processing instructions are rendered as empty literals
+            continue
+
+        tag_name = normalize_ident(element_name(element))
+        out.append("<" + tag_name)
+
+        for key, value in element_attributes(element).items():
+            value = value.replace('"', "&quot;")
+            out.append(f' {normalize_ident(key)}="{value}"')
+
+        text = element.text.strip() if element.text else ""
+
+        if not text and not len(element):
+            out.append("/>")
+            continue
+
+        out.append(">")
+        push(f"</{tag_name}>")
+
+        for child in reversed(element):
+            tail = child.tail
+
+            if tail:
+                tail = tail.strip()
+
+                if tail:
+                    push(tail)
+
+            push(child)
+
+        if text:
+            push(text)
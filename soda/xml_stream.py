@@ -0,0 +1,376 @@
+from __future__ import annotations
+
+import os
+from io import BytesIO
+from typing import (
+    IO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Union,
+    cast,
+)
+
+import lxml.etree as etree
+from wordstreamer import Renderable
+
+from .config_mod import config
+from .output import Sink, render_context, write_chunks
+from .renderer import TreeRenderer
+from .utils import escape
+from .xml_parse import build_prefixed_name, reverse_nsmap
+
+Source = Union[str, bytes, bytearray, "os.PathLike[str]", IO[bytes]]
+
+
+class Start:
+    """Start of an element, with prefixed name (`svg`, `sodipodi:namedview`) and attributes (including `xmlns` declarations)"""
+
+    __slots__ = ("tag_name", "attributes", "depth")
+
+    def __init__(self, tag_name: str, attributes: Dict[str, str], depth: int = 0):
+        self.tag_name = tag_name
+        self.attributes = attributes
+        self.depth = depth
+
+    def __repr__(self) -> str:
+        return f"Start({self.tag_name!r}, {self.attributes!r}, depth={self.depth})"
+
+
+class End:
+    """End of an element"""
+
+    __slots__ = ("tag_name", "depth")
+
+    def __init__(self, tag_name: str, depth: int = 0):
+        self.tag_name = tag_name
+        self.depth = depth
+
+    def __repr__(self) -> str:
+        return f"End({self.tag_name!r}, depth={self.depth})"
+
+
+class Text:
+    """Text between tags, unescaped"""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def __repr__(self) -> str:
+        return f"Text({self.text!r})"
+
+
+class Comment:
+    """XML comment"""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def __repr__(self) -> str:
+        return f"Comment({self.text!r})"
+
+
+# filters could also put renderables (tags, literals, ...) into the stream, they are rendered in place
+Event = Union[Start, End, Text, Comment, Renderable]
+EventFilter = Callable[[Iterator[Event]], Iterable[Event]]
+
+
+def open_source(source: Source) -> Union[str, IO[bytes]]:
+    """Argument for `iterparse`: paths and binary files are passed as they are, strings and bytes are document text read from memory (as in `Tag.from_str`)"""
+    if isinstance(source, str):
+        return BytesIO(source.encode())
+
+    if isinstance(source, (bytes, bytearray)):
+        return BytesIO(source)
+
+    if isinstance(source, os.PathLike):
+        return os.fspath(source)
+
+    return source
+
+
+def qualified_name(name: str, prefix: Optional[str], element: etree._Element) -> str:
+    """Name with prefix for `{uri}name` names of lxml, `prefix` is looked up in namespaces of `element` if not given"""
+    uri, local_name = name[1:].split("}")
+
+    if prefix is None:
+        prefix = reverse_nsmap(tuple(element.nsmap.items())).get(uri)
+
+    return build_prefixed_name(prefix, local_name)
+
+
+def clean_text(text: Optional[str]) -> Optional[Text]:
+    """Text event for text around tags, stripped the same way `Tag.from_str` does it"""
+    if text:
+        text = text.strip()
+
+        if text:
+            return Text(text)
+
+    return None
+
+
+def parse_events(source: Source, huge_tree: bool = False) -> Iterator[Event]:
+    """
+
+    Parses an XML document incrementally, yielding `Start`, `End`, `Text` and `Comment` events.
+
+    `source` is document text (`str` or bytes), a path (`os.PathLike`, e.g. `pathlib.Path`) or a binary file object. Text is stripped of surrounding whitespace (as `Tag.from_str` does),
+    processing instructions are skipped.
+
+    Parsed elements are cleared as soon as they end, so memory use depends on depth of the document, not its size.
+    Pass `huge_tree=True` for documents with very deep nesting or very long text nodes.
+
+    """
+    parser = etree.iterparse(
+        open_source(source),
+        events=("start", "end", "comment", "pi", "start-ns"),
+        huge_tree=huge_tree,
+    )
+    declarations: Dict[str, str] = {}
+    depth = 0
+    # text after an event is complete only when the next event comes: (element, True) for its text, (element, False) for its tail
+    pending: Optional[tuple[etree._Element, bool]] = None
+
+    for action, item in parser:
+        if pending is not None:
+            element, is_text = pending
+            text = clean_text(element.text if is_text else element.tail)
+
+            if text is not None:
+                yield text
+
+            if not is_text:
+                # the element and its tail are done, only ancestors stay in the tree
+                parent = element.getparent()
+
+                if parent is not None:
+                    parent.remove(element)
+
+            pending = None
+
+        if isinstance(item, tuple):
+            # start-ns
+            prefix, uri = item
+            declarations[build_prefixed_name("xmlns", prefix)] = uri
+            continue
+
+        if item is None:
+            continue
+
+        if action == "comment":
+            yield Comment(item.text or "")
+            pending = (item, False)
+            continue
+
+        if action == "pi":
+            # processing instructions are skipped, but text after them is not
+            pending = (item, False)
+            continue
+
+        tag_name = cast(str, item.tag)
+
+        if tag_name[0] == "{":
+            tag_name = qualified_name(tag_name, item.prefix or "", item)
+
+        if action == "start":
+            attributes = declarations
+            declarations = {}
+
+            for key, value in item.attrib.items():
+                if key[0] == "{":
+                    key = qualified_name(key, None, item)
+
+                attributes[key] = value
+
+            yield Start(tag_name, attributes, depth)
+            depth += 1
+            pending = (item, True)
+        else:
+            # text of the element, or tail of its last child, was yielded by now
+            depth -= 1
+            yield End(tag_name, depth)
+            pending = (item, False)
+
+    if pending is not None:
+        text = clean_text(pending[0].tail)
+
+        if text is not None:
+            yield text
+
+
+# whitespace which parsers replace with spaces in attribute values, unless it's written as a character reference
+WHITESPACE_REFERENCES = (("\n", "&#10;"), ("\t", "&#9;"), ("\r", "&#13;"))
+
+
+def escape_attribute(value: str) -> str:
+    """Attribute value escaped to be read back as it is (including newlines and tabs)"""
+    value = escape(value).replace('"', "&quot;")
+
+    if "\n" in value or "\t" in value or "\r" in value:
+        for char, reference in WHITESPACE_REFERENCES:
+            value = value.replace(char, reference)
+
+    return value
+
+
+def start_tag(event: Start) -> str:
+    """Opening tag of `event`, without the closing bracket"""
+    attributes = "".join(
+        [
+            " " + key + '="' + escape_attribute(value) + '"'
+            for key, value in event.attributes.items()
+        ]
+    )
+    return f"<{event.tag_name}{attributes}"
+
+
+def render_events(events: Iterable[Event]) -> Iterator[str]:
+    """
+
+    Renders events as compact markup, yielding one string per event. Elements without content are self-closing (`<g/>`).
+
+    Text and attribute values are escaped, renderables are rendered with `TreeRenderer`.
+
+    """
+    renderer: Optional[TreeRenderer] = None
+    # start tag is closed when the next event tells whether the element is empty
+    open_tag: Optional[str] = None
+
+    for event in events:
+        cls = event.__class__
+
+        if open_tag is not None:
+            if cls is End:
+                yield open_tag + "/>"
+                open_tag = None
+                continue
+
+            yield open_tag + ">"
+            open_tag = None
+
+        if cls is Start:
+            open_tag = start_tag(event)  # type: ignore
+        elif cls is End:
+            yield "</" + event.tag_name + ">"  # type: ignore
+        elif cls is Text:
+            yield escape(event.text)  # type: ignore
+        elif cls is Comment:
+            yield "<!--" + event.text + "-->"  # type: ignore
+        else:
+            if renderer is None:
+                renderer = TreeRenderer(render_context(False, 2))
+
+            yield renderer.render(event)  # type: ignore
+
+    if open_tag is not None:
+        yield open_tag + "/>"
+
+
+def iter_stream_chunks(
+    events: Iterable[Event],
+    encoding: str = "utf-8",
+    chunk_size: Optional[int] = None,
+) -> Iterator[bytes]:
+    """Rendered events as encoded chunks of at least `chunk_size` characters (`config.chunk_size` by default)"""
+    chunk_size = chunk_size or config.chunk_size
+    pieces: List[str] = []
+    size = 0
+
+    for piece in render_events(events):
+        pieces.append(piece)
+        size += len(piece)
+
+        if size >= chunk_size:
+            yield "".join(pieces).encode(encoding)
+            pieces.clear()
+            size = 0
+
+    if pieces:
+        yield "".join(pieces).encode(encoding)
+
+
+def transform(
+    source: Source,
+    sink: Sink,
+    *filters: EventFilter,
+    encoding: str = "utf-8",
+    chunk_size: Optional[int] = None,
+    huge_tree: bool = False,
+) -> int:
+    """
+
+    Streams a document from `source` to `sink`, passing its events through `filters` in order, without building a tree:
+
+    ```python
+    no_metadata = drop_elements(lambda start: start.tag_name == "metadata")
+
+    with open("map.svg", "rb") as source, open("out.svg", "wb") as sink:
+        transform(source, sink, no_metadata, map_events(recolor))
+    ```
+
+    A filter takes an iterator of events and returns (or yields) events: it could change, drop or add them.
+    `sink` is anything `write_to` accepts, except text files. Returns the number of bytes written.
+
+    """
+    events: Iterable[Event] = parse_events(source, huge_tree)
+
+    for event_filter in filters:
+        events = event_filter(iter(events))
+
+    return write_chunks(sink, iter_stream_chunks(events, encoding, chunk_size))
+
+
+def map_events(
+    function: Callable[[Event], Union[Event, Iterable[Event], None]],
+) -> EventFilter:
+    """
+
+    Filter calling `function` for each event: it returns the event to pass on (changed or not),
+    None to drop it, or a list of events to put in its place.
+
+    """
+
+    def event_filter(events: Iterator[Event]) -> Iterator[Event]:
+        for event in events:
+            result = function(event)
+
+            if result is None:
+                continue
+
+            if isinstance(result, (list, tuple)):
+                yield from result
+            else:
+                yield result  # type: ignore
+
+    return event_filter
+
+
+def drop_elements(predicate: Callable[[Start], bool]) -> EventFilter:
+    """Filter removing elements (with everything inside) whose `Start` events match `predicate`"""
+
+    def event_filter(events: Iterator[Event]) -> Iterator[Event]:
+        for event in events:
+            if event.__class__ is Start and predicate(event):  # type: ignore
+                skipped = 1
+
+                while skipped:
+                    inner = next(events)
+
+                    if inner.__class__ is Start:
+                        skipped += 1
+                    elif inner.__class__ is End:
+                        skipped -= 1
+
+                continue
+
+            yield event
+
+    return event_filter
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import pytest
+
+from soda import config
+
+
+class FakeArray:
+    """Minimal stand-in for a NumPy float array: `dtype.kind` and `tolist`"""
+
+    class dtype:
+        kind = "f"
+
+    def __init__(self, values: list):
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def tolist(self) -> list:
+        return list(self.values)
+
+
+@pytest.fixture
+def fake_array() -> type[FakeArray]:
+    return FakeArray
+
+
+@pytest.fixture(autouse=True)
+def restore_config():
+    """Tests change global `config` flags freely, they are set back after each test"""
+    saved = {
+        key: value for key, value in vars(config).items() if not key.startswith("__")
+    }
+    yield
+
+    for key, value in saved.items():
+        setattr(config, key, value)
@@ -0,0 +1,134 @@
+from soda import Tag
+from soda.batch import convert_many, main
+
+
+def recolor(root: Tag) -> None:
+    root["fill"] = "blue"
+
+    if root.tag_name == "fail":
+        raise ValueError("bad icon")
+
+
+def write_icons(directory, count: int) -> list:
+    paths = []
+
+    for i in range(count):
+        path = directory / f"icon{i}.svg"
+        path.write_text(f'<svg><rect x="{i}"/></svg>')
+        paths.append(path)
+
+    broken = directory / "broken.svg"
+    broken.write_text("<svg><rect></svg>")
+    failing = directory / "failing.svg"
+    failing.write_text("<fail/>")
+
+    return [*paths[:2], broken, *paths[2:], failing]
+
+
+class TestBatch:
+    def test_convert(self, tmp_path):
+        sources = write_icons(tmp_path, 10)
+
+        for workers in [1, 2]:
+            results = [
+                *convert_many(
+                    sources, recolor, workers=workers, batch_size=3, max_in_flight=2
+                )
+            ]
+
+            assert [result.source for result in results] == [
+                str(path) for path in sources
+            ]
+            assert [result.ok for result in results].count(False) == 2
+
+            broken, failing = [result for result in results if not result.ok]
+            assert "broken.svg" in broken.source and broken.render_time == 0
+            assert "ValueError: bad icon" in failing.error
+            assert failing.parse_time > 0
+
+            assert results[0].output == '<svg fill="blue"><rect x="0"/></svg>'
+
+    def test_output_dir(self, tmp_path):
+        sources = write_icons(tmp_path, 3)
+        output = tmp_path / "out"
+
+        results = [*convert_many(sources, output_dir=output, workers=2)]
+
+        assert results[0].output == str(output / "icon0.svg")
+        assert (output / "icon2.svg").read_text() == '<svg><rect x="2"/></svg>'
+        assert not (output / "broken.svg").exists()
+
+    def test_collisions(self, tmp_path):
+        first = tmp_path / "a" / "icon.svg"
+        second = tmp_path / "b" / "icon.svg"
+
+        for i, path in enumerate([first, second]):
+            path.parent.mkdir()
+            path.write_text(f'<svg><rect x="{i}"/></svg>')
+
+        output = tmp_path / "out"
+        results = [*convert_many([first, second], output_dir=output)]
+
+        assert results[0].ok and not results[1].ok
+        assert "already written for" in results[1].error
+        assert (output / "icon.svg").read_text() == '<svg><rect x="0"/></svg>'
+
+        # paths relative to root are kept
+        results = [*convert_many([first, second], output_dir=output, root=tmp_path)]
+
+        assert all(result.ok for result in results)
+        assert results[1].output == str(output / "b" / "icon.svg")
+        assert (output / "b" / "icon.svg").read_text() == '<svg><rect x="1"/></svg>'
+
+        results = [*convert_many([first], output_dir=output, root=tmp_path / "b")]
+        assert "is not under" in results[0].error
+
+        # inputs are never overwritten
+        results = [*convert_many([first], recolor, output_dir=first.parent)]
+        assert "would overwrite the input" in results[0].error
+        assert first.read_text() == '<svg><rect x="0"/></svg>'
+
+    def test_failed_write(self, tmp_path):
+        sources = write_icons(tmp_path, 1)
+        output = tmp_path / "out"
+        output.mkdir()
+        (output / "icon0.svg").write_text("previous")
+
+        class Broken:
+            def __str__(self) -> str:
+                raise ValueError("can't render")
+
+        def fail(root: Tag) -> None:
+            root["fill"] = Broken()  # fails while writing
+
+        results = [*convert_many(sources[:1], fail, output_dir=output)]
+
+        assert "can't render" in results[0].error
+        assert (output / "icon0.svg").read_text() == "previous"
+        assert [path.name for path in output.iterdir()] == ["icon0.svg"]
+
+    def test_cli(self, tmp_path, capsys):
+        sources = write_icons(tmp_path, 3)
+        output = tmp_path / "out"
+        listed = tmp_path / "list.txt"
+        listed.write_text("\n".join(str(path) for path in sources[1:]))
+
+        status = main(
+            [
+                str(sources[0]),
+                "--from-file",
+                str(listed),
+                "-o",
+                str(output),
+                "-t",
+                "test_batch:recolor",
+                "-j",
+                "2",
+            ]
+        )
+
+        assert status == 1
+        assert "3 converted, 2 failed" in capsys.readouterr().err
+        assert (
+            output / "icon1.svg"
+        ).read_text() == '<svg fill="blue"><rect x="1"/></svg>'
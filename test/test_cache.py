@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import pickle
+
+from soda import Fragment, Tag, XMLComment
+from soda.output import iter_chunks
+
+
+def build_tree() -> Tag:
+    return Tag.svg(
+        Tag.g(Tag.rect(width=1), Tag.rect(width=2), id="first"),
+        Tag.g(Fragment(Tag.circle(r=1), "text"), id="second"),
+        [Tag.text("nested")],
+        XMLComment("comment"),
+    )
+
+
+def fresh(tag: Tag) -> Tag:
+    return pickle.loads(pickle.dumps(tag))
+
+
+class TestCache:
+    def test_cached_render(self):
+        root = build_tree().enable_cache()
+        expected = build_tree()
+
+        for pretty in [False, True]:
+            assert root.render(pretty) == expected.render(pretty)
+            assert root.render(pretty) == expected.render(pretty)
+
+        assert len(root._cache.entries) == 2
+
+    def test_cache_hit(self):
+        root = build_tree().enable_cache()
+        root.render()
+
+        root._cache.entries[(False, 0, 0)] = "<cached/>"
+        assert root.render() == "<cached/>"
+
+    def test_mutations(self):
+        root = build_tree().enable_cache()
+        first = root[0]
+        second = root[1]
+        rect = first[0]
+        fragment = second[0]
+        nested = root[2][0]
+
+        mutations = [
+            lambda: rect.set_attribute("width", 10),
+            lambda: rect(Tag.title("hi")),
+            lambda: first.insert(0, "text"),
+            lambda: first.pop(),
+            lambda: fragment.append(Tag.line),
+            lambda: nested.attributes.update(x=1),
+            lambda: second.children.clear(),
+            lambda: root.__setitem__(0, Tag.g),
+            lambda: root.__setitem__("width", 100),
+        ]
+
+        for mutate in mutations:
+            root.render()
+            root.render(True)
+            mutate()
+
+            assert root.render() == fresh(root).render()
+            assert root.render(True) == fresh(root).render(True)
+
+    def test_reads(self):
+        root = build_tree().enable_cache()
+        root.render()
+
+        assert root.children[0].attributes["id"] == "first"
+        assert root._cache.entries and root[0]._cache.entries
+
+    def test_partial_invalidation(self):
+        root = build_tree().enable_cache()
+        first, second = root[0], root[1]
+        root.render()
+
+        first[0]["width"] = 5
+
+        assert not root._cache.entries
+        assert not first._cache.entries
+        assert second._cache.entries
+
+    def test_attribute_tags(self):
+        value = Tag.a(x=1)
+        root = Tag.g(Tag.rect(value=value)).enable_cache()
+        root.render()
+
+        value["x"] = 2
+
+        assert root.render() == '<g><rect value="<a x=&quot;2&quot;/>"/></g>'
+
+    def test_shared_child(self):
+        shared = Tag.rect(width=1)
+        first = Tag.g(shared).enable_cache()
+        second = Tag.g(shared).enable_cache()
+        first.render()
+        second.render()
+
+        shared["width"] = 2
+
+        assert first.render() == second.render() == '<g><rect width="2"/></g>'
+
+    def test_chunked(self):
+        root = build_tree().enable_cache()
+
+        assert "".join(iter_chunks(root, 8)) == build_tree().render()
+        assert not root._cache.entries
+
+        root.render()
+        assert "".join(iter_chunks(root, 8)) == build_tree().render()
+
+    def test_deep_tree(self):
+        def chain() -> list[Tag]:
+            tags = [Tag.g(id="0")]
+
+            for i in range(1, 2000):
+                tags.append(Tag.g(Tag.rect(x=i), id=str(i)))
+                tags[-2].append(tags[-1])
+
+            return tags
+
+        tags = chain()
+        root = tags[0].enable_cache()
+        output = root.render()
+
+        # each level stores its own part and references the output of the level below, instead of copying it
+        pieces: dict[int, object] = {}
+        pending = [chunk for tag in tags for chunk in tag._cache.entries.values()]
+
+        while pending:
+            chunk = pending.pop()
+
+            if id(chunk) not in pieces:
+                pieces[id(chunk)] = chunk
+
+                if isinstance(chunk, tuple):
+                    pending.extend(chunk)
+
+        strings = [piece for piece in pieces.values() if isinstance(piece, str)]
+        assert sum(map(len, strings)) < 2 * len(output)
+
+        tags[-1]["x"] = 1
+        expected = chain()
+        expected[-1]["x"] = 1
+
+        assert root.render() == expected[0].render()
+
+    def test_pickle(self):
+        root = build_tree().enable_cache()
+        root.render()
+
+        copy = fresh(root)
+
+        assert copy._cache is not None
+        assert not copy._cache.entries
+        assert copy.render() == root.render()
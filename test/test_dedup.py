@@ -0,0 +1,84 @@
+import pytest
+
+from soda import Fragment, Root, Tag, XMLComment
+from soda.dedup import dedupe
+
+
+def icon() -> Tag:
+    return Tag.g(
+        Tag.path(d="M0 0 L10 10 L20 0 Z" * 4, fill="red"),
+        Tag.circle(cx=5, cy=5, r=3),
+        transform="scale(2)",
+    )
+
+
+class TestDedup:
+    def test_hoisting(self):
+        root = Root(*[icon() for _ in range(3)])
+
+        assert dedupe(root) == 1
+        assert root.render() == (
+            "<svg>"
+            f'<defs><g transform="scale(2)" id="soda-0">{icon()[0]}{icon()[1]}</g></defs>'
+            '<use href="#soda-0"/><use href="#soda-0"/><use href="#soda-0"/>'
+            "</svg>"
+        )
+
+    def test_thresholds(self):
+        root = Root(icon(), icon())
+        before = root.render()
+
+        assert dedupe(root, min_count=3) == 0
+        assert dedupe(root, min_size=1000) == 0
+        assert root.render() == before
+
+        small = Root(*[Tag.rect(x=1) for _ in range(10)])
+        assert dedupe(small, min_size=0) == 0
+
+        with pytest.raises(ValueError):
+            dedupe(root, min_count=1)
+
+    def test_nested_and_flattened(self):
+        path = icon()[0]
+        root = Root(
+            icon(),
+            Tag.g([icon()], Fragment(icon())),
+            Tag.g(Tag.rect, Tag.path(d="M0 0 L10 10 L20 0 Z" * 4, fill="red")),
+        )
+
+        assert dedupe(root, min_count=2) == 2
+
+        defs = root[0]
+        assert defs.tag_name == "defs"
+        assert len(defs.children) == 2
+
+        group, hoisted_path = defs[0], defs[1]
+        assert group[0] == Tag.use(href=f"#{hoisted_path['id']}")
+        assert hoisted_path.render() == path.copy()(id=hoisted_path["id"]).render()
+        use = Tag.use(href=f"#{group['id']}")
+        assert root[1] == use
+        assert [*root[2]] == [use, use]
+        assert root[3][1] == Tag.use(href=f"#{hoisted_path['id']}")
+
+    def test_skipped_subtrees(self):
+        path = icon()[0]
+        comment = XMLComment("opaque")
+        root = Root(
+            Tag.g(path.copy()(id="first")),
+            Tag.g(path.copy()(id="second")),
+            Tag.clipPath(path.copy()),
+            Tag.clipPath(path.copy()),
+            Tag.g(comment, Tag.rect(width=1000000, height=1000000)),
+            Tag.g(comment, Tag.rect(width=1000000, height=1000000)),
+        )
+        before = root.render()
+
+        assert dedupe(root) == 0
+        assert root.render() == before
+
+    def test_id_collision(self):
+        root = Root(Tag.g(id="soda-1"), icon(), icon(), Tag.defs(Tag.style("")))
+
+        assert dedupe(root) == 1
+        assert root[-1][-1]["id"] == "soda-1-"
+        assert root[1] == Tag.use(href="#soda-1-")
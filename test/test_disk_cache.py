@@ -0,0 +1,134 @@
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from soda import Fragment, Literal, Root, Slot, Tag, XMLComment, config
+from soda.disk_cache import DiskCache, tree_key
+from soda.utils import Escaped
+
+
+def build_tree() -> Tag:
+    return Root(viewBox="0 0 10 10")(
+        Tag.g(
+            Tag.rect(x=1 / 3, fill=Tag.a(b='"')),
+            "a<b",
+            Literal("<x/>", escape=False),
+            Fragment(1.5, "text"),
+        )
+    )
+
+
+def render_cached(directory: str) -> str:
+    return DiskCache(directory).render(build_tree())
+
+
+class TestDiskCache:
+    def test_keys(self):
+        config.decimal_length = 3
+        key = tree_key(build_tree())
+
+        assert key is not None
+        assert key == tree_key(build_tree())
+        assert key != tree_key(build_tree(), pretty=True)
+        assert tree_key(Tag.g(x=1)) != tree_key(Tag.g(x=2))
+        assert tree_key(Tag.g("a", "b")) != tree_key(Tag.g("ab"))
+        assert tree_key(Tag.g("a&amp;")) != tree_key(Tag.g(Escaped("a&amp;")))
+        assert tree_key(Tag.g("a\0b")) != tree_key(Tag.g("a", "b"))
+        assert tree_key(Tag.g(x="y")) != tree_key(Tag.g("x", "y"))
+        assert tree_key(Tag.g(Tag.a, x=Tag.b)) != tree_key(Tag.g(Tag.b, x=Tag.a))
+
+        assert tree_key(Root(XMLComment("custom component"))) is None
+        assert tree_key(Tag.g(x=Slot("x"))) is None
+
+    def test_stable_keys(self):
+        code = (
+            "import sys; "
+            f"sys.path.insert(0, {os.path.dirname(__file__)!r}); "
+            "from test_disk_cache import build_tree; "
+            "from soda.disk_cache import tree_key; "
+            "print(tree_key(build_tree()))"
+        )
+        keys = {
+            subprocess.run(
+                [sys.executable, "-c", code],
+                env={**os.environ, "PYTHONHASHSEED": seed},
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+            for seed in ("1", "2")
+        }
+
+        config.decimal_length = 3
+        assert keys == {tree_key(build_tree())}
+
+    def test_render(self, tmp_path):
+        cache = DiskCache(tmp_path)
+        tree = build_tree()
+        expected = tree.render(pretty=True)
+
+        assert cache.render(tree, pretty=True) == expected
+        assert len(cache.files()) == 1
+
+        # a hit doesn't render, so changing what's stored shows up
+        key = tree_key(tree, pretty=True)
+        assert key is not None
+        cache.path(key).write_bytes(b"stored")
+        assert cache.render(tree, pretty=True) == "stored"
+
+        config.render_cache = cache
+
+        try:
+            assert build_tree().render(pretty=True) == "stored"
+            assert build_tree().render() == build_tree().render()
+        finally:
+            config.render_cache = None
+
+        # the tag in `fill` is rendered with `render()`, so it's cached too
+        assert len(cache.files()) == 3
+
+        cache.clear()
+        assert cache.files() == []
+        assert cache.render(tree, pretty=True) == expected
+
+    def test_passthrough(self, tmp_path):
+        document = b"<svg><g  id='x'></g></svg>"
+        config.render_cache = DiskCache(tmp_path)
+
+        # passthrough trees aren't cached, so neither order gets the output of the other
+        assert Tag.from_str(document, passthrough=True).render() == document.decode()
+        assert Tag.svg(Tag.g(id="x")).render() == '<svg><g id="x"/></svg>'
+
+        config.render_cache = DiskCache(tmp_path / "other")
+
+        assert Tag.svg(Tag.g(id="x")).render() == '<svg><g id="x"/></svg>'
+        assert Tag.from_str(document, passthrough=True).render() == document.decode()
+
+        changed = Tag.from_str(document, passthrough=True)
+        changed["width"] = 1
+        assert tree_key(changed) is None
+        assert changed.render() == "<svg width=\"1\"><g  id='x'></g></svg>"
+
+    def test_eviction(self, tmp_path):
+        cache = DiskCache(tmp_path, max_size=1000)
+        tags = [Tag.text("x" * 100, index=i) for i in range(20)]
+
+        for tag in tags[:5]:
+            cache.render(tag)
+
+        os.utime(cache.path(tree_key(tags[0])), (0, 0))  # type: ignore
+
+        for tag in tags[5:]:
+            cache.render(tag)
+
+        assert cache.used_size() <= 1000
+        assert cache.get(tree_key(tags[0])) is None  # type: ignore
+        assert cache.get(tree_key(tags[-1])) == tags[-1].render().encode()  # type: ignore
+
+    def test_processes(self, tmp_path):
+        with ProcessPoolExecutor(4) as pool:
+            results = [*pool.map(render_cached, [str(tmp_path)] * 16)]
+
+        assert results == [build_tree().render()] * 16
+        assert len(DiskCache(tmp_path).files()) == 1
@@ -0,0 +1,98 @@
+import math
+from random import Random
+
+import pytest
+
+from soda import config
+from soda.formatting import CACHED_RANGE, format_many, format_number, trunc
+from soda.paths import Path, value_to_str
+
+VALUES = [
+    0,
+    1,
+    -1,
+    CACHED_RANGE,
+    -CACHED_RANGE,
+    CACHED_RANGE + 1,
+    10**20,
+    0.5,
+    -0.5,
+    2.5,
+    -1023.5,
+    1 / 3,
+    2.0004,
+    2.0,
+    -0.0,
+    1e-10,
+    1e20,
+    float("inf"),
+    True,
+    False,
+    "text",
+]
+
+
+class TestFormatting:
+    def test_same_as_trunc(self):
+        config.decimal_length = 3
+
+        for decimal_length in [0, 1, 3, 5]:
+            config.decimal_length = decimal_length
+
+            for value in VALUES:
+                assert format_number(value) == str(trunc(value)), value
+
+            assert format_many(VALUES) == [str(trunc(value)) for value in VALUES]
+
+        config.decimal_length = 3
+
+    def test_random_floats(self):
+        rng = Random(0)
+        values = [
+            rng.uniform(-1, 1) * 10 ** rng.randint(-8, 18) for _ in range(10000)
+        ] + [round(rng.uniform(-100, 100), 3) + 0.0005 for _ in range(1000)]
+
+        for decimal_length in range(7):
+            config.decimal_length = decimal_length
+            assert format_many(values) == [str(trunc(value)) for value in values]
+
+        config.decimal_length = 3
+
+    def test_nan(self):
+        assert format_number(math.nan) == "nan"
+        assert format_many([math.nan]) == ["nan"]
+
+    def test_decimal_length_change(self):
+        config.decimal_length = 3
+        assert format_number(0.5) == "0.5"
+
+        config.decimal_length = 0
+        assert format_number(0.5) == "0.0"
+        assert format_number(1.5) == "2.0"
+
+        config.decimal_length = 3
+        assert format_number(0.5) == "0.5"
+
+    def test_arrays(self, fake_array):
+        config.decimal_length = 2
+        assert format_many(fake_array([1 / 3, 2.0, 0.5])) == ["0.33", "2", "0.5"]
+        assert format_many(range(3)) == ["0", "1", "2"]
+
+    def test_numpy(self):
+        numpy = pytest.importorskip("numpy")
+        values = numpy.random.default_rng(0).random(10000) * 10.0 ** numpy.arange(
+            -5, 15
+        ).repeat(500)
+        values = numpy.concatenate([values, [1.0004, 0.0005, 56294995342131.51]])
+
+        for array in [values, values.astype(numpy.float32)]:
+            assert format_many(array) == [format_number(x) for x in array.tolist()]
+        config.decimal_length = 3
+
+    def test_paths(self):
+        config.decimal_length = 3
+        assert value_to_str is format_number
+        assert (
+            Path.moveto(1 / 3, 2.0) + Path.arc(10, 10.5, 0, False, True, 1e-10, -0.0)
+            == "M 0.333 2A 10 10.5 0 0 1 0.0 0"
+        )
@@ -0,0 +1,93 @@
+import pickle
+
+from soda import Tag, config
+from soda.xml_parse import LazyTag
+
+DOCUMENT = """<?xml version="1.0"?>
+<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" viewBox="0 0 10 10">
+    <!-- comment -->
+    <defs><linearGradient id="gradient"><stop offset="0" stop-color="red"/></linearGradient></defs>
+    <g id="group" data_value='say "hi"'>
+        text <rect x="1" y="2"/> tail <?pi x?>
+        <use xlink:href="#group" xml:space="preserve"/>
+        <g><!-- only a comment --></g>
+        <g>   </g>
+    </g>
+    <text>a &amp; b</text>
+</svg>
+"""
+
+
+def converted(tag: LazyTag) -> bool:
+    return tag.converted("_children") or tag.converted("_attributes")
+
+
+class TestLazyParse:
+    def test_render(self):
+        eager = Tag.from_str(DOCUMENT)
+        lazy = Tag.from_str(DOCUMENT, lazy=True)
+
+        assert isinstance(lazy, LazyTag)
+        assert lazy.render() == eager.render()
+        assert lazy.render(pretty=True) == eager.render(pretty=True)
+        assert lazy.render(pretty=True, tab_size=4) == eager.render(
+            pretty=True, tab_size=4
+        )
+
+        # rendering doesn't convert anything below the root
+        assert not any(
+            converted(child) for child in lazy._children if isinstance(child, LazyTag)
+        )
+
+    def test_changes(self):
+        eager = Tag.from_str(DOCUMENT)
+        lazy = Tag.from_str(DOCUMENT, lazy=True)
+
+        for root in [eager, lazy]:
+            # the comment is the first child
+            group = root.children[2]
+            group["fill"] = "blue"
+            group.children[1]["x"] = 5
+            root.children[1].children.append(Tag.circle(r=1))
+
+        assert lazy.render() == eager.render()
+        assert lazy.render(pretty=True) == eager.render(pretty=True)
+
+        _, defs, group, text = lazy.children
+        assert defs.converted("_children") and group.converted("_children")
+        # untouched tags stay as they are
+        assert not converted(text)
+        assert not converted(group.children[4])  # <use>
+
+        # comparison goes through the whole tree
+        assert lazy == eager
+
+    def test_serialized_values(self):
+        config.serialize_values = True
+
+        try:
+            eager = Tag.from_str(DOCUMENT)
+            lazy = Tag.from_str(DOCUMENT, lazy=True)
+            lazy.children[2]["id"] = "changed"
+            eager.children[2]["id"] = "changed"
+            assert lazy.render() == eager.render()
+        finally:
+            config.serialize_values = False
+
+    def test_pickle(self):
+        lazy = Tag.from_str(DOCUMENT, lazy=True)
+        restored = pickle.loads(pickle.dumps(lazy))
+
+        assert type(restored) is Tag
+        assert restored.render() == Tag.from_str(DOCUMENT).render()
+
+    def test_copy(self):
+        lazy = Tag.from_str(DOCUMENT, lazy=True)
+        copy = lazy.copy()
+        copy["id"] = "copy"
+
+        eager_copy = Tag.from_str(DOCUMENT).copy()
+        eager_copy["id"] = "copy"
+
+        assert copy.render() == eager_copy.render()
+        assert 'id="copy"' not in lazy.render()
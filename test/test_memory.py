@@ -0,0 +1,73 @@
+import sys
+
+from soda import Fragment, Literal, Root, Tag, XMLComment
+from soda.memory import tree_size
+
+
+class TestMemory:
+    def test_counts(self):
+        shared = Tag.rect(x=1.5, y=2, fill="red")
+        tree = Root(
+            Tag.g(shared, [shared, ["text", Literal("literal")]], id="group"),
+            Fragment(Tag.circle(r=1000)),
+            XMLComment("comment"),
+        )
+        size = tree.tree_size()
+
+        # the shared rect is counted once
+        assert size.nodes == 7
+        assert size.by_kind["rect"].nodes == 1
+        assert size.by_kind["rect"].attributes == 3
+        assert size.by_kind["g"].children == 6
+        assert size.by_kind["Fragment"].children == 1
+        assert size.by_kind["circle"].attributes == 1
+        assert size.by_kind["XMLComment"].nodes == 1
+
+        assert size.string_bytes == sum(
+            len(text) for text in ["red", "text", "literal", "group", "comment"]
+        )
+        assert size.nodes == sum(entry.nodes for entry in size.by_kind.values())
+        assert size.object_bytes == sum(
+            entry.object_bytes for entry in size.by_kind.values()
+        )
+        assert "rect" in size.report()
+
+    def test_object_bytes(self):
+        tag = Tag.circle(cx=1.5, cy=2.5, r=3, fill="red")
+        expected = (
+            sys.getsizeof(tag)
+            + sys.getsizeof(tag._attributes)
+            + sys.getsizeof(1.5) * 2
+            + sys.getsizeof("red")
+        )
+        assert tree_size(tag).object_bytes == expected
+
+        # empty tags share placeholders
+        assert tree_size(Tag.g).object_bytes == sys.getsizeof(Tag.g)
+
+        # render cache is counted too
+        cached = Tag.g(tag).enable_cache()
+        uncached = tree_size(cached).object_bytes
+        cached.render()
+        assert tree_size(cached).object_bytes > uncached
+
+    def test_frozen(self):
+        original = Tag.g(Tag.rect(x=1.5), id="a").freeze()
+        clones = [original.clone() for _ in range(10)]
+        size = tree_size(Tag.svg(*clones))
+
+        assert size.by_kind["g"].nodes == 10
+        # frozen children and attributes are shared by clones
+        assert size.by_kind["rect"].nodes == 1
+        assert size.by_kind["g"].attributes == 10
+        assert size.string_bytes == len("a")
+
+    def test_deep(self):
+        root = leaf = Tag.g()
+
+        for _ in range(10000):
+            child = Tag.g()
+            leaf(child)
+            leaf = child
+
+        assert tree_size(root).nodes == 10001
@@ -0,0 +1,131 @@
+import pytest
+
+from soda import Root, Tag
+from soda.optimize import optimize, short_color
+from soda.paths import PATH_NUMBER, compact_path, split_path
+
+
+class TestOptimize:
+    def test_passes(self):
+        root = Tag.from_str(
+            '<svg viewBox="0 0 10 10">'
+            '<g><g><rect fill="#FFFFFF" stroke-width="1" opacity="1"/></g></g>'
+            '<g stroke-width="2"><path d="M 10,30 L 20,20 z" stroke-width="1" stroke="rgb(255, 0, 0)"/></g>'
+            "<g><defs/></g>"
+            "</svg>"
+        )
+        before = len(root.render())
+        saved = optimize(root)
+
+        assert root.render() == (
+            '<svg viewBox="0 0 10 10">'
+            '<rect fill="#fff"/>'
+            '<g stroke-width="2"><path d="M10 30L20 20z" stroke-width="1" stroke="#f00"/></g>'
+            "</svg>"
+        )
+        assert [*saved] == [
+            "collapse_groups",
+            "remove_defaults",
+            "shorten_colors",
+            "remove_empty",
+            "compact_paths",
+        ]
+        assert all(value > 0 for value in saved.values())
+        assert sum(saved.values()) == before - len(root.render())
+
+    def test_selected_passes(self):
+        root = Root(Tag.g(Tag.rect(fill="#000000", stroke_width=1)))
+
+        assert optimize(root, ["shorten_colors"]) == {"shorten_colors": 3}
+        assert root.render() == '<svg><g><rect fill="#000" stroke-width="1"/></g></svg>'
+
+        def drop_rects(tag):
+            tag[0].children = []
+
+        assert optimize(root, [drop_rects, "remove_empty"]) == {
+            "drop_rects": 39,
+            "remove_empty": 4,
+        }
+        assert root.render() == "<svg></svg>"
+
+        with pytest.raises(ValueError):
+            optimize(root, ["shorten_colors", "unknown"])
+
+    def test_safe_defaults(self):
+        referenced = Root(
+            Tag.symbol(Tag.rect(stroke_width=1), id="icon"),
+            Tag.rect(stroke_width=1, opacity=1, class_="a"),
+        )
+        optimize(referenced, ["remove_defaults"])
+        assert referenced.render() == (
+            '<svg><symbol id="icon"><rect stroke-width="1"/></symbol>'
+            '<rect stroke-width="1" class="a"/></svg>'
+        )
+
+        styled = Root(Tag.style("rect { fill: red }"), Tag.rect(fill="black"))
+        optimize(styled, ["remove_defaults"])
+        assert styled.render() == (
+            '<svg><style>rect { fill: red }</style><rect fill="black"/></svg>'
+        )
+
+    def test_frozen_and_clones(self):
+        frozen = Tag.g(Tag.rect(fill="#ffffff")).freeze()
+        root = Root(frozen, Tag.g(Tag.rect(fill="#ffffff")))
+        optimize(root, ["shorten_colors", "collapse_groups"])
+
+        # the frozen group is collapsed by its parent, but not changed
+        assert root.render() == '<svg><rect fill="#ffffff"/><rect fill="#fff"/></svg>'
+        assert frozen.render() == '<g><rect fill="#ffffff"/></g>'
+
+        base = Root(Tag.g(Tag.rect(fill="#ffffff")))
+        clone = base.clone()
+        optimize(clone)
+
+        assert clone.render() == '<svg><rect fill="#fff"/></svg>'
+        assert base.render() == '<svg><g><rect fill="#ffffff"/></g></svg>'
+
+    def test_colors(self):
+        assert short_color("#FFFFFF") == "#fff"
+        assert short_color("#123456") == "#123456"
+        assert short_color("rgb(0, 128, 255)") == "#0080ff"
+        assert short_color("rgb(300, 0, 0)") == "rgb(300, 0, 0)"
+        assert short_color("red") == "red"
+
+    def test_trailing_dots(self):
+        for d in ["M5. 10.25L0 0", "M0 0L 5. 0", "M1.,2.L3.e1 .5 -4. .5"]:
+            root = Tag.svg(Tag.path(d=d))
+            optimize(root, ["compact_paths"])
+
+            # the compacted path reads back as the same numbers
+            assert [float(number) for number in PATH_NUMBER.findall(root[0]["d"])] == [
+                float(number) for number in PATH_NUMBER.findall(d)
+            ]
+
+    def test_split_path(self):
+        assert split_path("M10,30a20 20 0 01.5.5z") == [
+            "M",
+            "10",
+            "30",
+            "a",
+            "20",
+            "20",
+            "0",
+            "0",
+            "1",
+            ".5",
+            ".5",
+            "z",
+        ]
+        assert compact_path(split_path("M 0e3,-0.5 L1e-5 +2") or []) == "M0-.5L1e-5 2"
+        assert split_path("M5. 10.25L 5. 0 6.e1 .5") == [
+            "M",
+            "5",
+            "10.25",
+            "L",
+            "5",
+            "0",
+            "6e1",
+            ".5",
+        ]
+        assert split_path("M 10 x") is None
+        assert split_path("10 20") is None
@@ -0,0 +1,110 @@
+import asyncio
+import gzip
+import socket
+from io import BytesIO, StringIO
+
+import pytest
+from soda import Root, Tag
+from soda.output import iter_chunks, iter_gzip
+
+
+def build_tree() -> Tag:
+    return Root(viewBox="0 0 100 100")(
+        *[Tag.circle(cx=i, cy=i / 3, r=1, fill="привет") for i in range(300)]
+    )
+
+
+class TestClass:
+    def test_chunks(self):
+        tree = build_tree()
+
+        for pretty in (False, True):
+            chunks = [*iter_chunks(tree, chunk_size=1000, pretty=pretty)]
+
+            assert "".join(chunks) == tree.render(pretty=pretty)
+            assert len(chunks) > 1
+            assert all(len(chunk) >= 1000 for chunk in chunks[:-1])
+
+    def test_sinks(self):
+        tree = build_tree()
+        expected = tree.render().encode()
+
+        buffer = bytearray()
+        assert tree.write_to(buffer, chunk_size=100) == len(expected)
+        assert buffer == expected
+
+        file = BytesIO()
+        tree.write_to(file)
+        assert file.getvalue() == expected
+
+        text_file = StringIO()
+        tree.write_to(text_file, pretty=True)
+        assert text_file.getvalue() == tree.render(pretty=True)
+
+        file = BytesIO()
+        tree.write_to(file, encoding="utf-16", chunk_size=100)
+        assert file.getvalue().decode("utf-16") == tree.render()
+
+    def test_socket(self):
+        tree = build_tree()
+        expected = tree.render().encode()
+        left, right = socket.socketpair()
+
+        with left, right:
+            tree.write_to(left, chunk_size=512)
+            left.shutdown(socket.SHUT_WR)
+
+            received = bytearray()
+            while True:
+                data = right.recv(65536)
+                if not data:
+                    break
+                received += data
+
+        assert received == expected
+
+    def test_bad_sink(self):
+        with pytest.raises(TypeError):
+            Tag.g.write_to(object())
+
+        with pytest.raises(TypeError):
+            Tag.g.write_gzip(StringIO())
+
+    def test_gzip(self):
+        tree = build_tree()
+        expected = tree.render(pretty=True).encode()
+
+        chunks = [*iter_gzip(tree, level=9, chunk_size=1000, pretty=True)]
+        assert len(chunks) > 1
+        assert gzip.decompress(b"".join(chunks)) == expected
+
+        file = BytesIO()
+        written = tree.write_gzip(file, level=1, chunk_size=100, pretty=True)
+        assert written == len(file.getvalue())
+        assert gzip.decompress(file.getvalue()) == expected
+
+        # no timestamp in the header, so output is reproducible
+        assert b"".join(iter_gzip(tree)) == b"".join(iter_gzip(tree))
+        assert (
+            gzip.decompress(b"".join(iter_gzip(tree, level=0)))
+            == tree.render().encode()
+        )
+
+    def test_astream(self):
+        tree = build_tree()
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        async def collect() -> bytes:
+            task = asyncio.ensure_future(ticker())
+            chunks = [chunk async for chunk in tree.astream(chunk_size=500)]
+            task.cancel()
+            return b"".join(chunks)
+
+        assert asyncio.run(collect()) == tree.render().encode()
+        assert ticks > 1
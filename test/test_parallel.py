@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from soda import Fragment, Root, Tag, XMLComment, parallel
+from soda.parallel import render_parallel, split_tree
+
+
+def build_tree() -> Tag:
+    return Root(viewBox="0 0 100 100")(
+        "title",
+        *[
+            Tag.g(
+                [Tag.circle(cx=i, cy=j, r=1 / 3) for j in range(5)],
+                Fragment("text", Tag.a),
+                id=f"layer-{i}",
+            )
+            for i in range(20)
+        ],
+        XMLComment("done"),
+    )
+
+
+class TestClass:
+    def test_split(self):
+        tree = build_tree()
+
+        assert len(split_tree(tree, 1)) == 21
+        assert len(split_tree(tree, 2)) == 20 * 6
+        assert split_tree(tree, 0) == [tree]
+
+    def test_processes(self):
+        tree = build_tree()
+
+        for pretty in (False, True):
+            assert render_parallel(tree, workers=2, pretty=pretty) == tree.render(
+                pretty=pretty
+            )
+
+    def test_pickled(self, monkeypatch):
+        monkeypatch.setattr(parallel, "can_fork", lambda: False)
+        tree = build_tree()
+
+        assert render_parallel(tree, workers=2) == tree.render()
+
+    def test_threads(self):
+        trees = [build_tree()(id=f"tree-{i}") for i in range(2)]
+
+        # renders from several threads don't share workers or their inputs
+        with ThreadPoolExecutor(2) as executor:
+            results = [
+                *executor.map(lambda tree: render_parallel(tree, workers=2), trees)
+            ]
+
+        assert results == [tree.render() for tree in trees]
+
+    def test_executor(self):
+        tree = build_tree()
+
+        with ThreadPoolExecutor(4) as executor:
+            for depth in (1, 2, 3):
+                for pretty in (False, True):
+                    assert render_parallel(
+                        tree,
+                        workers=4,
+                        depth=depth,
+                        pretty=pretty,
+                        executor=executor,
+                    ) == tree.render(pretty=pretty)
+
+    def test_serial(self):
+        tree = build_tree()
+
+        assert render_parallel(tree, workers=1) == tree.render()
+        assert render_parallel(Tag.g, workers=4) == "<g/>"
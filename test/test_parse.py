@@ -1,6 +1,16 @@
+from io import BytesIO
+from mmap import ACCESS_READ, mmap
+
+import pytest
+
 from soda import Tag
 from soda.tags import Literal
-from soda.xml_parse import str_to_tag
+from soda.xml_parse import reverse_nsmap, str_to_tag
+
+DOCUMENT = (
+    '<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink">'
+    '<use xlink:href="#a" xml:space="preserve"/><use xlink:href="#b"/></svg>'
+)
 
 
 class TestClass:
@@ -29,3 +39,39 @@ class TestClass:
         assert content[2].children[0] == "123"
 
         assert str_to_tag(None) is None
+
+    def test_sources(self, tmp_path):
+        expected = Tag.from_str(DOCUMENT).render()
+        data = DOCUMENT.encode()
+        path = tmp_path / "document.svg"
+        path.write_bytes(data)
+
+        assert Tag.from_str(data).render() == expected
+        assert Tag.from_str(bytearray(data)).render() == expected
+        assert Tag.from_str(memoryview(data)).render() == expected
+        assert Tag.from_str(path).render() == expected
+        assert Tag.from_str(BytesIO(data)).render() == expected
+
+        with open(path, "rb") as file:
+            assert Tag.from_str(file).render() == expected
+
+        with open(path, "rb") as file, mmap(
+            file.fileno(), 0, access=ACCESS_READ
+        ) as mapped:
+            assert Tag.from_str(mapped).render() == expected
+
+        with pytest.raises(TypeError):
+            Tag.from_str(12)  # type: ignore
+
+    def test_namespaces(self):
+        reverse_nsmap.cache_clear()
+        tag = Tag.from_str(DOCUMENT)
+
+        first, second = tag.children
+        assert first["xlink:href"] == "#a"
+        assert first["xml:space"] == "preserve"
+        assert second["xlink:href"] == "#b"
+
+        # both elements have the same namespaces
+        info = reverse_nsmap.cache_info()
+        assert info.misses == 1 and info.hits == 1
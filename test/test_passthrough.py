@@ -0,0 +1,98 @@
+from mmap import ACCESS_READ, mmap
+
+import pytest
+
+from soda import Tag
+
+DOCUMENT = """<?xml version="1.0" encoding="utf-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" viewBox="0 0 10 10">
+  <!-- made by hand -->
+  <g id="group"   fill='red'>
+    text &amp; more <rect x="1" title="a > b"/><g></g><use xlink:href="#group"/>
+  </g>
+  <g><circle r="1"/></g>
+  <text>é &lt;</text>
+</svg >"""
+
+
+class TestPassthrough:
+    def test_unchanged(self, tmp_path):
+        original = DOCUMENT[DOCUMENT.index("<svg") :]
+        tag = Tag.from_str(DOCUMENT, passthrough=True)
+
+        assert tag.render() == original
+        # subtrees too
+        assert tag._children[1].render() == (
+            "<g id=\"group\"   fill='red'>\n"
+            '    text &amp; more <rect x="1" title="a > b"/><g></g><use xlink:href="#group"/>\n'
+            "  </g>"
+        )
+
+        path = tmp_path / "document.svg"
+        path.write_bytes(DOCUMENT.encode())
+        assert Tag.from_str(path, passthrough=True).render() == original
+
+        with open(path, "rb") as file, mmap(
+            file.fileno(), 0, access=ACCESS_READ
+        ) as data:
+            mapped = Tag.from_str(data, passthrough=True)
+
+        # the document is copied out of the mmap
+        assert mapped.render() == original
+
+        buffer = bytearray(DOCUMENT.encode())
+        tag = Tag.from_str(buffer, passthrough=True)
+        buffer[:] = b" " * len(buffer)
+        assert tag.render() == original
+
+        latin = DOCUMENT.replace("utf-8", "iso-8859-1").encode("iso-8859-1")
+        assert Tag.from_str(latin, passthrough=True).render() == original
+
+    def test_changes(self):
+        tag = Tag.from_str(DOCUMENT, passthrough=True)
+        comment, group, other, text = tag._children
+
+        assert group.tag_name == "g" and group["fill"] == "red"
+        assert comment.render() == "<!-- made by hand -->"
+
+        group[1]["x"] = 5  # <rect>
+
+        # changed tags and the ones containing them are rendered again, the rest is copied as is
+        assert tag.render() == (
+            '<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" viewBox="0 0 10 10">'
+            "<!-- made by hand -->"
+            '<g id="group" fill="red">text &amp; more<rect x="5" title="a > b"/><g></g><use xlink:href="#group"/></g>'
+            '<g><circle r="1"/></g>'
+            "<text>é &lt;</text>"
+            "</svg>"
+        )
+
+        # pretty renders are made from tags
+        pretty = tag.render(pretty=True)
+        assert "fill='red'" not in pretty
+        assert '\n  fill="red"' in pretty
+
+    def test_attribute_names(self):
+        document = '<svg tag_name="a" self_closing="b"><g/></svg>'
+        tag = Tag.from_str(document, passthrough=True)
+
+        assert tag.tag_name == "svg" and tag.self_closing
+        assert dict(tag.attributes) == {"tag_name": "a", "self_closing": "b"}
+        assert tag.render() == document
+
+        tag["x"] = 1
+        assert tag.render() == '<svg tag_name="a" self_closing="b" x="1"><g/></svg>'
+
+    def test_encodings(self):
+        document = '<?xml version="1.0" encoding="utf-16"?><svg><g/></svg>'
+
+        for encoded in [document.encode("utf-16"), document.encode("utf-16-be")]:
+            with pytest.raises(ValueError):
+                Tag.from_str(encoded, passthrough=True)
+
+        # text is parsed as UTF-8, whatever it declares
+        assert Tag.from_str(document, passthrough=True).render() == "<svg><g/></svg>"
+
+    def test_options(self):
+        with pytest.raises(ValueError):
+            Tag.from_str(DOCUMENT, lazy=True, passthrough=True)
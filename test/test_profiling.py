@@ -0,0 +1,113 @@
+from threading import Thread
+
+from soda import Fragment, Literal, Root, Tag, TagArray, XMLComment
+from soda.output import iter_chunks
+from soda.profiling import Profiler
+from soda.renderer import TreeRenderer, active_profilers, running_profiles
+
+
+def build_tree() -> Tag:
+    return Root(
+        *[
+            Tag.g(Tag.rect(x=i), "text", XMLComment("comment"), Fragment(Literal("x")))
+            for i in range(10)
+        ]
+    )
+
+
+class TestProfiling:
+    def test_bytes(self):
+        tree = Tag.text("é€", Tag.tspan("😀"), title="ü")
+        expected = tree.render()
+
+        with Profiler() as profiler:
+            tree.render()
+
+        # sizes are of UTF-8 output, not numbers of characters
+        total = sum(entry.bytes for entry in profiler.stats.values())
+        assert total == len(expected.encode()) > len(expected)
+
+    def test_stats(self):
+        tree = build_tree()
+        expected = tree.render()
+
+        with Profiler() as profiler:
+            assert tree.render() == expected
+
+        stats = profiler.stats
+        # fragments are flattened into their parents, so only their children are counted
+        assert sorted(stats) == [
+            "Literal",
+            "Root",
+            "XMLComment",
+            "g",
+            "rect",
+        ]
+        assert stats["g"].nodes == 10
+        assert stats["Root"].nodes == 1
+        assert stats["rect"].bytes == sum(
+            len(Tag.rect(x=i).render()) for i in range(10)
+        )
+        assert sum(entry.bytes for entry in stats.values()) == len(expected)
+        assert stats["Root"].total_time >= stats["g"].total_time >= stats["g"].self_time
+
+        assert "rect" in profiler.report()
+        assert len(profiler.report(limit=2).splitlines()) == 3
+
+    def test_callback(self):
+        tree = build_tree()
+        renders = []
+
+        profiler = Profiler(renders.append).start()
+
+        try:
+            tree.render()
+            "".join(iter_chunks(tree, chunk_size=10))
+        finally:
+            profiler.stop()
+
+        tree.render()
+
+        assert len(renders) == 2
+        assert renders[0]["g"].nodes == renders[1]["g"].nodes == 10
+        assert profiler.stats["g"].nodes == 20
+
+    def test_nested(self):
+        # attribute values and tag array prototypes are rendered by renders nested in the outer one
+        tree = Root(
+            Tag.g(fill=Tag.rect(x=1)),
+            TagArray("circle", cx=[1, 2, 3], r=1),
+        )
+        renders = []
+
+        with Profiler(renders.append) as profiler:
+            chunks = iter_chunks(tree, chunk_size=10)
+            first = next(chunks)
+            # the consumer's own renders between chunks are not a part of the streamed one
+            Tag.a.render()
+            "".join([first, *chunks])
+            tree.render()
+
+        assert running_profiles.get() is None
+        assert [sorted(stats) for stats in renders] == [
+            ["a"],
+            ["Root", "TagArray", "circle", "g", "rect"],
+            ["Root", "TagArray", "circle", "g", "rect"],
+        ]
+        assert profiler.stats["rect"].nodes == 2
+
+    def test_threads(self):
+        tree = build_tree()
+        renders = []
+
+        with Profiler(renders.append):
+            thread = Thread(target=tree.render)
+            thread.start()
+            thread.join()
+
+        assert renders == []
+
+    def test_disabled(self):
+        assert active_profilers.get() == ()
+        assert TreeRenderer().profiles == []
+        assert "expand" not in vars(TreeRenderer())
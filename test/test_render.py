@@ -1,3 +1,5 @@
+from wordstreamer import Renderer
+
 from soda import Literal, Tag, config
 from soda.tags import Fragment
 
@@ -90,3 +92,34 @@ class TestClass:
 
         frag = Fragment(1, 2)
         assert frag.render() == "12"
+
+    def test_serialize_values(self):
+        def build() -> Tag:
+            tag = Tag.svg(
+                Tag.title('a"b <c> & d', 1 / 3),
+                ["nested & list", 5, Fragment("fragment <", 1.5)],
+                Literal("<b/>", escape=False),
+                id='q"uote',
+                x=1 / 7,
+                fill=Tag.g(x='"'),
+            )
+            tag(Tag.circle(r=0.5), "<end>", data_y=2.0)
+            tag.insert(0, "first <")
+            tag[1] = tag[1]
+            tag["width"] = 10
+            return tag
+
+        config.decimal_length = 3
+        config.serialize_values = False
+        plain = build()
+
+        config.serialize_values = True
+        serialized = build()
+        config.serialize_values = False
+
+        assert serialized["id"] == "q&quot;uote"
+        assert serialized.render() == plain.render()
+        assert serialized.render(pretty=True) == plain.render(pretty=True)
+        assert Renderer({}).render_string(serialized) == plain.render()
+        # already serialized values are not escaped again
+        assert serialized.copy().render() == plain.render()
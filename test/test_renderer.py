@@ -0,0 +1,88 @@
+import random
+
+from soda import Fragment, Literal, Root, Slot, Tag, XMLComment, XMLDeclaration
+from soda.renderer import TreeRenderer, supports_render_into
+
+
+def random_tree(rng: random.Random, depth: int) -> Tag:
+    tag = Tag(rng.choice(["g", "rect", "text"]), self_closing=rng.random() < 0.8)
+
+    for i in range(rng.randint(0, 3)):
+        tag[f"attr_{i}"] = rng.choice([1, 1 / 3, 'say "hi"', Tag.a(x=1)])
+
+    if depth:
+        for _ in range(rng.randint(0, 4)):
+            kind = rng.randint(0, 6)
+
+            if kind == 0:
+                tag(rng.choice(["text", "a < b", ""]))
+            elif kind == 1:
+                tag(rng.random() * 10)
+            elif kind == 2:
+                tag([random_tree(rng, depth - 1), ["nested"]])
+            elif kind == 3:
+                tag(Fragment(random_tree(rng, depth - 1), "frag"))
+            elif kind == 4:
+                tag(Literal("<raw/>", escape=rng.random() < 0.5))
+            elif kind == 5:
+                tag(XMLComment("comment"))
+            else:
+                tag(random_tree(rng, depth - 1))
+
+    return tag
+
+
+contexts = [
+    {},
+    {"pretty": True, "tab_size": 2},
+    {"pretty": True, "tab_size": 4, "tab_level": 1},
+    {"pretty": False, "tab_size": 2},
+]
+
+
+class TestClass:
+    def test_same_as_stream(self):
+        rng = random.Random(42)
+
+        for _ in range(200):
+            tree = random_tree(rng, 4)
+
+            for context in contexts:
+                assert TreeRenderer(context).render(tree) == tree.render_string(context)
+
+    def test_special_roots(self):
+        nodes = [
+            Root(Tag.a, use_namespace=True),
+            XMLDeclaration(),
+            XMLComment("text"),
+            Fragment(1, [2, Fragment("3")]),
+            Literal("a&b"),
+            Slot("x", default="y"),
+        ]
+
+        for node in nodes:
+            for context in contexts:
+                assert TreeRenderer(context).render(node) == node.render_string(context)
+
+    def test_deep(self):
+        tree = leaf = Tag.g
+
+        for _ in range(5000):
+            child = Tag.g
+            leaf(child)
+            leaf = child
+
+        assert tree.render() == "<g>" * 5000 + "<g/>" + "</g>" * 5000
+
+    def test_overridden_stream(self):
+        class Custom(Tag):
+            def stream(self, context):
+                yield "custom"
+
+        class CustomChild(Custom):
+            pass
+
+        assert not supports_render_into(Custom)
+        assert not supports_render_into(CustomChild)
+        assert supports_render_into(Root)
+        assert Tag.g(Custom("x")).render() == "<g>custom</g>"
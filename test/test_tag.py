@@ -1,3 +1,6 @@
+import pytest
+
+from soda import config
 from soda.tags import Fragment, Literal, Tag
 
 
@@ -104,3 +107,236 @@ class TestClass:
         literal = Literal("abcd")
 
         assert repr(literal) == "Literal<'abcd'>"
+
+    def test_shared_empty_containers(self):
+        a = Tag.a
+        g = Tag.g
+
+        assert a._attributes is g._attributes
+        assert a._children is g._children
+
+        a["x"] = 1
+        a.children.append("text")
+
+        assert a.render() == '<a x="1">text</a>'
+        assert g.render() == "<g/>"
+        assert g.attributes == {}
+        assert not hasattr(g, "__dict__") or not g.__dict__
+
+    def test_subclasses(self):
+        class Label(Tag):
+            # sets the contents itself, without calling `Tag.__init__`
+            def __init__(self, text: str):
+                self.tag_name = "text"
+                self.children = [text]
+                self.attributes = {"class": "label"}
+
+        class Upper(Tag):
+            def set_attribute(self, attr, value):
+                return super().set_attribute(attr, str(value).upper())
+
+        label = Label("a")
+        label["x"] = 1
+
+        assert label.render() == '<text class="label" x="1">a</text>'
+        assert Upper("g", fill="red").render() == '<g fill="RED"/>'
+        assert Upper("g")(fill="red").render() == '<g fill="RED"/>'
+
+    def test_literal_children(self):
+        literal = Literal("a")
+        literal.children.append("b")
+
+        assert literal.render() == "ab"
+
+    def test_pickle(self):
+        import pickle
+
+        tag = Tag.g(Tag.rect(x=1), Literal("a"), Fragment(1, 2), Tag.a)
+        restored = pickle.loads(pickle.dumps(tag))
+
+        assert restored.render() == tag.render()
+        assert restored[-1]._attributes is Tag.a._attributes
+
+    def test_raw(self):
+        config.replace_underscores = True
+        config.strip_underscores = True
+
+        tag = Tag.raw("rect", "a", x=1.0, y=1 / 3, skip=None, **{"stroke-width": 2})
+
+        assert tag.render() == '<rect x="1" y="0.333" stroke-width="2">a</rect>'
+        assert tag == Tag.rect("a", x=1, y=1 / 3, stroke_width=2)
+        assert Tag.raw("g", self_closing=False).render() == "<g></g>"
+        assert Tag.raw("cla_ss_").tag_name == "cla_ss_"
+
+    def test_ident_cache(self):
+        config.replace_underscores = True
+        config.strip_underscores = True
+        assert Tag("cla_ss_").tag_name == "cla-ss"
+
+        config.replace_underscores = False
+        assert Tag("cla_ss_").tag_name == "cla_ss"
+
+        config.replace_underscores = True
+        assert Tag("cla_ss_").tag_name == "cla-ss"
+
+    def test_in_place_changes(self):
+        tag = Tag.g(Tag.rect(x=1), "text", fill="red").enable_cache()
+        tag.content_hash()
+
+        assert tag.children == [tag[0], "text"]
+        assert tag.attributes == {"fill": "red"}
+        assert tag.render() == '<g fill="red"><rect x="1"/>text</g>'
+
+        # changes through the views invalidate caches, as tag methods do
+        tag.children.append("more")
+        tag.attributes["fill"] = "blue"
+
+        assert tag._hash is None
+        assert tag.render() == '<g fill="blue"><rect x="1"/>textmore</g>'
+        assert tag == Tag.g(Tag.rect(x=1), "text", "more", fill="blue")
+
+        tag.children[0].attributes["x"] = 2
+        del tag.attributes["fill"]
+        tag.children[1:] = ["other"]
+        tag.attributes.update(id="a")
+
+        assert tag.render() == '<g id="a"><rect x="2"/>other</g>'
+
+        tag.freeze()
+        assert tag.children[1] == "other" and tag.attributes["id"] == "a"
+
+        with pytest.raises(TypeError):
+            tag.children.append("more")
+
+        with pytest.raises(TypeError):
+            tag.attributes["id"] = "b"
+
+    def test_hash_invalidation(self):
+        first = Tag.g(Tag.g(Tag.rect(x=1)), Tag.circle(r=1))
+        second = Tag.g(Tag.rect(x=1))
+        first.content_hash()
+        second.content_hash()
+
+        # reading doesn't count as a change, and changes drop only the hashes of the changed tag and the tags containing it
+        assert first.children[0].attributes == {}
+        first[0][0]["x"] = 2
+
+        assert first._hash is None and first[0]._hash is None
+        assert first[1]._hash is not None and second._hash is not None
+
+        # comparison uses cached hashes, but doesn't compute them
+        assert first != second
+        assert first._hash is None
+
+    def test_content_hash(self):
+        def tree():
+            return Tag.g(Tag.rect(x=1, y=2), [Fragment("text", 1.0)], id="a")
+
+        first, second = tree(), tree()
+        assert first.content_hash() == second.content_hash()
+        assert first == second
+
+        first[0]["x"] = 5
+        assert first.content_hash() != second.content_hash()
+        assert first != second
+
+        second[0]["x"] = 5.0
+        assert first == second
+
+        first.children[1][0].children.append("more")
+        assert first != second
+
+        unhashable = Tag.g(Tag.a(value={}))
+        assert unhashable.content_hash() is None
+        assert unhashable == Tag.g(Tag.a(value={}))
+
+    def test_freeze(self):
+        import pickle
+
+        tag = Tag.g(Tag.rect(x=1), [Fragment("text")], fill="red").freeze()
+
+        assert tag.frozen and tag[0].frozen
+        assert tag._children == (tag[0], "text")
+        assert tag.render() == '<g fill="red"><rect x="1"/>text</g>'
+
+        for change in [
+            lambda: tag(Tag.a),
+            lambda: tag.set_attribute("fill", "blue"),
+            lambda: tag[0].pop(),
+            lambda: tag.edit_attributes(),
+        ]:
+            with pytest.raises(TypeError):
+                change()
+
+        other = Tag.g(Tag.rect(x=1), "text", fill="red").freeze()
+        assert {tag: 1}[other] == 1
+        assert len({tag, other, Tag.g.freeze()}) == 2
+
+        restored = pickle.loads(pickle.dumps(tag))
+        assert restored.frozen and restored == tag and hash(restored) == hash(tag)
+
+        with pytest.raises(TypeError):
+            hash(Tag.g)
+
+        with pytest.raises(TypeError):
+            hash(Tag.g(value={}).freeze())
+
+    def test_clone(self):
+        base = Tag.svg(
+            Tag.g(Tag.rect(x=1), Tag.rect(x=2), id="bars"),
+            Tag.g(Tag.text("title"), id="header"),
+            [Fragment(Tag.circle(r=1))],
+            fill="red",
+        )
+        expected = base.render()
+
+        clone = base.clone()
+        assert not base.frozen and not clone.frozen and clone.shared
+        assert clone.render() == expected and clone == base
+
+        # the source is left as is and stays writable
+        assert isinstance(base._children[2], list)
+        assert not base[0].frozen
+
+        # next clones share the same snapshot
+        assert base.clone()._children is clone._children
+
+        clone[0][1]["x"] = 5
+        clone["fill"] = "blue"
+        clone[1].append("more")
+
+        assert base.render() == expected
+        assert clone.render() == expected.replace('x="2"', 'x="5"').replace(
+            "red", "blue"
+        ).replace("title</text>", "title</text>more")
+
+        # untouched subtrees are still shared
+        assert clone[0][0]._children is base[0][0]._children
+        assert clone[2].shared
+
+        second = base.clone()
+        second.pop()
+        assert second.render() == expected.replace('<circle r="1"/>', "")
+        assert base.render() == expected
+
+        # changes of the source make a new snapshot, earlier clones keep the old one
+        third = base.clone()
+        base[0][0]["x"] = 3
+        fourth = base.clone()
+        assert third.render() == expected
+        assert fourth.render() == expected.replace('x="1"', 'x="3"')
+        assert fourth._children is not third._children
+
+        # clones of clones and of frozen tags don't copy anything
+        assert third.clone()._children is third._children
+        frozen = Tag.g(Tag.rect()).freeze()
+        assert frozen.clone()._children is frozen._children
+
+    def test_clone_cache(self):
+        base = Tag.g(Tag.g(Tag.rect(x=1)), Tag.rect(x=2))
+        clone = base.clone().enable_cache()
+        clone.render()
+
+        clone[0][0]["x"] = 3
+        assert clone.render() == '<g><g><rect x="3"/></g><rect x="2"/></g>'
+        assert base.render() == '<g><g><rect x="1"/></g><rect x="2"/></g>'
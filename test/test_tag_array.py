@@ -0,0 +1,76 @@
+from array import array
+
+import pytest
+
+from soda import Fragment, Root, Tag, TagArray
+from soda.output import iter_chunks
+from soda.tag_array import BATCH_SIZE
+
+
+def scatter(count: int, fake_array: type) -> TagArray:
+    return TagArray(
+        "circle",
+        cx=[i / 3 for i in range(count)],
+        cy=array("d", [i * 1.5 for i in range(count)]),
+        r=fake_array([2.0] * count),
+        fill='say "{hi}"',
+        stroke_width=1,
+        data_index=[str(i) for i in range(count)],
+    )
+
+
+class TestTagArray:
+    def test_same_markup(self, fake_array):
+        points = scatter(5, fake_array)
+        root = Root(Tag.g(points, "text"), Tag.a)
+        expected = Root(Tag.g(Fragment(*points.tags()), "text"), Tag.a)
+
+        for pretty in (False, True):
+            context = {"pretty": pretty, "tab_size": 2 * pretty}
+
+            assert root.render(pretty) == expected.render(pretty)
+            assert root.render_string(context) == expected.render(pretty)
+
+        assert points.tags()[1] == Tag.circle(
+            cx=1 / 3, cy=1.5, r=2, fill='say "{hi}"', stroke_width=1, data_index="1"
+        )
+
+    def test_batches(self, fake_array):
+        points = scatter(BATCH_SIZE * 2 + 5, fake_array)
+        root = Tag.g(points)
+        expected = Tag.g(*points.tags()).render()
+
+        assert root.render() == expected
+        assert "".join(iter_chunks(root, 100)) == expected
+        assert len(points) == BATCH_SIZE * 2 + 5
+
+    def test_numpy(self):
+        numpy = pytest.importorskip("numpy")
+        random = numpy.random.default_rng(0)
+        values = numpy.concatenate(
+            [
+                random.random(3000) * 10.0 ** random.integers(-4, 15, 3000),
+                numpy.arange(100) / 2,
+                [0.0005, 0.0015, 1.0004, 1.9995, 56294995342131.51],
+            ]
+        )
+
+        points = TagArray("circle", cx=values, cy=values.astype(numpy.float32))
+        expected = Fragment(
+            *[
+                Tag.circle(cx=x, cy=y)
+                for x, y in zip(values.tolist(), values.astype(numpy.float32).tolist())
+            ]
+        )
+
+        assert Tag.g(points).render() == Tag.g(expected).render()
+
+    def test_columns(self):
+        with pytest.raises(ValueError):
+            TagArray("rect", x=[1, 2], y=[1, 2, 3])
+
+        with pytest.raises(ValueError):
+            TagArray("rect", x=1)
+
+        empty = TagArray("rect", x=[])
+        assert Tag.g(empty).render() == "<g></g>"
@@ -0,0 +1,54 @@
+import pytest
+from soda import Root, Slot, Tag, Template
+
+
+def build_tree(width, label, extra):
+    return Root(viewBox="0 0 10 10")(
+        Tag.g(
+            Tag.rect(width=width, fill="red"),
+            Tag.text(label),
+            extra,
+        ),
+        "tail",
+    )
+
+
+class TestClass:
+    def test_fill(self):
+        tree = build_tree(Slot("width"), Slot("label"), Slot("extra", default=[]))
+        values = {
+            "width": 1 / 3,
+            "label": 'a<b"',
+            "extra": [Tag.circle(r=1), "x"],
+        }
+
+        for pretty in (False, True):
+            template = Template(tree, pretty=pretty)
+
+            assert template.slots == ["width", "label", "extra"]
+            assert template.render(**values) == build_tree(**values).render(
+                pretty=pretty
+            )
+            assert template.render(width=2, label="b", extra=Tag.a) == build_tree(
+                2, "b", Tag.a
+            ).render(pretty=pretty)
+
+        template = Template(tree)
+        assert template.render(width=2, label="b") == build_tree(2, "b", []).render()
+
+    def test_attribute_quotes(self):
+        template = Template(Tag.g(title=Slot("title")))
+
+        assert template.render(title='"q"') == '<g title="&quot;q&quot;"/>'
+        assert template.render({"title": Tag.a}) == '<g title="<a/>"/>'
+
+    def test_missing(self):
+        template = Template(Tag.g(Slot("content")))
+
+        with pytest.raises(KeyError):
+            template.render()
+
+    def test_outside_template(self):
+        assert Tag.g(x=Slot("x", default=1.5)).render() == '<g x="1.5"/>'
+        assert Tag.g(Slot("x", default="a")).render() == "<g>a</g>"
+        assert Tag.g(Slot("x")).render() == "<g></g>"
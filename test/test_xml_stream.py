@@ -0,0 +1,139 @@
+from io import BytesIO
+
+from soda import Tag
+from soda.xml_stream import (
+    Comment,
+    End,
+    Start,
+    Text,
+    drop_elements,
+    map_events,
+    parse_events,
+    render_events,
+    transform,
+)
+
+SOURCE = b"""<?xml version="1.0"?>
+<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" width="10">
+    <!--comment-->
+    <metadata><title>drop me</title></metadata>
+    <g id="a"> text <rect x="1"/> tail <?pi x?> after </g>
+    <use xlink:href="#a" xml:space="preserve"/>
+    <text fill="red">a &amp; &lt;b&gt; "q"</text>
+</svg>
+"""
+
+
+class TestXMLStream:
+    def test_events(self):
+        events = [*parse_events(SOURCE)]
+        kinds = [type(event).__name__ for event in events]
+
+        assert kinds[:3] == ["Start", "Comment", "Start"]
+        assert events[0].attributes == {
+            "xmlns": "http://www.w3.org/2000/svg",
+            "xmlns:xlink": "http://www.w3.org/1999/xlink",
+            "width": "10",
+        }
+        assert [event.text for event in events if isinstance(event, Text)] == [
+            "drop me",
+            "text",
+            "tail",
+            "after",
+            'a & <b> "q"',
+        ]
+        assert [event.depth for event in events if isinstance(event, Start)] == [
+            0,
+            1,
+            2,
+            1,
+            2,
+            1,
+            1,
+        ]
+        use = next(e for e in events if isinstance(e, Start) and e.tag_name == "use")
+        assert use.attributes == {"xlink:href": "#a", "xml:space": "preserve"}
+
+    def test_render(self):
+        plain = b'<g id="a"><rect x="1"/>text<circle/></g>'
+        assert "".join(render_events(parse_events(plain))) == plain.decode()
+        assert (
+            "".join(render_events(parse_events(plain)))
+            == Tag.from_str(plain.decode()).render()
+        )
+
+        rendered = "".join(render_events(parse_events(SOURCE)))
+        assert "<!--comment-->" in rendered
+        assert '<text fill="red">a &amp; &lt;b&gt; "q"</text>' in rendered
+
+        # output is valid and parses to the same events
+        assert "".join(render_events(parse_events(rendered.encode()))) == rendered
+
+    def test_transform(self):
+        def recolor(event):
+            if isinstance(event, Start) and event.attributes.get("fill") == "red":
+                event.attributes["fill"] = "blue"
+
+            if isinstance(event, Comment):
+                return None
+
+            if isinstance(event, End) and event.tag_name == "svg":
+                return [Tag.circle(r=1), event]
+
+            return event
+
+        sink = bytearray()
+        written = transform(
+            BytesIO(SOURCE),
+            sink,
+            drop_elements(lambda start: start.tag_name == "metadata"),
+            map_events(recolor),
+            chunk_size=16,
+        )
+
+        assert written == len(sink)
+        output = sink.decode()
+        assert "metadata" not in output and "drop me" not in output
+        assert "comment" not in output
+        assert 'fill="blue"' in output
+        assert output.endswith('<circle r="1"/></svg>')
+
+    def test_path(self, tmp_path):
+        path = tmp_path / "large.svg"
+        children = "".join(f'<rect x="{i}"/>tail {i}' for i in range(10000))
+        path.write_bytes(f"<svg>{children}</svg>".encode())
+
+        events = parse_events(path)
+        count = 0
+
+        for event in events:
+            count += isinstance(event, Start)
+
+        assert count == 10001
+
+        sink = BytesIO()
+        transform(path, sink)
+        assert sink.getvalue() == path.read_bytes()
+
+    def test_whitespace_attributes(self):
+        document = '<svg><text title="line&#10;next&#9;tab&#13;&amp;&quot;"/></svg>'
+        events = list(parse_events(document))
+        assert events[1].attributes == {"title": 'line\nnext\ttab\r&"'}  # type: ignore
+
+        sink = BytesIO()
+        transform(document, sink)
+        output = sink.getvalue()
+
+        assert output == document.encode()
+        assert list(parse_events(output))[1].attributes == events[1].attributes  # type: ignore
+
+    def test_text(self):
+        # strings are document text, as in Tag.from_str, paths have to be os.PathLike
+        document = '<svg><rect x="1"/>é</svg>'
+        events = list(parse_events(document))
+
+        assert [type(event) for event in events] == [Start, Start, End, Text, End]
+
+        sink = BytesIO()
+        transform(document, sink)
+        assert sink.getvalue() == document.encode()